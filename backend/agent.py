@@ -1,37 +1,87 @@
+import asyncio
+import logging
+import os
+import time
+from typing import AsyncIterable, List, Optional, Tuple
+
 from dotenv import load_dotenv
 
 from livekit import agents
 from prompts import HINDI_GREETING_PROMPT, SYSTEM_PROMPT
-from livekit.agents import AgentSession, Agent, RoomInputOptions, RunContext
+from livekit.agents import AgentSession, Agent, ModelSettings, RoomInputOptions, RunContext, llm
 from livekit.plugins import (
     openai,
-    # cartesia,
+    cartesia,
     deepgram,
     noise_cancellation,
-    silero,
     elevenlabs,
 )
-from livekit.plugins.turn_detector.multilingual import MultilingualModel
 
 # Import all tools from our tools package
 from tools import (
     get_vehicle_insurance_quotes,
     get_policy_details,
     calculate_premium,
+    calculate_fleet_premiums,
     check_claim_status,
+    get_customer_open_claims,
+    get_policy_claims,
     get_agent_commission,
+    record_policy_sale,
+    get_commission_statement,
     get_customer_profile,
     update_customer_details,
     get_customer_policies,
     get_vehicle_details,
-    validate_vehicle_registration
+    validate_vehicle_registration,
+    validate_fleet_registrations,
+    get_full_record
 )
+from pipeline.compaction import HistoryCompactor
+from pipeline.greeting import GreetingCache
+from pipeline.intent import ToolRouter
+from pipeline.load import LOAD_THRESHOLD, LoopLagProbe, load_fnc
+from pipeline.memory import SessionMemoryProbe
+from pipeline.prewarm import StartupTimer, prewarm, session_models
+from pipeline.routing import ROUTING_ENABLED, RoutedLLM, RoutedSTT, RoutedTTS, routing_stats
+from pipeline.speculation import SPECULATION_ENABLED, HistoryKey, Speculator, history_key
+from pipeline.tracing import TRACING_ENABLED, TurnTracer
+from pipeline.tts_cache import CACHE_ENABLED as TTS_CACHE_ENABLED, CachedTTS
+from tools.concurrency import concurrency_stats
+from tools.entities import EntityCache
+from tools.metrics import get_tool_metrics, server_options
+from tools.prefetch import Prefetcher
+from tools.repository import get_repository
+from tools.shaping import ResultShaper
 
 load_dotenv()
 
+logger = logging.getLogger("policy-boss")
+
+
+# ElevenLabs voice and model used for every session
+TTS_VOICE_ID = "broqrJkktxd1CclKTudW"
+TTS_MODEL = "eleven_flash_v2_5"
+
 
 class Assistant(Agent):
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        greetings: Optional[GreetingCache] = None,
+        router: Optional[ToolRouter] = None,
+        compactor: Optional[HistoryCompactor] = None,
+        speculate: bool = SPECULATION_ENABLED,
+        tracer: Optional[TurnTracer] = None,
+        shaper: Optional[ResultShaper] = None
+    ) -> None:
+        self._greetings = greetings
+        self._router = router
+        self._compactor = compactor
+        self._tracer = tracer
+        self._shaper = shaper
+        self.speculator = Speculator(self._speculate, enabled=speculate)
+        self._background_tasks = set()
+
         # Initialize the agent with the system prompt and all the tools
         super().__init__(
             instructions=SYSTEM_PROMPT,
@@ -40,8 +90,13 @@ class Assistant(Agent):
                 get_vehicle_insurance_quotes,
                 get_policy_details,
                 calculate_premium,
+                calculate_fleet_premiums,
                 check_claim_status,
+                get_customer_open_claims,
+                get_policy_claims,
                 get_agent_commission,
+                record_policy_sale,
+                get_commission_statement,
                 
                 # Customer-related tools
                 get_customer_profile,
@@ -50,7 +105,11 @@ class Assistant(Agent):
                 
                 # Vehicle-related tools
                 get_vehicle_details,
-                validate_vehicle_registration
+                validate_vehicle_registration,
+                validate_fleet_registrations,
+                
+                # Fields left out of shaped lookups
+                get_full_record
             ]
         )
 
@@ -63,39 +122,260 @@ class Assistant(Agent):
             # For demo purposes, we'll just continue without the API
             self._policy_boss_api = None
             
+        # Play a pre-rendered greeting when one is cached; it is added to the chat context as text
+        greeting = self._greetings.pick() if self._greetings is not None else None
+        if greeting is not None:
+            await self.session.say(greeting.text, audio=greeting.frames())
+            return
+
         # Greet the user in Hindi with a female voice
-        await self.session.generate_reply(
+        handle = self.session.generate_reply(
             instructions=HINDI_GREETING_PROMPT
         )
+        if self._greetings is not None and self._greetings.needs_variants():
+            task = asyncio.create_task(self._greetings.learn(handle))
+            self._background_tasks.add(task)
+            task.add_done_callback(self._background_tasks.discard)
+        await handle
+
+    async def on_exit(self) -> None:
+        await self.speculator.aclose()
+
+    def _speculate(self, transcript: str) -> Tuple[HistoryKey, AsyncIterable[llm.ChatChunk]]:
+        # The request the turn would make if the caller stopped here; nothing is
+        # counted for it unless the turn replays it
+        chat_ctx = self.chat_ctx.copy()
+        history = history_key(chat_ctx.items)
+        chat_ctx.add_message(role="user", content=transcript)
+        chat_ctx, tools = self._prepare(chat_ctx, list(self.tools), record=False)
+        return history, Agent.default.llm_node(self, chat_ctx, tools, ModelSettings())
+
+    async def llm_node(
+        self,
+        chat_ctx: llm.ChatContext,
+        tools: List[llm.Tool],
+        model_settings: ModelSettings
+    ) -> AsyncIterable[llm.ChatChunk]:
+        # A request already started on the stable interim transcript is replayed
+        stream = self.speculator.take(chat_ctx)
+        chat_ctx, tools = self._prepare(chat_ctx, tools, record=True)
+        if stream is None:
+            stream = Agent.default.llm_node(self, chat_ctx, tools, model_settings)
+        async for chunk in self._account(chat_ctx, stream):
+            yield chunk
+
+    def _prepare(
+        self,
+        chat_ctx: llm.ChatContext,
+        tools: List[llm.Tool],
+        record: bool
+    ) -> Tuple[llm.ChatContext, List[llm.Tool]]:
+        """Return the history and tools to send; record=False leaves the session's turn state alone."""
+        # Long calls send a summary of their older turns instead of the turns themselves
+        if self._compactor is not None:
+            chat_ctx = self._compactor.view(chat_ctx, record=record)
+
+        # Send only the tools the caller's current topic needs
+        if self._router is not None:
+            tools = self._router.select(chat_ctx, tools) if record else self._router.preview(chat_ctx, tools)
+        return chat_ctx, tools
+
+    async def _account(
+        self,
+        chat_ctx: llm.ChatContext,
+        stream: AsyncIterable[llm.ChatChunk]
+    ) -> AsyncIterable[llm.ChatChunk]:
+        """Pass a turn's response through, recording its time to first token and usage."""
+        # Count what the shaped tool results in this request saved
+        if self._shaper is not None:
+            self._shaper.record_request(chat_ctx)
+
+        started_at = time.time()
+        start = time.perf_counter()
+        ttft = None
+        prompt_tokens = None
+        async for chunk in stream:
+            if isinstance(chunk, llm.ChatChunk):
+                if ttft is None and chunk.delta is not None and (chunk.delta.content or chunk.delta.tool_calls):
+                    ttft = time.perf_counter() - start
+                    if self._tracer is not None:
+                        self._tracer.record_llm(started_at, ttft)
+                if chunk.usage is not None:
+                    prompt_tokens = chunk.usage.prompt_tokens
+            yield chunk
+        if self._router is not None:
+            self._router.record_response(ttft, prompt_tokens)
 
 
 async def entrypoint(ctx: agents.JobContext):
+    startup = StartupTimer(ctx)
+    # Sampled sessions trace their allocations from here to release
+    memory_probe = SessionMemoryProbe.start(ctx.job.id)
     await ctx.connect()
 
+    # VAD comes prewarmed with the process; anything missing is loaded here
+    vad, turn_detection, startup.model_load_s = session_models(ctx.proc)
+
+    # Background lookups for the tool calls that usually come next
+    prefetcher = Prefetcher()
+
+    async def log_prefetch_stats() -> None:
+        prefetcher.close()
+        logger.info("prefetch stats", extra=prefetcher.stats())
+
+    ctx.add_shutdown_callback(log_prefetch_stats)
+
+    # Customer updates are journaled and written in the background; replayed
+    # ones start now, and what is pending is written before the job exits
+    repository = get_repository()
+    repository.start()
+
+    async def flush_customer_updates() -> None:
+        await repository.flush()
+        if repository.journal is not None:
+            logger.info("customer update journal stats", extra=repository.journal.stats())
+
+    ctx.add_shutdown_callback(flush_customer_updates)
+
+    # Customers, policies and vehicles this call has already looked up
+    entities = EntityCache()
+
+    async def log_entity_cache_stats() -> None:
+        logger.info("entity cache stats", extra=entities.stats())
+
+    ctx.add_shutdown_callback(log_entity_cache_stats)
+
+    # Record lookups go to the LLM projected; the full records stay here
+    shaper = ResultShaper()
+
+    async def log_result_shaping_stats() -> None:
+        logger.info("result shaping stats", extra=shaper.stats())
+
+    ctx.add_shutdown_callback(log_result_shaping_stats)
+
+    # Fold this job's tool latencies into its metrics while it runs and before it exits
+    flush_task = asyncio.create_task(get_tool_metrics().flush_periodically())
+
+    async def stop_flushing_tool_metrics() -> None:
+        flush_task.cancel()
+        await asyncio.gather(flush_task, return_exceptions=True)
+
+    ctx.add_shutdown_callback(stop_flushing_tool_metrics)
+
+    # Process-wide: lookups shared between calls and sessions, and calls cut off by the turn deadline
+    async def log_tool_concurrency_stats() -> None:
+        logger.info("tool concurrency stats", extra=concurrency_stats())
+
+    ctx.add_shutdown_callback(log_tool_concurrency_stats)
+
+    # Late event-loop wakeups are late audio frames; the lag feeds the capacity report
+    lag_probe = LoopLagProbe(ctx.job.id)
+    lag_probe.start()
+
+    async def log_loop_lag() -> None:
+        await lag_probe.aclose()
+        logger.info("event loop lag", extra=lag_probe.stats())
+
+    ctx.add_shutdown_callback(log_loop_lag)
+
+    # Per-turn tool selection; its stats compare the schemas sent with the full set
+    router = ToolRouter()
+
+    async def log_tool_routing_stats() -> None:
+        logger.info("tool routing stats", extra=router.stats())
+
+    ctx.add_shutdown_callback(log_tool_routing_stats)
+
+    # Every modality has a fallback provider; each request goes to the healthiest one
+    stt_providers = [deepgram.STT(model="nova-3", language="multi")]
+    llm_providers = [openai.LLM(model="gpt-4o-mini")]
+    if ROUTING_ENABLED:
+        stt_providers.append(openai.STT(model="gpt-4o-mini-transcribe"))
+        llm_providers.append(openai.LLM(model="gpt-4.1-mini"))
+
+    async def log_routing_stats() -> None:
+        logger.info("provider routing stats", extra=routing_stats())
+
+    ctx.add_shutdown_callback(log_routing_stats)
+
+    # The session's LLM also writes the call-state summaries for history compaction
+    chat_llm = RoutedLLM(llm_providers)
+    compactor = HistoryCompactor(chat_llm)
+
+    async def close_compactor() -> None:
+        await compactor.aclose()
+        logger.info("history compaction stats", extra=compactor.stats())
+
+    ctx.add_shutdown_callback(close_compactor)
+
+    # Use elevenlabs TTS for better female voice quality
+    voice_tts = elevenlabs.TTS(
+        voice_id=TTS_VOICE_ID,
+        model=TTS_MODEL
+    )
+    if TTS_CACHE_ENABLED:
+        # Recurring sentences are served from the node-wide phrase cache
+        cached_tts = voice_tts = CachedTTS(voice_tts, TTS_VOICE_ID, TTS_MODEL)
+
+        async def log_tts_cache_stats() -> None:
+            logger.info("tts cache stats", extra=await asyncio.to_thread(cached_tts.cache.stats))
+
+        ctx.add_shutdown_callback(log_tts_cache_stats)
+
+    tts_providers = [voice_tts]
+    if ROUTING_ENABLED and os.environ.get("CARTESIA_API_KEY"):
+        tts_providers.append(cartesia.TTS(language="hi"))
+
     session = AgentSession(
-        stt=deepgram.STT(model="nova-3", language="multi"),
-        # stt=openai.STT(model="gpt-4o-mini-transcribe"),
-        llm=openai.LLM(model="gpt-4o-mini"),
-        # Use elevenlabs TTS for better female voice quality
-        tts=elevenlabs.TTS(
-            voice_id="broqrJkktxd1CclKTudW",
-            model="eleven_flash_v2_5"
-        ),
-        vad=silero.VAD.load(),
-        turn_detection=MultilingualModel(),
+        stt=RoutedSTT(stt_providers, vad=vad),
+        llm=chat_llm,
+        tts=RoutedTTS(tts_providers),
+        vad=vad,
+        turn_detection=turn_detection,
         # Initialize with dummy data for demonstration purposes
         userdata={
             "policy_boss_api": {
                 "api_key": "dummy_api_key",
                 "agent_id": "AGENT123",
                 "region": "Mumbai"
-            }
+            },
+            "prefetcher": prefetcher,
+            "entities": entities,
+            "result_shaper": shaper
         }
     )
 
+    startup.watch(session)
+
+    # Per-turn stage spans, exported when a collector or trace log is configured
+    tracer = None
+    if TRACING_ENABLED:
+        tracer = TurnTracer(ctx.job.id)
+        tracer.attach(session)
+        ctx.add_shutdown_callback(tracer.aclose)
+    if memory_probe is not None:
+        memory_probe.watch(session)
+        ctx.add_shutdown_callback(memory_probe.report_close)
+
+    assistant = Assistant(
+        # Greetings are learned from the ElevenLabs voice only, never from a fallback
+        greetings=GreetingCache(HINDI_GREETING_PROMPT, TTS_VOICE_ID, TTS_MODEL, synthesizer=voice_tts),
+        router=router,
+        compactor=compactor,
+        tracer=tracer,
+        shaper=shaper
+    )
+    # Opt-in: start the LLM on interim transcripts once they stop changing
+    assistant.speculator.attach(session)
+
+    async def log_speculation_stats() -> None:
+        logger.info("speculation stats", extra=assistant.speculator.stats())
+
+    ctx.add_shutdown_callback(log_speculation_stats)
+
     await session.start(
         room=ctx.room,
-        agent=Assistant(),
+        agent=assistant,
         room_input_options=RoomInputOptions(
             # LiveKit Cloud enhanced noise cancellation
             # - If self-hosting, omit this parameter
@@ -109,4 +389,12 @@ async def entrypoint(ctx: agents.JobContext):
 
 
 if __name__ == "__main__":
-    agents.cli.run_app(agents.WorkerOptions(entrypoint_fnc=entrypoint))
\ No newline at end of file
+    agents.cli.run_app(agents.WorkerOptions(
+        entrypoint_fnc=entrypoint,
+        prewarm_fnc=prewarm,
+        # Stop taking jobs at measured session capacity, not after CPU has already spiked
+        load_fnc=load_fnc,
+        load_threshold=LOAD_THRESHOLD,
+        # Per-tool metrics of every job process, merged at /metrics on their own port
+        **server_options()
+    ))
\ No newline at end of file
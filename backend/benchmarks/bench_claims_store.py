@@ -0,0 +1,68 @@
+"""
+Benchmark for indexed claim lookups
+
+Builds (or reuses) a synthetic claims database and times random lookups by
+claim id, open claims per customer, claims per policy and claims per vehicle.
+
+Usage: python benchmarks/bench_claims_store.py [--db /tmp/claims.db] [--claims 1000000]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.generate_claims import generate_claims, populate  # noqa: E402
+from tools.claims_store import ClaimsStore  # noqa: E402
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--db", default=os.path.join(tempfile.gettempdir(), "policy_boss_claims_bench.db"))
+    parser.add_argument("--claims", type=int, default=1_000_000)
+    parser.add_argument("--lookups", type=int, default=2_000)
+    opts = parser.parse_args()
+
+    store = ClaimsStore(opts.db)
+    count = store.count()
+    if count < opts.claims:
+        start = time.perf_counter()
+        populate(store, opts.claims)
+        print(f"generated {opts.claims:,} claims in {time.perf_counter() - start:.1f} s")
+        count = store.count()
+    print(f"{count:,} claims in {opts.db}")
+
+    rng = random.Random(1)
+    sample = [row for row in generate_claims(opts.claims) if rng.random() < 0.01][:opts.lookups]
+    lookups = {
+        "claim by id": lambda row: store.get(row[0]),
+        "open claims for customer": lambda row: store.open_claims_for_customer(row[2], 20),
+        "claims on policy": lambda row: store.claims_for_policy(row[1], 20),
+        "claims on vehicle": lambda row: store.claims_for_vehicle(row[5], 20),
+    }
+    asyncio.run(time_lookups(lookups, sample))
+    store.close()
+
+
+async def time_lookups(lookups, sample) -> None:
+    for name, lookup in lookups.items():
+        timings = []
+        for row in sample:
+            start = time.perf_counter()
+            await lookup(row)
+            timings.append((time.perf_counter() - start) * 1000)
+        print(f"  {name:<26} p50 {percentile(timings, 50):6.3f} ms   p99 {percentile(timings, 99):6.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Benchmark for the session entity cache
+
+Plays a scripted call whose lookups move back and forth between a
+customer, their policy and their vehicle, with an address update halfway,
+against the seeded repository behind a stand-in that adds latency to every
+query. The process-wide repository cache is kept cold, as it is for a record
+first seen by this worker or evicted since. The call runs with and without a
+session entity cache and the script reports the queries that reached the
+database, the time spent in lookups, and the cache's hit counts; the profile
+read after the update must show the new address.
+
+Usage: python benchmarks/bench_entity_cache.py [--latency-ms 40,120]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from livekit.agents import llm  # noqa: E402
+
+from benchmarks.bench_tool_concurrency import SlowDatabase  # noqa: E402
+from tools import get_customer_profile, get_policy_details, get_vehicle_details, update_customer_details  # noqa: E402
+from tools.cache import TTLCache  # noqa: E402
+from tools.entities import EntityCache  # noqa: E402
+from tools.repository import Repository, SQLitePool, set_repository  # noqa: E402
+
+
+NEW_ADDRESS = "45 Marine Drive, Mumbai, Maharashtra"
+
+# The lookups of one call, in order
+CALL: List[Tuple[llm.FunctionTool, Tuple[Any, ...]]] = [
+    (get_vehicle_details, ("3001",)),
+    (get_customer_profile, ("1001",)),
+    (get_policy_details, ("2001",)),
+    (get_vehicle_details, ("3001",)),
+    (get_customer_profile, ("1001",)),
+    (update_customer_details, ("1001", "address", NEW_ADDRESS)),
+    (get_customer_profile, ("1001",)),
+    (get_policy_details, ("2001",)),
+    (get_vehicle_details, ("3001",)),
+    (get_policy_details, ("2001",)),
+    (get_customer_profile, ("1001",))
+]
+
+
+async def run_call(db: SlowDatabase, entities: Optional[EntityCache]) -> Dict[str, Any]:
+    # No process-wide cache to fall back on
+    set_repository(Repository(db, TTLCache(maxsize=1, ttl=0)))
+    userdata = {"entities": entities} if entities is not None else {}
+    db.queries = 0
+    lookup_s = 0.0
+    address = None
+    for turn, (tool, args) in enumerate(CALL):
+        context = SimpleNamespace(userdata=userdata, speech_handle=SimpleNamespace(id=f"turn_{turn}"))
+        start = time.perf_counter()
+        result = await tool(context, *args)
+        if tool is not update_customer_details:
+            lookup_s += time.perf_counter() - start
+        if tool is get_customer_profile:
+            address = result["contact"]["address"]
+    return {"queries": db.queries, "lookup_ms": lookup_s * 1000, "address": address}
+
+
+async def run(opts: argparse.Namespace) -> None:
+    latency = tuple(float(v) / 1000 for v in opts.latency_ms.split(","))
+    pool = SQLitePool(os.path.join(tempfile.mkdtemp(prefix="policy_boss_bench_"), "policy_boss.db"))
+    pool.initialize()
+    db = SlowDatabase(pool, latency, random.Random(opts.seed))
+    original = (await pool.fetch_one("customer_by_id", ("1001",)))[6]
+
+    print(f"{len(CALL)} tool calls, query latency {opts.latency_ms} ms")
+    print(f"{'session cache':<14} {'queries':>8} {'lookup ms':>10}  address after update")
+    for entities in (None, EntityCache()):
+        await pool.execute("update_customer_address", (original, "1001"))
+        result = await run_call(db, entities)
+        print(f"{'on' if entities is not None else 'off':<14} {result['queries']:>8} {result['lookup_ms']:>10.0f}  "
+              f"{'new' if result['address'] == NEW_ADDRESS else 'STALE'}")
+        if entities is not None:
+            print(f"entity cache: {entities.stats()}")
+    pool.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--latency-ms", default="40,120", help="min,max added to every query")
+    parser.add_argument("--seed", type=int, default=7)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Benchmark for vectorized fleet pricing
+
+Prices a random fleet with price_fleet, checks every breakdown against the
+single-vehicle price_vehicle path, and reports timings for both.
+
+Usage: python benchmarks/bench_fleet_pricing.py [--vehicles 10000] [--repeat 5]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.pricing import ADD_ON_RATES, fleet_breakdowns, price_fleet, price_vehicle  # noqa: E402
+
+
+def random_fleet(vehicles: int, seed: int = 11):
+    rng = random.Random(seed)
+    add_on_names = list(ADD_ON_RATES) + ["Unknown Cover"]
+    return (
+        [rng.choice(["two_wheeler", "four_wheeler", "commercial", "tractor"]) for _ in range(vehicles)],
+        [rng.randrange(40_000, 3_000_000) for _ in range(vehicles)],
+        [rng.randrange(-1, 15) for _ in range(vehicles)],
+        [rng.choice(["third_party", "comprehensive", "zero_dep", "other"]) for _ in range(vehicles)],
+        [rng.sample(add_on_names, rng.randrange(0, 5)) for _ in range(vehicles)],
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--vehicles", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    opts = parser.parse_args()
+
+    types, values, ages, coverages, add_ons = random_fleet(opts.vehicles)
+
+    # Best of several runs, so one-off allocator and GC warm-up is not counted
+    pricing_ms, breakdown_ms, scalar_ms = [], [], []
+    for _ in range(opts.repeat):
+        start = time.perf_counter()
+        pricing = price_fleet(types, values, ages, coverages, add_ons)
+        priced = time.perf_counter()
+        vectorized = fleet_breakdowns(pricing, add_ons)
+        done = time.perf_counter()
+        scalar = [price_vehicle(*row) for row in zip(types, values, ages, coverages, add_ons)]
+        scalar_done = time.perf_counter()
+        pricing_ms.append((priced - start) * 1000)
+        breakdown_ms.append((done - start) * 1000)
+        scalar_ms.append((scalar_done - done) * 1000)
+
+    mismatches = sum(1 for a, b in zip(vectorized, scalar) if a != b)
+    print(f"{opts.vehicles:,} vehicles")
+    print(f"  vectorized pricing:       {min(pricing_ms):8.2f} ms")
+    print(f"  + per-vehicle breakdowns: {min(breakdown_ms):8.2f} ms")
+    print(f"  scalar loop:              {min(scalar_ms):8.2f} ms")
+    print(f"  mismatches vs scalar:     {mismatches}")
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
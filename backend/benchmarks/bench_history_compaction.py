@@ -0,0 +1,96 @@
+"""
+Benchmark for conversation history compaction
+
+Simulates a long motor-insurance call (user turns, assistant replies and tool
+results) and builds the request history for every turn with and without a
+HistoryCompactor. The summarizer is a local LLM that answers with a fixed-size
+call state after a delay, so the run is offline and repeatable. Reports
+estimated request tokens at the start, middle and end of the call, and the
+time view() adds to each request.
+
+Usage: python benchmarks/bench_history_compaction.py [--turns 60] [--summary-ms 800]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from livekit.agents import APIConnectOptions, llm  # noqa: E402
+from livekit.agents.types import DEFAULT_API_CONNECT_OPTIONS  # noqa: E402
+
+from pipeline.compaction import HistoryCompactor, item_tokens  # noqa: E402
+from prompts import SYSTEM_PROMPT  # noqa: E402
+
+
+class LocalSummarizer(llm.LLM):
+    """Answers every request with the same call state after a fixed delay."""
+
+    def __init__(self, delay: float) -> None:
+        super().__init__()
+        self.delay = delay
+
+    def chat(self, *, chat_ctx: llm.ChatContext, tools=None, conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS, **kwargs) -> llm.LLMStream:
+        return _LocalStream(self, chat_ctx=chat_ctx, tools=tools or [], conn_options=conn_options)
+
+
+class _LocalStream(llm.LLMStream):
+    async def _run(self) -> None:
+        await asyncio.sleep(self._llm.delay)
+        state = "Customer 1001 Rahul Sharma, Swift MH01AB1234, comprehensive quote 8500 from Bajaj. " * 8
+        self._event_ch.send_nowait(llm.ChatChunk(id="summary", delta=llm.ChoiceDelta(role="assistant", content=state)))
+
+
+def tool_output(turn: int) -> str:
+    quotes = [{"insurer": f"Insurer {i}", "premium": 8000 + 150 * i, "idv": 450000, "add_ons": ["Zero Depreciation", "Engine Protection"]} for i in range(6)]
+    return json.dumps({"turn": turn, "quotes": quotes})
+
+
+async def run(turns: int, summary_s: float, compact: bool) -> list:
+    compactor = HistoryCompactor(LocalSummarizer(summary_s), enabled=compact)
+    history = llm.ChatContext()
+    history.add_message(role="system", content=SYSTEM_PROMPT)
+    sent, overhead = [], []
+    for turn in range(turns):
+        history.add_message(role="user", content=f"Turn {turn}: is car ke liye aur quotes dikhao, zero dep ke saath kitna hoga?")
+        if turn % 2 == 0:
+            call = llm.FunctionCall(call_id=f"call_{turn}", name="get_vehicle_insurance_quotes", arguments='{"vehicle_type": "four_wheeler"}')
+            history.insert(call)
+            history.insert(llm.FunctionCallOutput(call_id=f"call_{turn}", name=call.name, output=tool_output(turn), is_error=False))
+        start = time.perf_counter()
+        request = compactor.view(history)
+        overhead.append(time.perf_counter() - start)
+        sent.append(sum(item_tokens(item) for item in request.items))
+        history.add_message(role="assistant", content="Bajaj ka comprehensive plan aapke liye sabse accha rahega, premium lagbhag 8500 hai. " * 2)
+        # Roughly the time a spoken turn takes, for background summaries to land
+        await asyncio.sleep(summary_s / 2)
+    await compactor.aclose()
+    return [sent, overhead, compactor.stats()]
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--turns", type=int, default=60)
+    parser.add_argument("--summary-ms", type=int, default=800)
+    opts = parser.parse_args()
+
+    for compact in (False, True):
+        sent, overhead, stats = await run(opts.turns, opts.summary_ms / 1000, compact)
+        label = "compacted" if compact else "full history"
+        marks = [sent[0], sent[len(sent) // 2], sent[-1]]
+        print(f"{label:>12}: request tokens start {marks[0]:,}, middle {marks[1]:,}, end {marks[2]:,}; "
+              f"total {sum(sent):,}")
+        if compact:
+            us = np.array(overhead) * 1e6
+            print(f"{'':>12}  {stats['compactions']} compactions, view() p50 {np.percentile(us, 50):.0f} us, "
+                  f"p99 {np.percentile(us, 99):.0f} us")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,80 @@
+"""
+Offline tail-latency test for the multi-insurer quote fan-out
+
+Runs repeated fan-outs against StubInsurerAdapter instances built from a
+synthetic catalog and reports how long callers wait and how many insurers
+answered, timed out or were still pending when the budget ran out.
+
+Usage: python benchmarks/bench_insurer_fanout.py [--insurers 45] [--requests 200]
+       [--latency-ms 50,300] [--tail-rate 0.02] [--failure-rate 0.02] [--budget-ms 1200]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_rate_catalog import synthetic_catalog  # noqa: E402
+from tools.insurers import QuoteRequest, StubInsurerAdapter, fan_out_quotes  # noqa: E402
+from tools.rate_catalog import RateCatalog  # noqa: E402
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def run(opts) -> None:
+    catalog = RateCatalog(synthetic_catalog(opts.insurers, plans=1))
+    rng = random.Random(opts.seed)
+    latency = tuple(float(v) / 1000 for v in opts.latency_ms.split(","))
+    adapters = [
+        StubInsurerAdapter(
+            company, catalog,
+            latency=latency,
+            failure_rate=opts.failure_rate,
+            tail_rate=opts.tail_rate,
+            rng=random.Random(rng.random())
+        )
+        for company in catalog.companies
+    ]
+    request = QuoteRequest("four_wheeler", "Maruti Swift", 3, "comprehensive", "Mumbai")
+
+    elapsed, answered, pending, unavailable = [], [], [], []
+    for _ in range(opts.requests):
+        result = await fan_out_quotes(adapters, request, opts.deadline_ms / 1000, opts.budget_ms / 1000)
+        elapsed.append(result.elapsed * 1000)
+        answered.append(len(adapters) - len(result.pending) - len(result.unavailable))
+        pending.append(len(result.pending))
+        unavailable.append(len(result.unavailable))
+
+    print(f"{len(adapters)} insurers, {opts.requests} fan-outs, budget {opts.budget_ms} ms, "
+          f"per-insurer deadline {opts.deadline_ms} ms")
+    print(f"  wait p50/p95/p99:      {percentile(elapsed, 50):7.1f} / {percentile(elapsed, 95):7.1f} / "
+          f"{percentile(elapsed, 99):7.1f} ms")
+    print(f"  insurers answered:     {statistics.mean(answered):7.1f} avg")
+    print(f"  pending at budget:     {statistics.mean(pending):7.2f} avg")
+    print(f"  failed / timed out:    {statistics.mean(unavailable):7.2f} avg")
+    print(f"  complete comparisons:  {sum(1 for p, u in zip(pending, unavailable) if not p and not u)}"
+          f" / {opts.requests}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--insurers", type=int, default=45)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--latency-ms", default="50,300")
+    parser.add_argument("--tail-rate", type=float, default=0.02)
+    parser.add_argument("--failure-rate", type=float, default=0.02)
+    parser.add_argument("--deadline-ms", type=float, default=1000)
+    parser.add_argument("--budget-ms", type=float, default=1200)
+    parser.add_argument("--seed", type=int, default=3)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""
+Harness for latency-aware provider routing
+
+Puts two local stand-in providers behind RoutedLLM, RoutedTTS and RoutedSTT
+and drives requests through four phases: both healthy, the primary's latency
+spikes past the budget, the primary stalls outright, and the primary
+recovers. For each modality and phase it prints which provider served the
+requests, the p95 latency the caller saw and how many requests failed over.
+Windows and cooldowns are shortened so the run takes seconds.
+
+Usage: python benchmarks/bench_provider_routing.py [--requests 40]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from collections import Counter
+from typing import Any, Dict, List
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from livekit import rtc  # noqa: E402
+from livekit.agents import APIConnectOptions, llm, stt, tts, utils  # noqa: E402
+from livekit.agents.types import DEFAULT_API_CONNECT_OPTIONS  # noqa: E402
+
+from pipeline import routing  # noqa: E402
+from pipeline.routing import ModalityRouter, RoutedLLM, RoutedSTT, RoutedTTS  # noqa: E402
+
+
+SAMPLE_RATE = 24000
+
+# Seconds of first-response latency per phase; None stalls the request
+PHASES: List[Dict[str, Any]] = [
+    {"name": "healthy", "primary": 0.05, "backup": 0.12},
+    {"name": "primary spikes", "primary": 0.35, "backup": 0.12},
+    {"name": "primary stalls", "primary": None, "backup": 0.12},
+    {"name": "primary recovers", "primary": 0.05, "backup": 0.12}
+]
+
+
+class Behaviour:
+    """Latency of a stand-in provider, changed by the harness between phases."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.latency = 0.05
+        self.served = 0
+
+    async def wait(self) -> None:
+        if self.latency is None:
+            await asyncio.sleep(3600)
+        await asyncio.sleep(self.latency)
+        self.served += 1
+
+
+class StandInLLM(llm.LLM):
+    def __init__(self, behaviour: Behaviour) -> None:
+        super().__init__()
+        self.behaviour = behaviour
+
+    @property
+    def model(self) -> str:
+        return self.behaviour.name
+
+    @property
+    def provider(self) -> str:
+        return "stand-in"
+
+    def chat(self, *, chat_ctx: llm.ChatContext, tools=None, conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS, **kwargs) -> llm.LLMStream:
+        return _StandInLLMStream(self, chat_ctx=chat_ctx, tools=tools or [], conn_options=conn_options)
+
+
+class _StandInLLMStream(llm.LLMStream):
+    async def _run(self) -> None:
+        await self._llm.behaviour.wait()
+        self._event_ch.send_nowait(llm.ChatChunk(id="stand-in", delta=llm.ChoiceDelta(role="assistant", content="Ji")))
+
+
+class StandInTTS(tts.TTS):
+    def __init__(self, behaviour: Behaviour, sample_rate: int = SAMPLE_RATE) -> None:
+        super().__init__(capabilities=tts.TTSCapabilities(streaming=False), sample_rate=sample_rate, num_channels=1)
+        self.behaviour = behaviour
+
+    @property
+    def model(self) -> str:
+        return self.behaviour.name
+
+    @property
+    def provider(self) -> str:
+        return "stand-in"
+
+    def synthesize(self, text: str, *, conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS) -> tts.ChunkedStream:
+        return _StandInChunkedStream(tts=self, input_text=text, conn_options=conn_options)
+
+
+class _StandInChunkedStream(tts.ChunkedStream):
+    async def _run(self, output_emitter: tts.AudioEmitter) -> None:
+        output_emitter.initialize(
+            request_id=utils.shortuuid(), sample_rate=self._tts.sample_rate, num_channels=1, mime_type="audio/pcm"
+        )
+        await self._tts.behaviour.wait()
+        output_emitter.push(bytes(self._tts.sample_rate // 5 * 2))
+        output_emitter.flush()
+
+
+class StandInSTT(stt.STT):
+    """Finalizes every utterance (one pushed frame plus a flush) after its latency."""
+
+    def __init__(self, behaviour: Behaviour) -> None:
+        super().__init__(capabilities=stt.STTCapabilities(streaming=True, interim_results=True))
+        self.behaviour = behaviour
+
+    @property
+    def model(self) -> str:
+        return self.behaviour.name
+
+    @property
+    def provider(self) -> str:
+        return "stand-in"
+
+    async def _recognize_impl(self, buffer, *, language=None, conn_options=None) -> stt.SpeechEvent:
+        raise NotImplementedError
+
+    def stream(self, *, language=None, conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS) -> stt.RecognizeStream:
+        return _StandInSpeechStream(stt=self, conn_options=conn_options)
+
+
+class _StandInSpeechStream(stt.RecognizeStream):
+    async def _run(self) -> None:
+        audio_s = 0.0
+        async for data in self._input_ch:
+            if isinstance(data, rtc.AudioFrame):
+                audio_s += data.duration
+                self._event_ch.send_nowait(stt.SpeechEvent(
+                    type=stt.SpeechEventType.INTERIM_TRANSCRIPT,
+                    alternatives=[stt.SpeechData(language="hi", text="haan")]
+                ))
+                continue
+            await self._stt.behaviour.wait()
+            self._event_ch.send_nowait(stt.SpeechEvent(
+                type=stt.SpeechEventType.FINAL_TRANSCRIPT,
+                alternatives=[stt.SpeechData(
+                    language="hi", text="haan", start_time=self.start_time_offset,
+                    end_time=self.start_time_offset + audio_s
+                )]
+            ))
+
+
+def make_pair(kind: type) -> List[Any]:
+    return [kind(Behaviour("primary")), kind(Behaviour("backup"))]
+
+
+async def drive_llm(routed: RoutedLLM) -> None:
+    chat_ctx = llm.ChatContext()
+    chat_ctx.add_message(role="user", content="Namaste")
+    async with routed.chat(chat_ctx=chat_ctx) as stream:
+        async for _ in stream:
+            break
+
+
+async def drive_tts(routed: RoutedTTS) -> None:
+    async with routed.synthesize("Ji bilkul") as stream:
+        async for _ in stream:
+            break
+
+
+class LiveAudio:
+    """Pushes audio as a call would: as much as the wall clock has advanced since the last push."""
+
+    def __init__(self, stream: stt.RecognizeStream) -> None:
+        self.stream = stream
+        self.pushed_until = time.perf_counter()
+
+    def push(self) -> None:
+        now = time.perf_counter()
+        samples = max(int((now - self.pushed_until) * SAMPLE_RATE), SAMPLE_RATE // 50)
+        self.pushed_until += samples / SAMPLE_RATE
+        self.stream.push_frame(rtc.AudioFrame(bytes(samples * 2), SAMPLE_RATE, 1, samples))
+
+
+async def drive_stt(audio: LiveAudio) -> None:
+    stream = audio.stream
+    audio.push()
+    stream.flush()
+    async for event in stream:
+        if event.type == stt.SpeechEventType.FINAL_TRANSCRIPT:
+            return
+
+
+async def run_phase(name: str, drive, providers: List[Any], router: ModalityRouter, requests: int) -> None:
+    served_before = [p.behaviour.served for p in providers]
+    failovers_before = router.failovers
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        await drive()
+        latencies.append(time.perf_counter() - start)
+    served = Counter({p.behaviour.name: p.behaviour.served - before for p, before in zip(providers, served_before)})
+    print(f"  {name:<17} served {dict(served)}, p95 {np.percentile(latencies, 95) * 1000:>6.0f} ms, "
+          f"failovers {router.failovers - failovers_before}")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=40)
+    opts = parser.parse_args()
+
+    routing.WINDOW_S = 3.0
+    routing.COOLDOWN_S = 1.0
+    routing.LATENCY_BUDGETS.update({"stt": 0.2, "llm": 0.2, "tts": 0.2})
+    routing.STALL_TIMEOUTS.update({"stt": 0.5, "llm": 0.5, "tts": 0.5})
+
+    llm_providers = make_pair(StandInLLM)
+    # The backup produces 16 kHz audio, which the router resamples
+    tts_providers = [StandInTTS(Behaviour("primary")), StandInTTS(Behaviour("backup"), sample_rate=16000)]
+    stt_providers = make_pair(StandInSTT)
+    routed_llm = RoutedLLM(llm_providers, router=ModalityRouter("llm", ["primary", "backup"]))
+    routed_tts = RoutedTTS(tts_providers, router=ModalityRouter("tts", ["primary", "backup"]))
+    routed_stt = RoutedSTT(stt_providers, router=ModalityRouter("stt", ["primary", "backup"]))
+    # One long STT stream, as in a session: failover has to happen inside it
+    stt_stream = routed_stt.stream()
+    stt_audio = LiveAudio(stt_stream)
+
+    modalities = [
+        ("llm", lambda: drive_llm(routed_llm), llm_providers, routed_llm.router),
+        ("tts", lambda: drive_tts(routed_tts), tts_providers, routed_tts.router),
+        ("stt", lambda: drive_stt(stt_audio), stt_providers, routed_stt.router)
+    ]
+    for phase in PHASES:
+        for providers in (llm_providers, tts_providers, stt_providers):
+            providers[0].behaviour.latency = phase["primary"]
+            providers[1].behaviour.latency = phase["backup"]
+        if phase["name"] == "primary recovers":
+            # Let the bad samples age out, as they would between calls
+            await asyncio.sleep(routing.WINDOW_S)
+        print(phase["name"])
+        for modality, drive, providers, router in modalities:
+            await run_phase(modality, drive, providers, router, opts.requests)
+    await stt_stream.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
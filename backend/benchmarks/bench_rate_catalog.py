@@ -0,0 +1,136 @@
+"""
+Micro-benchmark for the indexed rate catalog
+
+Compares the original per-call quote building (fresh dict literals plus two
+adjustment loops) against lookups on the precomputed RateCatalog, first with the
+bundled catalog and then with a synthetic catalog of a few thousand rows.
+
+Usage: python benchmarks/bench_rate_catalog.py [--insurers 45] [--plans 20]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.rate_catalog import DEFAULT_CATALOG_PATH, RateCatalog  # noqa: E402
+
+
+VEHICLE_TYPES = ["two_wheeler", "four_wheeler", "commercial"]
+COVERAGE_TYPES = ["third_party", "comprehensive", "zero_dep"]
+
+
+def legacy_quotes(rows_by_type: Dict[str, List[Dict[str, Any]]], vehicle_type: str,
+                  vehicle_age: int, coverage_type: str) -> Dict[str, Any]:
+    """The pre-catalog algorithm: rebuild every row, then loop twice to adjust it."""
+    quotes = {"quotes": [
+        {
+            "company": row["company"],
+            "premium": row["premium"],
+            "coverage": row["coverage"],
+            "features": list(row["features"]),
+            "discount": row["discount"],
+        }
+        for row in rows_by_type.get(vehicle_type, [])
+    ]}
+    for quote in quotes["quotes"]:
+        if vehicle_age > 5:
+            quote["premium"] = int(quote["premium"] * 1.2)
+        elif vehicle_age < 2:
+            quote["premium"] = int(quote["premium"] * 0.9)
+    for quote in quotes["quotes"]:
+        if coverage_type == "third_party":
+            quote["premium"] = int(quote["premium"] * 0.6)
+            quote["coverage"] = int(quote["coverage"] * 0.5)
+        elif coverage_type == "zero_dep":
+            quote["premium"] = int(quote["premium"] * 1.3)
+            quote["coverage"] = int(quote["coverage"] * 1.2)
+    return quotes
+
+
+def synthetic_catalog(insurers: int, plans: int, seed: int = 7) -> Dict[str, Any]:
+    with open(DEFAULT_CATALOG_PATH, encoding="utf-8") as f:
+        data = json.load(f)
+    rng = random.Random(seed)
+    base = {"two_wheeler": 2300, "four_wheeler": 8000, "commercial": 14500}
+    data["quotes"] = [
+        {
+            "company": f"Insurer {i:02d}",
+            "vehicle_type": vehicle_type,
+            "premium": int(base[vehicle_type] * rng.uniform(0.8, 1.3)),
+            "coverage": int(base[vehicle_type] * 60 * rng.uniform(0.8, 1.2)),
+            "features": rng.sample(["Roadside Assistance", "Zero Depreciation", "Engine Protection",
+                                    "Cashless Claims", "Key Replacement", "Driver Cover"], 2),
+            "discount": f"Plan {p}",
+        }
+        for i in range(insurers)
+        for vehicle_type in VEHICLE_TYPES
+        for p in range(plans)
+    ]
+    return data
+
+
+def calls_per_second(fn: Callable[..., Any], args: List[tuple], min_seconds: float = 1.0) -> float:
+    calls = 0
+    start = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < min_seconds:
+        for a in args:
+            fn(*a)
+        calls += len(args)
+        elapsed = time.perf_counter() - start
+    return calls / elapsed
+
+
+def run(label: str, data: Dict[str, Any]) -> None:
+    rows_by_type: Dict[str, List[Dict[str, Any]]] = {}
+    for row in data["quotes"]:
+        rows_by_type.setdefault(row["vehicle_type"], []).append(row)
+
+    # Load through a real file so the timing includes the one-off parse cost
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+        json.dump(data, f)
+    try:
+        start = time.perf_counter()
+        catalog = RateCatalog.from_file(f.name)
+        load_ms = (time.perf_counter() - start) * 1000
+    finally:
+        os.unlink(f.name)
+
+    args = [(v, a, c) for v in VEHICLE_TYPES for a in range(0, 12) for c in COVERAGE_TYPES]
+
+    # Both paths must agree row for row before their speed is worth comparing
+    for v, a, c in args:
+        expected = [
+            (q["company"], q["premium"], q["coverage"], tuple(q["features"]), q["discount"])
+            for q in legacy_quotes(rows_by_type, v, a, c)["quotes"]
+        ]
+        assert list(catalog.quotes(v, c, a)) == expected, (v, a, c)
+
+    before = calls_per_second(lambda v, a, c: legacy_quotes(rows_by_type, v, a, c), args)
+    after = calls_per_second(lambda v, a, c: {"quotes": catalog.quotes(v, c, a)}, args)
+
+    print(f"{label}: {catalog.row_count} rows, {catalog.insurer_count} insurers, loaded in {load_ms:.1f} ms")
+    print(f"  before: {before:>14,.0f} calls/s")
+    print(f"  after:  {after:>14,.0f} calls/s  ({after / before:,.1f}x)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--insurers", type=int, default=45)
+    parser.add_argument("--plans", type=int, default=20)
+    opts = parser.parse_args()
+
+    with open(DEFAULT_CATALOG_PATH, encoding="utf-8") as f:
+        run("bundled catalog", json.load(f))
+    run("synthetic catalog", synthetic_catalog(opts.insurers, opts.plans))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Throughput benchmark for bulk registration validation
+
+Writes a synthetic fleet onboarding CSV (registration plus a few other
+columns, with a small share of invalid numbers) and validates it with
+validate_registration_file, reporting registrations per second.
+
+Usage: python benchmarks/bench_registration_validator.py [--rows 5000000] [--invalid-rate 0.001]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.registration import STATE_CODES, validate_registration_file  # noqa: E402
+
+
+def write_fleet_file(path: str, rows: int, invalid_rate: float, seed: int = 5) -> None:
+    rng = random.Random(seed)
+    states = list(STATE_CODES)
+    invalid = ["MH1AB1234", "KA02EF90", "dl05cd5678", "", "TN10XYZW1234"]
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("registration,make,model,year\n")
+        batch = []
+        for i in range(rows):
+            if rng.random() < invalid_rate:
+                reg = rng.choice(invalid)
+            else:
+                reg = f"{rng.choice(states)}{i % 99 + 1:02d}{'ABC'[:i % 3 + 1]}{i % 10000:04d}"
+            batch.append(f"{reg},Tata,Ace,{2015 + i % 10}\n")
+            if len(batch) == 100_000:
+                f.writelines(batch)
+                batch.clear()
+        f.writelines(batch)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--invalid-rate", type=float, default=0.001)
+    opts = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "fleet.csv")
+        write_fleet_file(path, opts.rows, opts.invalid_rate)
+        size_mb = os.path.getsize(path) / 1e6
+
+        start = time.perf_counter()
+        result = validate_registration_file(path, column="registration")
+        elapsed = time.perf_counter() - start
+
+    print(f"{result.total:,} registrations ({size_mb:.0f} MB) in {elapsed:.2f} s")
+    print(f"  throughput: {result.total / elapsed:,.0f} registrations/s")
+    print(f"  valid {result.valid:,}, invalid {result.invalid:,}, states {len(result.by_state)}")
+    print(f"  first invalid rows: {result.invalid_rows[:3]}")
+
+
+if __name__ == "__main__":
+    main()
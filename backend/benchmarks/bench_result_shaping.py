@@ -0,0 +1,112 @@
+"""
+Benchmark for tool result shaping
+
+Plays a scripted call through the record lookup tools against the seeded
+repository and claims store, building the chat context an LLM request would
+carry at each turn: one request before a turn's tool calls and one after.
+For every turn it reports the tokens the tool results in that context cost
+whole and shaped, and the input tokens shaping saved across the turn's
+requests, as the running agent logs them per session ("result shaping
+stats"). Also reports how long shaping a result takes.
+
+Usage: python benchmarks/bench_result_shaping.py [--repeat 20000]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from types import SimpleNamespace
+from typing import List, Tuple
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from livekit.agents import llm  # noqa: E402
+
+from tools import check_claim_status, get_customer_profile, get_policy_details, get_vehicle_details  # noqa: E402
+from tools.shaping import ResultShaper, estimate_tokens  # noqa: E402
+
+
+# Each turn: the caller's utterance and the lookups the LLM makes for it
+CONVERSATION: List[Tuple[str, List[Tuple[llm.FunctionTool, str]]]] = [
+    ("Namaste, meri gaadi ka number 3001 hai", [(get_vehicle_details, "3001")]),
+    ("Yeh gaadi kiske naam pe hai?", [(get_customer_profile, "1001")]),
+    ("Meri policy 2001 kab expire ho rahi hai?", [(get_policy_details, "2001")]),
+    ("Zero dep add-on hai ismein?", []),
+    ("Claim 4001 ka status kya hai?", [(check_claim_status, "4001")]),
+    ("Aur doosri gaadi 3002 ki details?", [(get_vehicle_details, "3002")]),
+    ("Uski policy 2002 bhi check karo", [(get_policy_details, "2002")]),
+    ("Theek hai, shukriya", [])
+]
+
+
+def turn_tokens(chat_ctx: llm.ChatContext, full: dict) -> Tuple[int, int]:
+    """Tokens of the tool results in a request, whole and as sent."""
+    whole = sent = 0
+    for item in chat_ctx.items:
+        if item.type == "function_call_output":
+            whole += full[item.call_id]
+            sent += estimate_tokens(item.output)
+    return whole, sent
+
+
+async def run_call(shaper: ResultShaper) -> None:
+    chat_ctx = llm.ChatContext()
+    full = {}
+    calls = 0
+    print(f"{'utterance':<44} {'requests':>8} {'results whole':>13} {'shaped':>7} {'saved':>6}")
+    for text, lookups in CONVERSATION:
+        chat_ctx.add_message(role="user", content=text)
+        saved_before = shaper.tokens_saved
+        shaper.record_request(chat_ctx)
+        requests = 1
+        for tool, argument in lookups:
+            calls += 1
+            call_id = f"call_{calls}"
+            context = SimpleNamespace(
+                userdata={"result_shaper": shaper}, function_call=SimpleNamespace(call_id=call_id)
+            )
+            output = await tool(context, argument)
+            # What the tool returns unshaped, as the framework would serialize it
+            full[call_id] = estimate_tokens(str(await tool(None, argument)))
+            chat_ctx.items.append(llm.FunctionCall(call_id=call_id, name=tool.id, arguments="{}"))
+            chat_ctx.items.append(llm.FunctionCallOutput(
+                call_id=call_id, name=tool.id, output=str(output), is_error=False
+            ))
+        if lookups:
+            shaper.record_request(chat_ctx)
+            requests += 1
+        chat_ctx.add_message(role="assistant", content="...")
+        whole, sent = turn_tokens(chat_ctx, full)
+        print(f"{text[:44]:<44} {requests:>8} {whole:>13} {sent:>7} {shaper.tokens_saved - saved_before:>6}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repeat", type=int, default=20_000)
+    opts = parser.parse_args()
+
+    shaper = ResultShaper(enabled=True)
+    asyncio.run(run_call(shaper))
+    stats = shaper.stats()
+    print(f"\nresults: {stats['result_tokens_full']} tokens whole, {stats['result_tokens_shaped']} shaped "
+          f"({1 - stats['result_tokens_shaped'] / stats['result_tokens_full']:.1%} fewer)")
+    print(f"input tokens saved: {stats['input_tokens_saved']} over {stats['requests']} requests, "
+          f"{stats['avg_input_tokens_saved_per_turn']} per turn on average, "
+          f"{stats['max_input_tokens_saved_per_turn']} at most")
+
+    record = asyncio.run(get_vehicle_details(None, "3001"))
+    times = []
+    for i in range(opts.repeat):
+        start = time.perf_counter()
+        shaper.shape("get_vehicle_details", record, f"bench_{i}")
+        times.append(time.perf_counter() - start)
+    us = np.array(times) * 1e6
+    print(f"shape: p50 {np.percentile(us, 50):.1f} us, p99 {np.percentile(us, 99):.1f} us")
+
+
+if __name__ == "__main__":
+    main()
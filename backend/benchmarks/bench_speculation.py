@@ -0,0 +1,126 @@
+"""
+Benchmark for speculative LLM generation on stable interim transcripts
+
+A scripted STT plays caller turns as timed interim and final transcripts into a
+Speculator, the way the session delivers them, and the turn is committed a
+while after the final transcript, as the turn detector would. A local LLM
+answers after a fixed time to first token. For each turn the script reports
+whether the speculation was used and the time from end of turn to first token,
+with and without speculation.
+
+Usage: python benchmarks/bench_speculation.py [--stable-ms 300] [--ttft-ms 450] [--eot-ms 600]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import List, NamedTuple, Tuple
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from livekit.agents import ConversationItemAddedEvent, UserInputTranscribedEvent, llm  # noqa: E402
+from livekit.agents.utils import EventEmitter  # noqa: E402
+
+from pipeline.speculation import Speculator  # noqa: E402
+
+
+class Transcript(NamedTuple):
+    at_ms: int
+    text: str
+    is_final: bool
+
+
+# Each turn: transcripts relative to the start of speech, then the final user message
+SCRIPT: List[Tuple[List[Transcript], str]] = [
+    # Interim settles on exactly what is finalized
+    ([Transcript(200, "meri gaadi", False), Transcript(500, "meri gaadi ka claim", False),
+      Transcript(800, "meri gaadi ka claim status batao", False),
+      Transcript(1500, "Meri gaadi ka claim status batao.", True)],
+     "Meri gaadi ka claim status batao."),
+    # Finalized in two segments
+    ([Transcript(200, "mujhe quote", False), Transcript(600, "mujhe quote chahiye", True),
+      Transcript(900, "swift ke liye", False), Transcript(1300, "Swift ke liye.", True)],
+     "mujhe quote chahiye Swift ke liye."),
+    # The caller pauses mid-sentence, then carries on
+    ([Transcript(200, "address change", False), Transcript(400, "address change karna hai", False),
+      Transcript(1200, "address change karna hai aur phone number bhi", False),
+      Transcript(1700, "Address change karna hai aur phone number bhi.", True)],
+     "Address change karna hai aur phone number bhi."),
+    # The final transcript corrects a word of the interim one
+    ([Transcript(200, "policy number", False), Transcript(500, "policy number do hazar ek", False),
+      Transcript(1100, "Policy number 2001.", True)],
+     "Policy number 2001."),
+    # Short confirmation
+    ([Transcript(150, "haan", False), Transcript(600, "Haan.", True)], "Haan.")
+]
+
+
+class FakeSession(EventEmitter):
+    """Stands in for the AgentSession: only the events the Speculator follows."""
+
+
+def local_llm(ttft_s: float):
+    async def generate():
+        await asyncio.sleep(ttft_s)
+        for word in "Ji bilkul, main abhi check karti hoon.".split():
+            yield llm.ChatChunk(id="local", delta=llm.ChoiceDelta(role="assistant", content=word + " "))
+            await asyncio.sleep(0.02)
+    return generate()
+
+
+async def play(opts: argparse.Namespace, enabled: bool) -> List[Tuple[bool, float]]:
+    ttft_s = opts.ttft_ms / 1000
+    speculator = Speculator(lambda transcript: ((), local_llm(ttft_s)), stable_ms=opts.stable_ms, enabled=enabled)
+    session = FakeSession()
+    speculator.attach(session)
+
+    results = []
+    for transcripts, final_text in SCRIPT:
+        start = time.perf_counter()
+        for transcript in transcripts:
+            await asyncio.sleep(max(0.0, start + transcript.at_ms / 1000 - time.perf_counter()))
+            session.emit("user_input_transcribed", UserInputTranscribedEvent(
+                transcript=transcript.text, is_final=transcript.is_final
+            ))
+        # The turn detector commits the turn after the final transcript
+        await asyncio.sleep(opts.eot_ms / 1000)
+        end_of_turn = time.perf_counter()
+        message = llm.ChatMessage(role="user", content=[final_text])
+        session.emit("conversation_item_added", ConversationItemAddedEvent(item=message))
+
+        hits = speculator.hits
+        stream = speculator.take(llm.ChatContext([message]))
+        if stream is None:
+            stream = local_llm(ttft_s)
+        async for _ in stream:
+            results.append((speculator.hits > hits, time.perf_counter() - end_of_turn))
+            break
+        await speculator.aclose()
+    if enabled:
+        print(f"speculator stats: {speculator.stats()}")
+    return results
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--stable-ms", type=int, default=300)
+    parser.add_argument("--ttft-ms", type=int, default=450)
+    parser.add_argument("--eot-ms", type=int, default=600)
+    opts = parser.parse_args()
+
+    baseline = await play(opts, enabled=False)
+    speculative = await play(opts, enabled=True)
+    print(f"{'turn':<48} {'used':>5} {'off ms':>7} {'on ms':>7}")
+    for (_, final_text), (_, off), (hit, on) in zip(SCRIPT, baseline, speculative):
+        print(f"{final_text[:48]:<48} {'yes' if hit else 'no':>5} {off * 1000:>7.0f} {on * 1000:>7.0f}")
+    off = np.array([r[1] for r in baseline]) * 1000
+    on = np.array([r[1] for r in speculative]) * 1000
+    print(f"end of turn to first token: mean {off.mean():.0f} ms without, {on.mean():.0f} ms with speculation")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,146 @@
+"""
+Benchmark for single-flight tool lookups and the per-turn tool deadline
+
+Simulates sessions that arrive together and, in one LLM step, call
+get_customer_profile, get_customer_policies and get_vehicle_details for a
+caller drawn from a few hot customers, as the session runs them: concurrently.
+The repository sits on the seeded SQLite database behind a stand-in that adds
+latency to every query. Each round runs with the single flight and without it,
+and reports the queries that reached the database and the time to finish
+each session's tool step. A last round makes the database slower than the
+turn deadline and shows the calls that were cut off, and a retry joining the
+lookup still in flight.
+
+Usage: python benchmarks/bench_tool_concurrency.py [--sessions 50] [--customers 3] [--latency-ms 40,120]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+from typing import Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from livekit.agents import ToolError  # noqa: E402
+
+from tools import get_customer_policies, get_customer_profile, get_vehicle_details  # noqa: E402
+from tools.cache import TTLCache  # noqa: E402
+from tools.concurrency import SingleFlight, get_turn_deadlines  # noqa: E402
+from tools.repository import Database, Repository, SQLitePool, set_repository  # noqa: E402
+
+
+# Seeded customers and the registration of one of their vehicles
+CUSTOMERS = [("1001", "3001"), ("1002", "3002"), ("1003", "3003")]
+
+
+class SlowDatabase(Database):
+    """Seeded SQLite database that takes latency seconds more to answer each query."""
+
+    def __init__(self, db: Database, latency: Tuple[float, float], rng: random.Random) -> None:
+        self.db = db
+        self.latency = latency
+        self.rng = rng
+        self.queries = 0
+
+    async def _delay(self) -> None:
+        self.queries += 1
+        await asyncio.sleep(self.rng.uniform(*self.latency))
+
+    async def fetch_one(self, query: str, params: Sequence[Any]) -> Optional[Tuple[Any, ...]]:
+        await self._delay()
+        return await self.db.fetch_one(query, params)
+
+    async def fetch_all(self, query: str, params: Sequence[Any]) -> List[Tuple[Any, ...]]:
+        await self._delay()
+        return await self.db.fetch_all(query, params)
+
+    async def execute(self, query: str, params: Sequence[Any]) -> int:
+        await self._delay()
+        return await self.db.execute(query, params)
+
+
+class NoFlight(SingleFlight):
+    """Every caller runs its own execution."""
+
+    async def do(self, key, fn):
+        self.executions += 1
+        return await fn()
+
+
+def tool_context(turn: str) -> SimpleNamespace:
+    return SimpleNamespace(userdata={}, speech_handle=SimpleNamespace(id=turn))
+
+
+async def tool_step(turn: str, customer_id: str, registration: str) -> Tuple[float, int]:
+    """One LLM step's tool calls, run concurrently; returns its duration and the calls cut off."""
+    context = tool_context(turn)
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        get_customer_profile(context, customer_id),
+        get_customer_policies(context, customer_id),
+        get_vehicle_details(context, registration),
+        return_exceptions=True
+    )
+    return time.perf_counter() - start, sum(isinstance(r, ToolError) for r in results)
+
+
+async def run_round(
+    db: SlowDatabase, flight: SingleFlight, opts: argparse.Namespace, rng: random.Random, name: str
+) -> None:
+    # A fresh cache, so every round starts cold
+    set_repository(Repository(db, TTLCache(maxsize=4096, ttl=60), flight=flight))
+    db.queries = 0
+    callers = [rng.choice(CUSTOMERS[:opts.customers]) for _ in range(opts.sessions)]
+    steps = await asyncio.gather(*(
+        tool_step(f"{name}_{i}", customer_id, registration) for i, (customer_id, registration) in enumerate(callers)
+    ))
+    ms = np.array([duration for duration, _ in steps]) * 1000
+    print(f"{name:<10} {db.queries:>8} {np.percentile(ms, 50):>8.0f} {np.percentile(ms, 95):>8.0f} "
+          f"{sum(cut for _, cut in steps):>8}")
+
+
+async def run(opts: argparse.Namespace) -> None:
+    rng = random.Random(opts.seed)
+    latency = tuple(float(v) / 1000 for v in opts.latency_ms.split(","))
+    pool = SQLitePool(os.path.join(tempfile.mkdtemp(prefix="policy_boss_bench_"), "policy_boss.db"))
+    pool.initialize()
+    db = SlowDatabase(pool, latency, rng)
+
+    print(f"{opts.sessions} sessions, {opts.customers} hot customers, query latency {opts.latency_ms} ms")
+    print(f"{'round':<10} {'queries':>8} {'p50 ms':>8} {'p95 ms':>8} {'cut off':>8}")
+    await run_round(db, NoFlight(), opts, rng, "no flight")
+    flight = SingleFlight()
+    await run_round(db, flight, opts, rng, "flight")
+    print(f"single flight: {flight.stats()}")
+
+    # Queries slower than the turn's whole budget
+    deadlines = get_turn_deadlines()
+    db.latency = (deadlines.deadline * 1.5,) * 2
+    await run_round(db, flight, opts, rng, "slow db")
+    # The lookups cut off above are still running; a retry joins them
+    joined = flight.joined
+    step, cut = await tool_step("retry", *CUSTOMERS[0])
+    print(f"retry after the deadline: {step * 1000:.0f} ms, {cut} cut off, "
+          f"{flight.joined - joined} of 3 calls joined a lookup in flight")
+    print(f"turn deadline: {deadlines.stats()}")
+    pool.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--customers", type=int, default=3, choices=range(1, len(CUSTOMERS) + 1))
+    parser.add_argument("--latency-ms", default="40,120", help="min,max added to every query")
+    parser.add_argument("--seed", type=int, default=7)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Overhead benchmark for per-tool metrics
+
+Calls a trivial async tool bare, through a plain pass-through wrapper and
+through metered(), and reports the per-call cost of each. The metered cost
+minus the bare cost is what instrumentation adds to every tool call.
+
+Usage: python benchmarks/bench_tool_metrics.py [--calls 200000] [--repeat 15]
+"""
+
+import argparse
+import asyncio
+import functools
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from prometheus_client import generate_latest  # noqa: E402
+
+from tools.metrics import get_tool_metrics, metered  # noqa: E402
+
+
+async def lookup(context, key: str = "MH01AB1234") -> dict:
+    return {"key": key}
+
+
+def passthrough(func):
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await func(*args, **kwargs)
+    return wrapper
+
+
+async def run(calls: int, repeat: int) -> None:
+    variants = [("bare", lookup), ("pass-through", passthrough(lookup)), ("metered", metered(lookup))]
+    best = {name: float("inf") for name, _ in variants}
+    # A session context, with no session listening to tool calls as when tracing is off
+    context = SimpleNamespace(userdata={})
+    # Interleave the variants so machine noise hits all of them alike
+    for _ in range(repeat):
+        for name, fn in variants:
+            start = time.perf_counter()
+            for _ in range(calls):
+                await fn(context)
+            best[name] = min(best[name], (time.perf_counter() - start) / calls)
+
+    for name, _ in variants:
+        print(f"{name:>13}: {best[name] * 1e9:7.0f} ns/call")
+    print(f"     overhead: {(best['metered'] - best['bare']) * 1e9:7.0f} ns/call"
+          f" ({(best['metered'] - best['pass-through']) * 1e9:.0f} ns beyond the wrapper itself)")
+
+    start = time.perf_counter()
+    get_tool_metrics().flush()
+    folded = time.perf_counter() - start
+    start = time.perf_counter()
+    text = generate_latest().decode()
+    print(f"fold: {folded * 1e3:.1f} ms for {calls * repeat} samples, "
+          f"render: {(time.perf_counter() - start) * 1e3:.2f} ms, {len(text.splitlines())} lines")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--calls", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=15)
+    opts = parser.parse_args()
+    asyncio.run(run(opts.calls, opts.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark for intent-based tool subsetting
+
+Runs a scripted conversation through a ToolRouter and compares, per LLM
+request, the estimated prompt tokens of the system prompt plus the tool
+schemas sent against sending every tool. Also reports how long classifying
+an utterance takes. Time to first token depends on the provider and is
+logged per session by the running agent ("tool routing stats"); compare
+runs with POLICY_BOSS_TOOL_SUBSETTING=0 and =1.
+
+Usage: python benchmarks/bench_tool_subsetting.py [--repeat 2000]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from livekit.agents import llm  # noqa: E402
+
+from agent import Assistant  # noqa: E402
+from pipeline.intent import ToolRouter, classify  # noqa: E402
+from prompts import SYSTEM_PROMPT  # noqa: E402
+
+
+CONVERSATION = [
+    "Namaste, mujhe insurance ke baare mein kuch samajhna hai",
+    "Health insurance aur motor insurance mein kya fark hai?",
+    "Meri gaadi ka number MH 01 AB 1234 hai",
+    "Is car ke liye comprehensive policy ka quote batao",
+    "Zero dep add-on lene se premium kitna badhega?",
+    "Theek hai, samajh gaya",
+    "Pichle mahine accident hua tha, claim ka status kya hai?",
+    "Haan, wahi wala",
+    "Mera address change karna hai",
+    "Thank you, bas itna hi",
+    "Is month ka commission statement dikhao",
+    "Tax benefit kaise milta hai insurance pe?",
+    # Hindi speech as Deepgram's multilingual model transcribes it
+    "मेरी गाड़ी की पॉलिसी कब एक्सपायर होगी?",
+    "क्लेम का स्टेटस क्या है?"
+]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repeat", type=int, default=2_000)
+    opts = parser.parse_args()
+
+    tools = Assistant().tools
+    router = ToolRouter(enabled=True)
+    system_tokens = len(SYSTEM_PROMPT) // 4
+
+    print(f"{'utterance':<58} {'tools':>5} {'schema tok':>10} {'prompt tok':>10}")
+    full_prompt = sent_prompt = 0
+    for text in CONVERSATION:
+        chat_ctx = llm.ChatContext()
+        chat_ctx.add_message(role="user", content=text)
+        sent_before, full_before = router.schema_tokens_sent, router.schema_tokens_full
+        selected = router.select(chat_ctx, tools)
+        sent = router.schema_tokens_sent - sent_before
+        full = router.schema_tokens_full - full_before
+        sent_prompt += system_tokens + sent
+        full_prompt += system_tokens + full
+        print(f"{text[:58]:<58} {len(selected):>5} {sent:>10} {system_tokens + sent:>10}")
+
+    stats = router.stats()
+    print(f"\nall {len(tools)} tools: {stats['schema_tokens_full'] // stats['requests']} schema tokens per request")
+    print(f"schema tokens saved: {stats['schema_tokens_saved_ratio']:.1%}")
+    print(f"prompt tokens (system prompt + schemas): {sent_prompt:,} vs {full_prompt:,}, "
+          f"{1 - sent_prompt / full_prompt:.1%} fewer")
+
+    times = []
+    for _ in range(opts.repeat):
+        for text in CONVERSATION:
+            start = time.perf_counter()
+            classify(text)
+            times.append(time.perf_counter() - start)
+    us = np.array(times) * 1e6
+    print(f"classify: p50 {np.percentile(us, 50):.1f} us, p99 {np.percentile(us, 99):.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Benchmark for the shared TTS phrase cache
+
+Replays a skewed stream of sentences (a few stock phrases said on every call,
+a long tail said once) against a PhraseCache, storing synthetic PCM on every
+miss. Reports hit ratio, characters saved and lookup/store latency.
+
+Usage: python benchmarks/bench_tts_cache.py [--lookups 20000] [--phrases 2000] [--capacity-mb 64]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipeline.tts_cache import Phrase, PhraseCache, phrase_key  # noqa: E402
+
+
+SAMPLE_RATE = 24000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--lookups", type=int, default=20_000)
+    parser.add_argument("--phrases", type=int, default=2_000)
+    parser.add_argument("--capacity-mb", type=int, default=64)
+    opts = parser.parse_args()
+
+    rng = np.random.default_rng(13)
+    # Zipf-like popularity: phrase i is picked with weight 1 / (i + 1)
+    weights = 1.0 / np.arange(1, opts.phrases + 1)
+    picks = rng.choice(opts.phrases, size=opts.lookups, p=weights / weights.sum())
+    texts = [f"Stock phrase number {i}, ek second main check karti hoon." for i in range(opts.phrases)]
+
+    get_times, put_times = [], []
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = PhraseCache(tmp, capacity_bytes=opts.capacity_mb * 1024 * 1024)
+        for i in picks:
+            text = texts[i]
+            key = phrase_key(text, "voice", "model", SAMPLE_RATE)
+            start = time.perf_counter()
+            phrase = cache.get(key)
+            get_times.append(time.perf_counter() - start)
+            cache.record(key, phrase is not None, len(text))
+            if phrase is None:
+                # About 2.5 s of audio per sentence
+                pcm = rng.integers(-3000, 3000, size=SAMPLE_RATE * 5 // 2, dtype=np.int16).tobytes()
+                start = time.perf_counter()
+                cache.put(key, Phrase(pcm, SAMPLE_RATE, 1), len(text))
+                put_times.append(time.perf_counter() - start)
+        stats = cache.stats()
+        cache.close()
+
+    node = stats["node"]
+    print(f"{opts.lookups:,} lookups over {opts.phrases:,} phrases, {node['slots']} slots")
+    print(f"  hit ratio {node['hit_ratio']:.1%}, characters saved {node['chars_saved']:,} "
+          f"of {node['chars_saved'] + node['chars_synthesized']:,}")
+    get_ms = np.array(get_times) * 1000
+    put_ms = np.array(put_times) * 1000
+    print(f"  get: p50 {np.percentile(get_ms, 50):.3f} ms, p99 {np.percentile(get_ms, 99):.3f} ms")
+    if len(put_ms):
+        print(f"  put: p50 {np.percentile(put_ms, 50):.3f} ms, p99 {np.percentile(put_ms, 99):.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+Offline test of the write-behind journal for customer updates
+
+Runs update_customer_details-style writes against a scratch copy of the
+seeded SQLite database, behind a stand-in that adds latency to every
+statement and can fail a share of them. The script checks four things:
+
+- acknowledgement latency, writing through to the store and journaled;
+- how many statements reached the store once repeated updates of the same
+  fields were coalesced;
+- that every update lands despite injected failures, with the last value of
+  each field winning;
+- crash safety: a child process journals updates and is killed (SIGKILL)
+  with its flush stuck in the store, a torn line is appended to its
+  journal, and a new journal replays it into the store.
+
+Usage: python benchmarks/bench_write_behind.py [--updates 300] [--latency-ms 80,250] [--failure-rate 0.3]
+"""
+
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_tool_concurrency import SlowDatabase  # noqa: E402
+from tools.cache import TTLCache  # noqa: E402
+from tools.journal import WriteBehindJournal  # noqa: E402
+from tools.repository import SQLitePool, Repository  # noqa: E402
+
+
+CUSTOMERS = ("1001", "1002", "1003")
+FIELDS = ("phone", "email", "address")
+COLUMNS = {"phone": 4, "email": 5, "address": 6}
+
+
+class FlakyDatabase(SlowDatabase):
+    """Slow database whose writes fail at the given rate."""
+
+    def __init__(
+        self, db: SQLitePool, latency: Tuple[float, float], rng: random.Random, failure_rate: float
+    ) -> None:
+        super().__init__(db, latency, rng)
+        self.failure_rate = failure_rate
+        self.statements = 0
+
+    async def execute_many(self, statements: Sequence[Tuple[str, Sequence[Any]]]) -> int:
+        await self._delay()
+        if self.rng.random() < self.failure_rate:
+            raise ConnectionError("injected store failure")
+        self.statements += len(statements)
+        return await self.db.execute_many(statements)
+
+    async def execute(self, query: str, params: Sequence[Any]) -> int:
+        await self._delay()
+        if self.rng.random() < self.failure_rate:
+            raise ConnectionError("injected store failure")
+        self.statements += 1
+        return await self.db.execute(query, params)
+
+
+def scratch_pool() -> SQLitePool:
+    pool = SQLitePool(os.path.join(tempfile.mkdtemp(prefix="policy_boss_bench_"), "policy_boss.db"))
+    pool.initialize()
+    return pool
+
+
+def updates(count: int, rng: random.Random) -> List[Tuple[str, str, str]]:
+    return [
+        (customer, field, f"{field}-{i}")
+        for i in range(count)
+        for customer, field in [(rng.choice(CUSTOMERS), rng.choice(FIELDS))]
+    ]
+
+
+def expected(writes: List[Tuple[str, str, str]]) -> Dict[Tuple[str, str], str]:
+    return {(customer, field): value for customer, field, value in writes}
+
+
+async def stored(pool: SQLitePool, customer_id: str, field: str) -> Any:
+    return (await pool.fetch_one("customer_by_id", (customer_id,)))[COLUMNS[field]]
+
+
+async def check_store(pool: SQLitePool, writes: List[Tuple[str, str, str]]) -> int:
+    """Number of fields whose stored value is not the last one written."""
+    wrong = 0
+    for (customer_id, field), value in expected(writes).items():
+        wrong += await stored(pool, customer_id, field) != value
+    return wrong
+
+
+async def acknowledge(repository: Repository, writes: List[Tuple[str, str, str]], gap: float) -> np.ndarray:
+    times = []
+    for customer_id, field, value in writes:
+        start = time.perf_counter()
+        await repository.update_customer_field(customer_id, field, value)
+        times.append(time.perf_counter() - start)
+        await asyncio.sleep(gap)
+    return np.array(times) * 1000
+
+
+async def run(opts: argparse.Namespace) -> None:
+    rng = random.Random(opts.seed)
+    latency = tuple(float(v) / 1000 for v in opts.latency_ms.split(","))
+    writes = updates(opts.updates, rng)
+
+    # Write-through: every update waits for the store, and is lost when it fails
+    pool = scratch_pool()
+    store = FlakyDatabase(pool, latency, rng, 0.0)
+    through = await acknowledge(Repository(store, TTLCache(maxsize=16, ttl=60)), writes[:opts.through], 0.0)
+    print(f"write-through ack: p50 {np.percentile(through, 50):.1f} ms, p95 {np.percentile(through, 95):.1f} ms "
+          f"({opts.through} updates)")
+    pool.close()
+
+    # Write-behind with failures: journaled acks, coalesced batches, retries
+    pool = scratch_pool()
+    store = FlakyDatabase(pool, latency, rng, opts.failure_rate)
+    journal = WriteBehindJournal(store, tempfile.mkdtemp(prefix="policy_boss_journal_"))
+    journal.open()
+    repository = Repository(store, TTLCache(maxsize=16, ttl=60), journal=journal)
+    behind = await acknowledge(repository, writes, opts.gap_ms / 1000)
+    # What a read sees before the store has everything
+    customer_id, field, value = writes[-1]
+    record = await repository.get_customer(customer_id)
+    seen = record["contact"][field] == value
+    flushed = await journal.flush(timeout=120)
+    print(f"write-behind ack:  p50 {np.percentile(behind, 50):.1f} ms, p95 {np.percentile(behind, 95):.1f} ms "
+          f"({len(writes)} updates)")
+    print(f"store statements: {store.statements} for {len(writes)} updates, "
+          f"{journal.coalesced} coalesced, {journal.failures} failed flushes retried")
+    print(f"read before flush saw the update: {seen}; all flushed: {flushed}; "
+          f"fields not at their last value: {await check_store(pool, writes)}")
+    print(f"journal: {journal.stats()}")
+    pool.close()
+
+    # Crash: the child journals updates and is killed with its flush stuck in the store
+    pool = scratch_pool()
+    directory = tempfile.mkdtemp(prefix="policy_boss_journal_")
+    crash_writes = updates(50, rng)
+    child = multiprocessing.get_context("spawn").Process(target=crash_child, args=(directory, crash_writes))
+    child.start()
+    path = os.path.join(directory, f"journal-{child.pid}.jsonl")
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline and journal_lines(path) < len(crash_writes):
+        await asyncio.sleep(0.05)
+    child.kill()
+    child.join()
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"seq": 999999, "ts": 1, "customer_id": "1001", "fie')
+    stuck_before = await check_store(pool, crash_writes)
+    journal = WriteBehindJournal(FlakyDatabase(pool, latency, rng, opts.failure_rate), directory)
+    journal.open()
+    flushed = await journal.flush(timeout=120)
+    print(f"crash: child killed ({child.exitcode}), {stuck_before} fields not in the store; "
+          f"replayed {journal.replayed} updates, all flushed: {flushed}, "
+          f"fields not at their last value: {await check_store(pool, crash_writes)}, "
+          f"journals left: {sorted(os.listdir(directory))}")
+    pool.close()
+
+
+def journal_lines(path: str) -> int:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return sum(1 for _ in f)
+    except FileNotFoundError:
+        return 0
+
+
+def crash_child(directory: str, writes: List[Tuple[str, str, str]]) -> None:
+    """Journal the updates against a store that never answers, and wait to be killed."""
+
+    class StuckDatabase:
+        async def execute_many(self, statements: Any) -> int:
+            await asyncio.sleep(3600)
+            return 0
+
+    async def main() -> None:
+        journal = WriteBehindJournal(StuckDatabase(), directory)
+        journal.open()
+        for customer_id, field, value in writes:
+            await journal.append(customer_id, field, value)
+        await asyncio.sleep(3600)
+
+    asyncio.run(main())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--updates", type=int, default=300)
+    parser.add_argument("--through", type=int, default=30, help="updates written through, for comparison")
+    parser.add_argument("--latency-ms", default="80,250", help="min,max added to every store call")
+    parser.add_argument("--failure-rate", type=float, default=0.3)
+    parser.add_argument("--gap-ms", type=float, default=5.0, help="time between updates")
+    parser.add_argument("--seed", type=int, default=7)
+    # The injected failures would each log a retry warning
+    logging.getLogger("policy-boss.journal").setLevel(logging.ERROR)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Capacity report: sessions per core at a target event-loop lag p95
+
+Reads the JSON-lines file written by a worker run with POLICY_BOSS_LOAD_LOG
+set: the worker's load samples and each job's event-loop lag every few
+seconds. Each job window is matched to the number of sessions the worker was
+running at the time, and for each concurrency level the report prints the p95
+lag across job windows and what a session cost in CPU and memory. The highest
+level that stays within the target, divided by the worker's cores, is the
+sessions per core to size instances with; it is also the value to set
+POLICY_BOSS_MAX_SESSIONS to.
+
+Usage: python benchmarks/capacity_report.py load.jsonl [--target-ms 20]
+"""
+
+import argparse
+import bisect
+import json
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+
+def load(path: str) -> Tuple[List[dict], List[dict]]:
+    workers, jobs = [], []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                (workers if record["kind"] == "worker" else jobs).append(record)
+    workers.sort(key=lambda r: r["ts"])
+    return workers, jobs
+
+
+def by_concurrency(workers: List[dict], jobs: List[dict]) -> Dict[int, List[dict]]:
+    """Group job windows by the sessions the worker reported last before each."""
+    times = [r["ts"] for r in workers]
+    levels: Dict[int, List[dict]] = defaultdict(list)
+    for job in jobs:
+        index = bisect.bisect_right(times, job["ts"]) - 1
+        if index >= 0 and workers[index]["sessions"] > 0:
+            levels[workers[index]["sessions"]].append(job)
+    return levels
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("path")
+    parser.add_argument("--target-ms", type=float, default=20.0, help="p95 event-loop lag to stay within")
+    opts = parser.parse_args()
+
+    workers, jobs = load(opts.path)
+    if not workers or not jobs:
+        print("no worker or job records; run the worker with POLICY_BOSS_LOAD_LOG set")
+        return
+    cores = workers[-1]["cores"]
+    levels = by_concurrency(workers, jobs)
+
+    print(f"{'sessions':>8} {'windows':>8} {'lag p95 ms':>11} {'cpu/session':>12} {'rss/session MB':>15}")
+    supported = 0
+    for sessions in sorted(levels):
+        records = levels[sessions]
+        p95 = np.percentile([r["lag_p95_ms"] for r in records], 95)
+        cpu = np.mean([r["cpu"] for r in records])
+        rss = np.mean([r["rss_mb"] for r in records])
+        print(f"{sessions:>8} {len(records):>8} {p95:>11.1f} {cpu:>12.2f} {rss:>15.0f}")
+        # Capacity ends at the first level over the target, even if a higher one was luckier
+        if p95 <= opts.target_ms and supported == sessions - 1:
+            supported = sessions
+
+    last = workers[-1]
+    print(f"worker: {cores:g} cores, learned {last['session_cpu']:.2f} cores and "
+          f"{last['session_memory_mb']:.0f} MB per session, capacity {last['capacity']}")
+    if supported:
+        print(f"{supported} sessions within a p95 lag of {opts.target_ms:g} ms: "
+              f"{supported / cores:.2f} sessions per core (POLICY_BOSS_MAX_SESSIONS={supported})")
+    else:
+        print(f"no concurrency level stayed within a p95 lag of {opts.target_ms:g} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Synthetic claims generator
+
+Fills a claims database with realistic-looking claims spread over customers,
+policies and vehicles, on top of the seed claims.
+
+Usage: python benchmarks/generate_claims.py --db /tmp/claims.db [--claims 1000000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from typing import Any, Iterator, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.claims_store import OPEN_STATUSES, ClaimsStore  # noqa: E402
+
+
+STATES = ["MH", "DL", "KA", "TN", "GJ", "UP", "HR", "TS", "KL", "RJ", "WB"]
+MODELS = ["Maruti Swift", "Honda Activa", "Tata Ace", "Hyundai i20", "Toyota Innova",
+          "Bajaj Pulsar", "Mahindra Bolero", "TVS Jupiter"]
+CLOSED_STATUSES = ("approved", "settled", "rejected")
+FIRST_NAMES = ["Rahul", "Priya", "Amit", "Sneha", "Vikram", "Anjali", "Rohan", "Kavya"]
+LAST_NAMES = ["Sharma", "Patel", "Singh", "Iyer", "Reddy", "Gupta", "Nair", "Das"]
+
+
+def generate_claims(count: int, seed: int = 42) -> Iterator[Tuple[Any, ...]]:
+    """
+    Yield claim rows in claims table column order.
+
+    Roughly one customer per 4 claims, one policy per 2 claims and one
+    vehicle per policy; about 15% of claims are still open.
+    """
+    rng = random.Random(seed)
+    customers = max(1, count // 4)
+    policies = max(1, count // 2)
+    for i in range(count):
+        policy = rng.randrange(policies)
+        customer = policy % customers
+        status = rng.choice(OPEN_STATUSES) if rng.random() < 0.15 else rng.choice(CLOSED_STATUSES)
+        amount = rng.randrange(2_000, 400_000, 500)
+        yield (
+            f"C{i + 10_000_000}",
+            f"P{policy + 5_000_000}",
+            f"U{customer + 2_000_000}",
+            f"{FIRST_NAMES[customer % 8]} {LAST_NAMES[(customer // 8) % 8]}",
+            MODELS[policy % len(MODELS)],
+            f"{STATES[policy % len(STATES)]}{policy % 99 + 1:02d}AB{policy % 10_000:04d}",
+            f"20{rng.randrange(18, 26)}-{rng.randrange(1, 13):02d}-{rng.randrange(1, 29):02d}",
+            amount,
+            status,
+            int(amount * rng.uniform(0.7, 1.0)) if status in ("approved", "settled") else None,
+            f"{rng.randrange(1, 30)} days",
+            "Synthetic claim"
+        )
+
+
+def populate(store: ClaimsStore, count: int, batch: int = 50_000) -> None:
+    rows = generate_claims(count)
+    while True:
+        chunk = [row for _, row in zip(range(batch), rows)]
+        if not chunk:
+            break
+        store.insert_many(chunk)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--db", required=True)
+    parser.add_argument("--claims", type=int, default=1_000_000)
+    opts = parser.parse_args()
+
+    start = time.perf_counter()
+    store = ClaimsStore(opts.db)
+    store.seed_if_empty()
+    populate(store, opts.claims)
+    store.close()
+    print(f"wrote {opts.claims:,} claims to {opts.db} in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,519 @@
+"""
+Offline load test: concurrent sessions of the real agent against fake providers
+
+Starts N simultaneous AgentSessions running the real Assistant and tools,
+with in-process stand-ins for the speech-to-text, LLM and TTS providers and
+for the caller's audio in and the agent's audio out, so the run needs neither
+network access nor a LiveKit server. Each scripted caller plays one of a set
+of Hinglish and Devanagari Hindi conversations: it speaks, waits for the
+agent's reply to play out, pauses and speaks again. The scripted LLM calls the
+tool a turn needs (when the turn's tool subset offers it, otherwise the turn
+is reported) and then answers, so the tool layer, the repository and the
+per-turn pipeline run as in production.
+
+Sessions run one per process by default, as the worker runs jobs, across
+increasing concurrency levels. For each level the harness reports turns per
+second, end of caller speech to first agent audio (p50/p95/p99), CPU cores and
+RSS per session, and the saturation point: the first level whose p95 exceeds
+--target-ms, by default 20% over the p95 of the first (lightest) level. BVC noise cancellation needs LiveKit Cloud and is not included;
+--vad runs Silero VAD on every session for its CPU cost.
+
+Usage: python benchmarks/load_test.py [--levels 1,2,4,8] [--duration 60] [--target-ms 2500] [--vad]
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import psutil
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from livekit import rtc  # noqa: E402
+from livekit.agents import AgentSession, APIConnectOptions, llm, stt, tts, utils  # noqa: E402
+from livekit.agents.types import DEFAULT_API_CONNECT_OPTIONS  # noqa: E402
+from livekit.agents.utils.hw import get_cpu_monitor  # noqa: E402
+from livekit.agents.voice import io  # noqa: E402
+
+from agent import Assistant  # noqa: E402
+from pipeline.compaction import HistoryCompactor  # noqa: E402
+from pipeline.intent import ToolRouter  # noqa: E402
+from pipeline.tracing import TRACING_ENABLED, TurnTracer  # noqa: E402
+from tools.entities import EntityCache  # noqa: E402
+from tools.prefetch import Prefetcher  # noqa: E402
+from tools.shaping import ResultShaper  # noqa: E402
+
+
+# A turn: what the caller says, and the tool (with arguments) the LLM calls for it
+Turn = Tuple[str, Optional[Tuple[str, Dict[str, Any]]]]
+
+CONVERSATIONS: List[List[Turn]] = [
+    [
+        ("Namaste, mujhe apni policy ke baare mein jaankari chahiye", None),
+        ("Policy number 2001 hai, details batao", ("get_policy_details", {"policy_id": "2001"})),
+        ("Is policy pe koi claim hai kya?", ("get_policy_claims", {"policy_id": "2001"})),
+        ("Theek hai, bahut dhanyavaad", None)
+    ],
+    [
+        ("Customer ID 1001 ki profile dikhao", ("get_customer_profile", {"customer_id": "1001"})),
+        ("Inki saari active policies batao", ("get_customer_policies", {"customer_id": "1001", "policy_status": "active"})),
+        ("Inka phone number update karna hai, naya number 9876500000 hai",
+         ("update_customer_details", {"customer_id": "1001", "field": "phone", "value": "+91 9876500000"})),
+        ("Bas itna hi, shukriya", None)
+    ],
+    [
+        ("Meri Swift ke liye insurance quote chahiye", None),
+        ("Char saal purani gaadi hai, Mumbai mein, comprehensive cover chahiye",
+         ("get_vehicle_insurance_quotes", {"vehicle_type": "four_wheeler", "vehicle_model": "Maruti Swift",
+                                           "vehicle_age": 4, "coverage_type": "comprehensive", "city": "Mumbai"})),
+        ("Zero dep ke saath premium kitna hoga, gaadi ki value paanch lakh hai",
+         ("calculate_premium", {"vehicle_type": "four_wheeler", "vehicle_value": 500000, "vehicle_age": 4,
+                                "coverage_type": "zero_dep"})),
+        ("Achha, main soch ke batata hoon", None)
+    ],
+    [
+        ("Mera claim kahan tak pahuncha?", None),
+        ("Claim ID 4001 hai", ("check_claim_status", {"claim_id": "4001"})),
+        ("Customer 1001 ke aur koi open claims hain?", ("get_customer_open_claims", {"customer_id": "1001"})),
+        ("Theek hai, dhanyavaad", None)
+    ],
+    # Hindi speech comes from Deepgram's multilingual model in Devanagari
+    [
+        ("नमस्ते, मेरी गाड़ी के बारे में जानकारी चाहिए", None),
+        ("रजिस्ट्रेशन नंबर 3001 है", ("get_vehicle_details", {"registration_number": "3001"})),
+        ("इसकी पॉलिसी 2001 की डिटेल्स बताइए", ("get_policy_details", {"policy_id": "2001"})),
+        ("ठीक है, धन्यवाद", None)
+    ]
+]
+
+REPLY = "Ji bilkul, maine aapke liye details check kar li hain, aur kuch madad chahiye toh batayiye."
+
+TOOL_PLANS = {text: plan for conversation in CONVERSATIONS for text, plan in conversation if plan is not None}
+
+SAMPLE_RATE = 16000
+FRAME_MS = 20
+TTS_SAMPLE_RATE = 24000
+
+# Speaking rates of the caller and the agent
+SECONDS_PER_WORD = 0.35
+SECONDS_PER_CHAR = 0.065
+
+# A caller turn with no agent audio after this long counts as an error
+REPLY_TIMEOUT_S = 15.0
+
+
+class Utterance:
+    """What the caller is saying now, shared by its audio input and the scripted STT."""
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self.words = text.split()
+        self.starts_at = time.perf_counter()
+        self.ends_at = self.starts_at + len(self.words) * SECONDS_PER_WORD
+        self.started = False
+        self.finalized = False
+        self.last_interim = 0.0
+
+
+class ScriptedSTT(stt.STT):
+    """Transcribes whatever the caller is saying: interims while it speaks, the final text after its latency."""
+
+    def __init__(self, caller: "Caller") -> None:
+        super().__init__(capabilities=stt.STTCapabilities(streaming=True, interim_results=True))
+        self.caller = caller
+
+    @property
+    def model(self) -> str:
+        return "scripted"
+
+    @property
+    def provider(self) -> str:
+        return "load-test"
+
+    async def _recognize_impl(self, buffer, *, language=None, conn_options=None) -> stt.SpeechEvent:
+        raise NotImplementedError
+
+    def stream(self, *, language=None, conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS) -> stt.RecognizeStream:
+        return _ScriptedSpeechStream(stt=self, conn_options=conn_options)
+
+
+class _ScriptedSpeechStream(stt.RecognizeStream):
+    async def _run(self) -> None:
+        caller = self._stt.caller
+        latency = caller.opts["stt_ms"] / 1000
+        async for data in self._input_ch:
+            utterance = caller.utterance
+            if not isinstance(data, rtc.AudioFrame) or utterance is None or utterance.finalized:
+                continue
+            now = time.perf_counter()
+            if not utterance.started:
+                utterance.started = True
+                self._event_ch.send_nowait(stt.SpeechEvent(type=stt.SpeechEventType.START_OF_SPEECH))
+            if now >= utterance.ends_at:
+                utterance.finalized = True
+                asyncio.get_running_loop().call_later(latency, self._finalize, utterance)
+            elif now - utterance.last_interim >= 0.3:
+                utterance.last_interim = now
+                heard = utterance.words[:max(1, int((now - utterance.starts_at) / SECONDS_PER_WORD))]
+                self._send(stt.SpeechEventType.INTERIM_TRANSCRIPT, " ".join(heard))
+
+    def _finalize(self, utterance: Utterance) -> None:
+        self._send(stt.SpeechEventType.FINAL_TRANSCRIPT, utterance.text)
+        if not self._event_ch.closed:
+            self._event_ch.send_nowait(stt.SpeechEvent(type=stt.SpeechEventType.END_OF_SPEECH))
+
+    def _send(self, kind: stt.SpeechEventType, text: str) -> None:
+        if not self._event_ch.closed:
+            self._event_ch.send_nowait(stt.SpeechEvent(type=kind, alternatives=[stt.SpeechData(language="hi", text=text)]))
+
+
+class ScriptedLLM(llm.LLM):
+    """Calls the tool the caller's turn needs, if the request offers it, and otherwise answers."""
+
+    def __init__(self, opts: Dict[str, Any]) -> None:
+        super().__init__()
+        self.opts = opts
+        # Turns whose tool the request did not offer, e.g. when tool routing misclassified them
+        self.tools_missing = 0
+
+    @property
+    def model(self) -> str:
+        return "scripted"
+
+    @property
+    def provider(self) -> str:
+        return "load-test"
+
+    def chat(self, *, chat_ctx: llm.ChatContext, tools=None, conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS, **kwargs) -> llm.LLMStream:
+        return _ScriptedLLMStream(self, chat_ctx=chat_ctx, tools=tools or [], conn_options=conn_options)
+
+
+class _ScriptedLLMStream(llm.LLMStream):
+    async def _run(self) -> None:
+        opts = self._llm.opts
+        await asyncio.sleep(opts["llm_ttft_ms"] / 1000)
+        last = self._chat_ctx.items[-1] if self._chat_ctx.items else None
+        if last is not None and last.type == "message" and last.role == "user":
+            plan = TOOL_PLANS.get(last.text_content or "")
+            if plan is not None and plan[0] not in {tool.id for tool in self._tools}:
+                self._llm.tools_missing += 1
+            elif plan is not None:
+                name, arguments = plan
+                self._event_ch.send_nowait(llm.ChatChunk(id="scripted", delta=llm.ChoiceDelta(
+                    role="assistant",
+                    tool_calls=[llm.FunctionToolCall(name=name, arguments=json.dumps(arguments), call_id=utils.shortuuid())]
+                )))
+                return
+        words = REPLY.split()
+        for word in words:
+            self._event_ch.send_nowait(llm.ChatChunk(id="scripted", delta=llm.ChoiceDelta(role="assistant", content=word + " ")))
+            await asyncio.sleep(opts["llm_token_ms"] / 1000)
+        prompt_tokens = sum(len(item.text_content or "") for item in self._chat_ctx.items if item.type == "message") // 4
+        self._event_ch.send_nowait(llm.ChatChunk(id="scripted", usage=llm.CompletionUsage(
+            completion_tokens=len(words), prompt_tokens=prompt_tokens, total_tokens=prompt_tokens + len(words)
+        )))
+
+
+class ScriptedTTS(tts.TTS):
+    """Returns silence as long as the text would take to speak, after its time to first byte."""
+
+    def __init__(self, opts: Dict[str, Any]) -> None:
+        super().__init__(capabilities=tts.TTSCapabilities(streaming=False), sample_rate=TTS_SAMPLE_RATE, num_channels=1)
+        self.opts = opts
+
+    @property
+    def model(self) -> str:
+        return "scripted"
+
+    @property
+    def provider(self) -> str:
+        return "load-test"
+
+    def synthesize(self, text: str, *, conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS) -> tts.ChunkedStream:
+        return _ScriptedChunkedStream(tts=self, input_text=text, conn_options=conn_options)
+
+
+class _ScriptedChunkedStream(tts.ChunkedStream):
+    async def _run(self, output_emitter: tts.AudioEmitter) -> None:
+        output_emitter.initialize(
+            request_id=utils.shortuuid(), sample_rate=TTS_SAMPLE_RATE, num_channels=1, mime_type="audio/pcm"
+        )
+        await asyncio.sleep(self._tts.opts["tts_ttfb_ms"] / 1000)
+        samples = int(len(self._input_text) * SECONDS_PER_CHAR * TTS_SAMPLE_RATE)
+        chunk = TTS_SAMPLE_RATE // 10
+        for offset in range(0, samples, chunk):
+            output_emitter.push(bytes(min(chunk, samples - offset) * 2))
+        output_emitter.flush()
+
+
+class CallerAudioInput(io.AudioInput):
+    """The caller's microphone: 20 ms frames of silence in real time (the STT is scripted)."""
+
+    def __init__(self) -> None:
+        super().__init__(label="load-test caller")
+        self._samples = SAMPLE_RATE * FRAME_MS // 1000
+        self._silence = bytes(self._samples * 2)
+        self._next_at: Optional[float] = None
+
+    async def __anext__(self) -> rtc.AudioFrame:
+        now = time.perf_counter()
+        if self._next_at is None:
+            self._next_at = now
+        self._next_at += FRAME_MS / 1000
+        await asyncio.sleep(max(0.0, self._next_at - now))
+        return rtc.AudioFrame(self._silence, SAMPLE_RATE, 1, self._samples)
+
+
+class CallerAudioOutput(io.AudioOutput):
+    """The caller's speaker: plays the agent's audio out in real time and tells the caller when it starts."""
+
+    def __init__(self, caller: "Caller") -> None:
+        super().__init__(label="load-test caller", capabilities=io.AudioOutputCapabilities(pause=False))
+        self.caller = caller
+        self._pushed = 0.0
+        self._started_at = 0.0
+        self._interrupted = asyncio.Event()
+        self._play_task: Optional[asyncio.Task] = None
+
+    async def capture_frame(self, frame: rtc.AudioFrame) -> None:
+        await super().capture_frame(frame)
+        if not self._pushed:
+            self._started_at = time.perf_counter()
+            self.on_playback_started(created_at=time.time())
+            self.caller.on_agent_audio()
+        self._pushed += frame.duration
+
+    def flush(self) -> None:
+        super().flush()
+        if self._pushed:
+            self._interrupted.clear()
+            self._play_task = asyncio.create_task(self._play_out())
+
+    def clear_buffer(self) -> None:
+        if self._pushed:
+            self._interrupted.set()
+
+    async def _play_out(self) -> None:
+        remaining = self._started_at + self._pushed - time.perf_counter()
+        try:
+            await asyncio.wait_for(self._interrupted.wait(), max(remaining, 0.0))
+            interrupted = True
+        except asyncio.TimeoutError:
+            interrupted = False
+        played = min(time.perf_counter() - self._started_at, self._pushed)
+        self._pushed = 0.0
+        self.on_playback_finished(playback_position=played, interrupted=interrupted)
+
+
+class Caller:
+    """One scripted caller and the agent session it talks to."""
+
+    def __init__(self, conversation: List[Turn], opts: Dict[str, Any]) -> None:
+        self.conversation = conversation
+        self.opts = opts
+        self.utterance: Optional[Utterance] = None
+        self.latencies: List[float] = []
+        self.turns = 0
+        self.errors = 0
+        self._replied = asyncio.Event()
+        self._state_changed = asyncio.Event()
+
+    def on_agent_audio(self) -> None:
+        utterance = self.utterance
+        if utterance is not None and utterance.finalized:
+            self.latencies.append(time.perf_counter() - utterance.ends_at)
+            self.utterance = None
+        self._replied.set()
+
+    async def _until_replied(self, session: AgentSession) -> None:
+        """Wait for the agent to start speaking and then go back to listening."""
+        await self._replied.wait()
+        for state in ("speaking", "listening"):
+            while session.agent_state != state:
+                self._state_changed.clear()
+                await self._state_changed.wait()
+
+    async def run(self, until: float) -> Dict[str, Any]:
+        session_llm = ScriptedLLM(self.opts)
+        shaper = ResultShaper()
+        vad = None
+        if self.opts["vad"]:
+            from livekit.plugins import silero
+            vad = silero.VAD.load()
+        session = AgentSession(
+            stt=ScriptedSTT(self),
+            llm=session_llm,
+            tts=ScriptedTTS(self.opts),
+            vad=vad,
+            turn_detection="stt",
+            userdata={
+                "policy_boss_api": {"api_key": "load_test", "agent_id": "AGENT123", "region": "Mumbai"},
+                "prefetcher": Prefetcher(),
+                "entities": EntityCache(),
+                "result_shaper": shaper
+            }
+        )
+        session.on("agent_state_changed", lambda _: self._state_changed.set())
+        session.input.audio = CallerAudioInput()
+        session.output.audio = CallerAudioOutput(self)
+        # With POLICY_BOSS_TRACE_LOG set, turns are traced as in the worker
+        tracer = None
+        if TRACING_ENABLED:
+            tracer = TurnTracer(utils.shortuuid("load_"))
+            tracer.attach(session)
+        assistant = Assistant(
+            router=ToolRouter(), compactor=HistoryCompactor(session_llm), tracer=tracer, shaper=shaper
+        )
+        await session.start(agent=assistant, record=False)
+        try:
+            # Let the greeting play out before the caller starts talking
+            await asyncio.wait_for(self._until_replied(session), REPLY_TIMEOUT_S * 2)
+            turn = 0
+            while time.perf_counter() < until:
+                text, _ = self.conversation[turn % len(self.conversation)]
+                turn += 1
+                self._replied.clear()
+                self.utterance = Utterance(text)
+                try:
+                    await asyncio.wait_for(self._until_replied(session), REPLY_TIMEOUT_S * 2)
+                    self.turns += 1
+                except asyncio.TimeoutError:
+                    self.errors += 1
+                    self.utterance = None
+                await asyncio.sleep(self.opts["think_ms"] / 1000)
+        finally:
+            await session.aclose()
+            if tracer is not None:
+                await tracer.aclose()
+        return {
+            "latencies": self.latencies, "turns": self.turns, "errors": self.errors,
+            "tools_missing": session_llm.tools_missing
+        }
+
+
+def percentile_ms(values: List[float], pct: float) -> float:
+    return float(np.percentile(values, pct) * 1000) if values else float("nan")
+
+
+def run_process(opts: Dict[str, Any], sessions: int, first_index: int, results: Any) -> None:
+    """Entry point of one load-test process: run its sessions and send back what they measured."""
+    results.put(asyncio.run(_run_sessions(opts, sessions, first_index)))
+
+
+async def _run_sessions(opts: Dict[str, Any], sessions: int, first_index: int) -> Dict[str, Any]:
+    process = psutil.Process()
+    cpu_start = sum(process.cpu_times()[:2])
+    start = time.perf_counter()
+    callers = [Caller(CONVERSATIONS[(first_index + i) % len(CONVERSATIONS)], opts) for i in range(sessions)]
+    results = await asyncio.gather(*(caller.run(start + opts["duration"]) for caller in callers), return_exceptions=True)
+    wall = time.perf_counter() - start
+    latencies, turns, errors, tools_missing = [], 0, 0, 0
+    for result in results:
+        if isinstance(result, BaseException):
+            errors += 1
+            continue
+        latencies.extend(result["latencies"])
+        turns += result["turns"]
+        errors += result["errors"]
+        tools_missing += result["tools_missing"]
+    return {
+        "latencies": latencies,
+        "turns": turns,
+        "errors": errors,
+        "tools_missing": tools_missing,
+        "cpu_s": sum(process.cpu_times()[:2]) - cpu_start,
+        "rss_mb": process.memory_info().rss / 1e6,
+        "wall_s": wall
+    }
+
+
+def run_level(opts: argparse.Namespace, sessions: int) -> Dict[str, Any]:
+    processes = math.ceil(sessions / opts.per_process)
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    workers = []
+    for index in range(processes):
+        count = min(opts.per_process, sessions - index * opts.per_process)
+        worker = context.Process(target=run_process, args=(vars(opts), count, index * opts.per_process, queue))
+        worker.start()
+        workers.append(worker)
+    parts = [queue.get() for _ in workers]
+    for worker in workers:
+        worker.join()
+
+    latencies = [latency for part in parts for latency in part["latencies"]]
+    wall = max(part["wall_s"] for part in parts)
+    turns = sum(part["turns"] for part in parts)
+    return {
+        "sessions": sessions,
+        "turns": turns,
+        "errors": sum(part["errors"] for part in parts),
+        "tools_missing": sum(part["tools_missing"] for part in parts),
+        "turns_per_s": turns / wall,
+        "p50_ms": percentile_ms(latencies, 50),
+        "p95_ms": percentile_ms(latencies, 95),
+        "p99_ms": percentile_ms(latencies, 99),
+        "cpu_per_session": sum(part["cpu_s"] for part in parts) / wall / sessions,
+        "rss_mb_per_session": sum(part["rss_mb"] for part in parts) / sessions
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--levels", default="1,2,4,8", help="comma-separated concurrent session counts")
+    parser.add_argument("--duration", type=float, default=60.0, help="seconds each level runs")
+    parser.add_argument("--per-process", type=int, default=1, help="sessions per process; the worker runs one")
+    parser.add_argument("--target-ms", type=float, help="p95 response latency for saturation")
+    parser.add_argument("--stt-ms", type=float, default=250.0, help="speech end to final transcript")
+    parser.add_argument("--llm-ttft-ms", type=float, default=450.0)
+    parser.add_argument("--llm-token-ms", type=float, default=15.0)
+    parser.add_argument("--tts-ttfb-ms", type=float, default=200.0)
+    parser.add_argument("--think-ms", type=float, default=800.0, help="caller pause before speaking again")
+    parser.add_argument("--vad", action="store_true", help="run Silero VAD in every session")
+    parser.add_argument("--json", help="also write the results to this file")
+    opts = parser.parse_args()
+
+    # Keep the tools' writes out of the local databases
+    scratch = tempfile.mkdtemp(prefix="policy_boss_load_")
+    os.environ.setdefault("POLICY_BOSS_DB", os.path.join(scratch, "policy_boss.db"))
+    os.environ.setdefault("POLICY_BOSS_CLAIMS_DB", os.path.join(scratch, "claims.db"))
+    os.environ.setdefault("POLICY_BOSS_LEDGER_DIR", os.path.join(scratch, "ledger"))
+    os.environ.setdefault("POLICY_BOSS_JOURNAL_DIR", os.path.join(scratch, "journal"))
+
+    print(f"{'sessions':>8} {'turns':>6} {'err':>4} {'turns/s':>8} {'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7} "
+          f"{'cpu/sess':>9} {'rss/sess MB':>12}")
+    levels, saturation = [], None
+    for sessions in [int(level) for level in opts.levels.split(",")]:
+        level = run_level(opts, sessions)
+        levels.append(level)
+        print(f"{sessions:>8} {level['turns']:>6} {level['errors']:>4} {level['turns_per_s']:>8.2f} "
+              f"{level['p50_ms']:>7.0f} {level['p95_ms']:>7.0f} {level['p99_ms']:>7.0f} "
+              f"{level['cpu_per_session']:>9.3f} {level['rss_mb_per_session']:>12.0f}")
+        if level["tools_missing"]:
+            print(f"{'':>8} {level['tools_missing']} turns did not get the tool they needed")
+        if opts.target_ms is None:
+            opts.target_ms = round(level["p95_ms"] * 1.2)
+        if saturation is None and not level["p95_ms"] <= opts.target_ms:
+            saturation = sessions
+
+    cores = get_cpu_monitor().cpu_count()
+    if saturation is None:
+        print(f"not saturated: p95 stayed within {opts.target_ms:g} ms up to {levels[-1]['sessions']} sessions "
+              f"on {cores:g} cores")
+    else:
+        print(f"saturated at {saturation} sessions on {cores:g} cores: p95 over {opts.target_ms:g} ms")
+    if opts.json:
+        with open(opts.json, "w", encoding="utf-8") as f:
+            json.dump({"options": vars(opts), "levels": levels, "saturation": saturation}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Job startup report: entrypoint to first agent audio, with and without prewarm
+
+Reads the JSON-lines file written by workers run with POLICY_BOSS_STARTUP_LOG
+set (one record per job) and prints latency percentiles for prewarmed and
+non-prewarmed jobs side by side. To collect both, run the worker once with
+POLICY_BOSS_PREWARM=1 and once with POLICY_BOSS_PREWARM=0 against the same log.
+
+Usage: python benchmarks/startup_report.py startup.jsonl
+"""
+
+import argparse
+import json
+from typing import Dict, List
+
+import numpy as np
+
+
+def load(path: str) -> Dict[bool, List[dict]]:
+    groups: Dict[bool, List[dict]] = {True: [], False: []}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                groups[bool(record["prewarmed"])].append(record)
+    return groups
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("path")
+    opts = parser.parse_args()
+
+    for prewarmed, records in load(opts.path).items():
+        label = "prewarmed" if prewarmed else "not prewarmed"
+        audio = np.array([r["first_audio_ms"] for r in records if r["first_audio_ms"] is not None])
+        loads = np.array([r["model_load_ms"] for r in records])
+        if not len(audio):
+            print(f"{label:>14}: no jobs")
+            continue
+        p50, p95, p99 = np.percentile(audio, [50, 95, 99])
+        print(
+            f"{label:>14}: {len(audio)} jobs, first audio p50 {p50:.0f} ms, p95 {p95:.0f} ms, "
+            f"p99 {p99:.0f} ms; model load on job path avg {loads.mean():.0f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
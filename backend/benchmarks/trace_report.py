@@ -0,0 +1,69 @@
+"""
+Turn trace report: stage-level latency percentiles across sessions
+
+Reads the JSON-lines spans written by workers run with POLICY_BOSS_TRACE_LOG
+set (see pipeline/tracing.py) and prints, for every stage of a turn, how
+many times it ran and its p50 and p95 duration, with tool calls
+broken down by tool. It also counts which stage took longest in the
+slowest 5% of turns, the usual answer to "why was it slow".
+
+Usage: python benchmarks/trace_report.py traces.jsonl
+"""
+
+import argparse
+import json
+from collections import Counter, defaultdict
+from typing import Dict, List
+
+import numpy as np
+
+
+def load(path: str) -> List[dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def stage_name(span: dict) -> str:
+    if span["name"] == "tool_call":
+        return f"tool_call:{span['attributes'].get('tool.name')}"
+    return span["name"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("path")
+    opts = parser.parse_args()
+
+    spans = load(opts.path)
+    turns = {span["span_id"]: span for span in spans if span["name"] == "turn"}
+    if not turns:
+        print("no turns; run the worker with POLICY_BOSS_TRACE_LOG set")
+        return
+    stages: Dict[str, List[float]] = defaultdict(list)
+    children: Dict[str, List[dict]] = defaultdict(list)
+    for span in spans:
+        if span["parent_id"] in turns:
+            stages[stage_name(span)].append(span["duration_ms"])
+            children[span["parent_id"]].append(span)
+
+    sessions = {turn["attributes"].get("session.id") for turn in turns.values()}
+    e2e = np.array([t["attributes"]["turn.e2e_ms"] for t in turns.values() if "turn.e2e_ms" in t["attributes"]])
+    print(f"{len(turns)} turns across {len(sessions)} sessions")
+    if len(e2e):
+        print(f"end of speech to first audio: p50 {np.percentile(e2e, 50):.0f} ms, p95 {np.percentile(e2e, 95):.0f} ms")
+    print(f"{'stage':<40} {'count':>6} {'p50 ms':>8} {'p95 ms':>8}")
+    for name, durations in sorted(stages.items(), key=lambda item: -np.percentile(item[1], 95)):
+        print(f"{name:<40} {len(durations):>6} {np.percentile(durations, 50):>8.0f} {np.percentile(durations, 95):>8.0f}")
+
+    if len(e2e):
+        threshold = np.percentile(e2e, 95)
+        culprits = Counter()
+        for span_id, turn in turns.items():
+            if turn["attributes"].get("turn.e2e_ms", 0) >= threshold and children[span_id]:
+                culprits[stage_name(max(children[span_id], key=lambda span: span["duration_ms"]))] += 1
+        print("longest stage in the slowest 5% of turns: "
+              + ", ".join(f"{name} ({count})" for name, count in culprits.most_common()))
+
+
+if __name__ == "__main__":
+    main()
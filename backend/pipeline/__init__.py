@@ -0,0 +1,6 @@
+"""
+Voice Pipeline Support for Vehicle Insurance Agent
+
+This package contains the worker- and session-level plumbing around the voice
+pipeline: model prewarming and startup measurement.
+"""
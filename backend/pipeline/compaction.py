@@ -0,0 +1,248 @@
+"""
+Conversation History Compaction
+
+This module keeps the history sent with each LLM request bounded on long calls.
+Once the turns not yet summarized cross a token threshold, everything older
+than the last few user turns, tool calls and their outputs included, is folded
+by the LLM into a short call-state block (customer, vehicle, quotes, claims,
+what is still pending). Requests then carry the instructions, the state block
+and the recent turns verbatim.
+
+Summarizing runs in the background, so no request waits on it; until a summary
+is ready, requests simply go out uncompacted. The session's own history is left
+intact for transcripts, and only the copy sent to the LLM is compacted.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Set
+
+from livekit.agents import llm
+
+
+logger = logging.getLogger("policy-boss.compaction")
+
+# Set to 0 to always send the full history
+COMPACTION_ENABLED = os.environ.get("POLICY_BOSS_COMPACTION", "1") != "0"
+
+# Estimated tokens of unsummarized history that trigger a compaction
+TRIGGER_TOKENS = int(os.environ.get("POLICY_BOSS_COMPACT_AT_TOKENS", 3000))
+
+# Most recent user turns that are always sent verbatim
+KEEP_TURNS = int(os.environ.get("POLICY_BOSS_COMPACT_KEEP_TURNS", 3))
+
+# Longest a summary request may take before it is abandoned until the next turn
+SUMMARY_TIMEOUT_S = 20.0
+
+# Wait after a failed summary before trying again
+RETRY_AFTER_S = 30.0
+
+STATE_ITEM_ID = "policy_boss.call_state"
+
+SUMMARY_INSTRUCTIONS = """You maintain the state of a phone call between a PolicyBoss insurance assistant and a caller.
+Given the previous call state and the newer part of the conversation, write the updated call state.
+
+Keep every fact the assistant may need later: customer ID, name and contact details, vehicle registration,
+make, model and year, policy numbers, quotes and premiums with insurer names, claim IDs and their status,
+commission figures, and anything the caller asked for that is still pending. Take the facts from tool
+results without mentioning the tools. Drop greetings and small talk. Use short plain lines, no markdown,
+at most 200 words."""
+
+
+def item_tokens(item: llm.ChatItem) -> int:
+    """Estimate the prompt tokens of a chat item at about four characters per token."""
+    if item.type == "message":
+        return len(item.text_content or "") // 4 + 4
+    if item.type == "function_call":
+        return (len(item.name) + len(item.arguments)) // 4 + 4
+    if item.type == "function_call_output":
+        return len(item.output) // 4 + 4
+    return 0
+
+
+def render_items(items: List[llm.ChatItem]) -> str:
+    """Render chat items as plain lines for the summarizer."""
+    lines = []
+    for item in items:
+        if item.type == "message" and item.role in ("user", "assistant"):
+            text = (item.text_content or "").strip()
+            if text:
+                lines.append(f"{item.role}: {text}")
+        elif item.type == "function_call":
+            lines.append(f"tool call {item.name}: {item.arguments}")
+        elif item.type == "function_call_output":
+            lines.append(f"tool result {item.name}: {item.output}")
+    return "\n".join(lines)
+
+
+class HistoryCompactor:
+    """
+    Per-session history compaction and token accounting.
+
+    Covered items are tracked by id, so the state block always stands in for
+    exactly the items it summarizes, even as new items arrive while a summary
+    is being written.
+    """
+
+    def __init__(
+        self,
+        summarizer: llm.LLM,
+        trigger_tokens: int = TRIGGER_TOKENS,
+        keep_turns: int = KEEP_TURNS,
+        enabled: bool = COMPACTION_ENABLED
+    ) -> None:
+        self.summarizer = summarizer
+        self.trigger_tokens = trigger_tokens
+        self.keep_turns = keep_turns
+        self.enabled = enabled
+        self.state = ""
+        self._covered: Set[str] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._retry_at = 0.0
+        self._item_tokens: Dict[str, int] = {}
+
+        # Token accounting over the session's LLM requests
+        self.requests = 0
+        self.history_tokens_full = 0
+        self.history_tokens_sent = 0
+        self.max_tokens_full = 0
+        self.max_tokens_sent = 0
+        self.compactions = 0
+        self.failures = 0
+        self.summary_seconds = 0.0
+        self.summarizer_prompt_tokens = 0
+        self.summarizer_completion_tokens = 0
+
+    def view(self, chat_ctx: llm.ChatContext, record: bool = True) -> llm.ChatContext:
+        """
+        Return the history to send with a request, starting a compaction if it has grown too long.
+
+        Items already summarized are replaced by the state block, placed right
+        after the instructions. With record=False, as for a speculative request,
+        the request is neither counted nor allowed to start a compaction.
+        """
+        full = sum(self._tokens(item) for item in chat_ctx.items)
+        if not self.enabled:
+            if record:
+                self._count(full, full)
+            return chat_ctx
+
+        items = [item for item in chat_ctx.items if item.id not in self._covered]
+        if self.state:
+            position = 0
+            while position < len(items) and items[position].type == "message" and items[position].role in ("system", "developer"):
+                position += 1
+            items.insert(position, llm.ChatMessage(
+                id=STATE_ITEM_ID,
+                role="system",
+                content=[f"Call state so far (older turns are summarized here):\n{self.state}"]
+            ))
+        sent = sum(self._tokens(item) for item in items)
+        if not record:
+            return llm.ChatContext(items)
+        self._count(full, sent)
+
+        if sent > self.trigger_tokens and self._task is None and time.monotonic() >= self._retry_at:
+            head = self._head(chat_ctx.items)
+            if head:
+                self._task = asyncio.create_task(self._compact(head))
+        return llm.ChatContext(items)
+
+    def _tokens(self, item: llm.ChatItem) -> int:
+        if item.id == STATE_ITEM_ID:
+            return item_tokens(item)
+        tokens = self._item_tokens.get(item.id)
+        if tokens is None:
+            tokens = self._item_tokens[item.id] = item_tokens(item)
+        return tokens
+
+    def _count(self, full: int, sent: int) -> None:
+        self.requests += 1
+        self.history_tokens_full += full
+        self.history_tokens_sent += sent
+        self.max_tokens_full = max(self.max_tokens_full, full)
+        self.max_tokens_sent = max(self.max_tokens_sent, sent)
+
+    def _head(self, items: List[llm.ChatItem]) -> List[llm.ChatItem]:
+        """Return the unsummarized items older than the last keep_turns user turns."""
+        user_turns = 0
+        split = 0
+        for index in range(len(items) - 1, -1, -1):
+            item = items[index]
+            if item.type == "message" and item.role == "user":
+                user_turns += 1
+                if user_turns == self.keep_turns:
+                    split = index
+                    break
+        # Splitting on a user message keeps every tool call together with its output
+        return [
+            item for item in items[:split]
+            if item.id not in self._covered
+            and item.type in ("message", "function_call", "function_call_output")
+            and not (item.type == "message" and item.role in ("system", "developer"))
+        ]
+
+    async def _compact(self, head: List[llm.ChatItem]) -> None:
+        start = time.perf_counter()
+        ctx = llm.ChatContext()
+        ctx.add_message(role="system", content=SUMMARY_INSTRUCTIONS)
+        ctx.add_message(
+            role="user",
+            content=f"Previous call state:\n{self.state or '(none)'}\n\nNewer conversation:\n{render_items(head)}"
+        )
+        try:
+            state = await asyncio.wait_for(self._summarize(ctx), SUMMARY_TIMEOUT_S)
+        except Exception:
+            self.failures += 1
+            self._retry_at = time.monotonic() + RETRY_AFTER_S
+            logger.warning("history compaction failed", exc_info=True)
+            return
+        finally:
+            self._task = None
+
+        if state:
+            self.state = state
+            self._covered.update(item.id for item in head)
+            self.compactions += 1
+            self.summary_seconds += time.perf_counter() - start
+            logger.info("compacted history", extra={
+                "items": len(head),
+                "state_tokens": len(state) // 4,
+                "summary_ms": round((time.perf_counter() - start) * 1000, 1)
+            })
+
+    async def _summarize(self, ctx: llm.ChatContext) -> str:
+        parts = []
+        async with self.summarizer.chat(chat_ctx=ctx) as stream:
+            async for chunk in stream:
+                if chunk.delta is not None and chunk.delta.content:
+                    parts.append(chunk.delta.content)
+                if chunk.usage is not None:
+                    self.summarizer_prompt_tokens += chunk.usage.prompt_tokens
+                    self.summarizer_completion_tokens += chunk.usage.completion_tokens
+        return "".join(parts).strip()
+
+    async def aclose(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        saved = self.history_tokens_full - self.history_tokens_sent
+        return {
+            "enabled": self.enabled,
+            "requests": self.requests,
+            "history_tokens_full": self.history_tokens_full,
+            "history_tokens_sent": self.history_tokens_sent,
+            "history_tokens_saved_ratio": round(saved / self.history_tokens_full, 4) if self.history_tokens_full else 0.0,
+            "max_request_tokens_full": self.max_tokens_full,
+            "max_request_tokens_sent": self.max_tokens_sent,
+            "compactions": self.compactions,
+            "failures": self.failures,
+            "avg_summary_ms": round(self.summary_seconds / self.compactions * 1000, 1) if self.compactions else None,
+            "summarizer_prompt_tokens": self.summarizer_prompt_tokens,
+            "summarizer_completion_tokens": self.summarizer_completion_tokens,
+            "state_tokens": len(self.state) // 4
+        }
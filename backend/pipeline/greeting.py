@@ -0,0 +1,150 @@
+"""
+Pre-rendered Greeting Cache
+
+This module keeps a small pool of synthesized greeting variants on disk, keyed
+by the greeting prompt, voice and TTS model, so a session can start speaking
+from cached audio instead of waiting for an LLM round trip and TTS synthesis.
+Until the pool is full, sessions greet live and their greetings are
+synthesized in the background to fill it.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import random
+from typing import AsyncIterator, List, NamedTuple, Optional
+
+from livekit import rtc
+from livekit.agents import tts
+from livekit.agents.voice import SpeechHandle
+
+
+logger = logging.getLogger("policy-boss.greeting")
+
+CACHE_DIR = os.environ.get(
+    "POLICY_BOSS_GREETING_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "policy_boss", "greetings")
+)
+
+# Number of distinct greetings to keep per prompt, voice and model
+VARIANTS = int(os.environ.get("POLICY_BOSS_GREETING_VARIANTS", 3))
+
+# Duration of each frame played from the cache
+FRAME_MS = 20
+
+
+class CachedGreeting(NamedTuple):
+    text: str
+    pcm: bytes
+    sample_rate: int
+    num_channels: int
+
+    async def frames(self) -> AsyncIterator[rtc.AudioFrame]:
+        """Yield the greeting as 16-bit PCM frames of FRAME_MS each."""
+        samples_per_frame = self.sample_rate * FRAME_MS // 1000
+        frame_bytes = samples_per_frame * self.num_channels * 2
+        for offset in range(0, len(self.pcm), frame_bytes):
+            chunk = self.pcm[offset:offset + frame_bytes]
+            yield rtc.AudioFrame(
+                data=chunk,
+                sample_rate=self.sample_rate,
+                num_channels=self.num_channels,
+                samples_per_channel=len(chunk) // (2 * self.num_channels)
+            )
+
+
+def greeting_key(prompt: str, voice_id: str, model: str) -> str:
+    return hashlib.sha256("\0".join((prompt, voice_id, model)).encode("utf-8")).hexdigest()[:16]
+
+
+class GreetingCache:
+    """
+    Pool of greeting variants for one prompt, voice and TTS model.
+
+    Each variant is stored as <text hash>.pcm with a .json sidecar holding the
+    text and audio format. Files are written to a temporary name and renamed,
+    so job processes sharing the directory never see a partial variant.
+    Variants are synthesized with the given synthesizer, the TTS of that voice
+    and model, and never with whichever provider the session has failed over to.
+    """
+
+    def __init__(
+        self,
+        prompt: str,
+        voice_id: str,
+        model: str,
+        synthesizer: Optional[tts.TTS] = None,
+        directory: str = CACHE_DIR,
+        variants: int = VARIANTS
+    ) -> None:
+        self.key = greeting_key(prompt, voice_id, model)
+        self.synthesizer = synthesizer
+        self.directory = os.path.join(directory, self.key)
+        self.variants = variants
+        self._loaded: List[CachedGreeting] = []
+
+    def _variant_names(self) -> List[str]:
+        try:
+            return sorted(name[:-5] for name in os.listdir(self.directory) if name.endswith(".json"))
+        except FileNotFoundError:
+            return []
+
+    def load(self) -> List[CachedGreeting]:
+        """Read the variants on disk, reusing the ones this process already holds."""
+        names = self._variant_names()
+        if len(names) != len(self._loaded):
+            loaded = []
+            for name in names:
+                path = os.path.join(self.directory, name)
+                try:
+                    with open(f"{path}.json", encoding="utf-8") as f:
+                        meta = json.load(f)
+                    with open(f"{path}.pcm", "rb") as f:
+                        pcm = f.read()
+                except (OSError, ValueError):
+                    continue
+                loaded.append(CachedGreeting(meta["text"], pcm, meta["sample_rate"], meta["num_channels"]))
+            self._loaded = loaded
+        return self._loaded
+
+    def pick(self) -> Optional[CachedGreeting]:
+        """Return a random cached variant, or None if there are none yet."""
+        variants = self.load()
+        return random.choice(variants) if variants else None
+
+    def needs_variants(self) -> bool:
+        return len(self._variant_names()) < self.variants
+
+    def store(self, text: str, frame: rtc.AudioFrame) -> None:
+        """Store a synthesized greeting as one more variant."""
+        os.makedirs(self.directory, exist_ok=True)
+        name = hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+        path = os.path.join(self.directory, name)
+        meta = {"text": text, "sample_rate": frame.sample_rate, "num_channels": frame.num_channels}
+        # The sidecar goes last: a variant only counts once its audio is complete
+        for suffix, data in ((".pcm", bytes(frame.data)), (".json", json.dumps(meta).encode("utf-8"))):
+            tmp = f"{path}{suffix}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path + suffix)
+
+    async def learn(self, handle: SpeechHandle) -> None:
+        """Synthesize a live greeting once it has played and add it to the pool."""
+        await handle
+        synthesizer = self.synthesizer
+        if handle.interrupted or synthesizer is None or not self.needs_variants():
+            return
+        text = " ".join(
+            item.text_content for item in handle.chat_items
+            if item.type == "message" and item.role == "assistant" and item.text_content
+        ).strip()
+        if not text or any(variant.text == text for variant in self.load()):
+            return
+        try:
+            frame = await synthesizer.synthesize(text).collect()
+        except Exception:
+            logger.warning("could not synthesize greeting for the cache", exc_info=True)
+            return
+        self.store(text, frame)
+        logger.info("cached greeting variant", extra={"key": self.key, "chars": len(text)})
@@ -0,0 +1,257 @@
+"""
+Intent-based Tool Selection
+
+This module picks which tool schemas go out with each LLM request. A keyword
+and regex classifier maps the caller's latest utterance (English, romanized
+Hinglish, or Hindi in Devanagari as Deepgram's multilingual model writes it)
+to one or more tool groups: policy, customer, vehicle, claim and commission.
+Only the tools in those groups are sent. An utterance the classifier cannot
+place goes out with every tool, so a missed keyword costs tokens rather than
+a tool the caller needed.
+
+Groups stay selected for a few user turns after they last matched, so short
+follow-ups ("haan, wahi wala", "aur uska status?") keep the tools of the topic
+being discussed.
+"""
+
+import json
+import os
+import re
+import unicodedata
+from typing import Any, Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+from livekit.agents import llm
+from livekit.agents.llm.utils import build_legacy_openai_schema
+
+
+# Set to 0 to send every tool with every request
+SUBSETTING_ENABLED = os.environ.get("POLICY_BOSS_TOOL_SUBSETTING", "1") != "0"
+
+# Number of user turns a group stays selected after it last matched
+STICKY_TURNS = int(os.environ.get("POLICY_BOSS_TOOL_STICKY_TURNS", 2))
+
+# get_full_record goes with every group whose lookups return shaped records
+TOOL_GROUPS: Dict[str, Tuple[str, ...]] = {
+    "policy": (
+        "get_vehicle_insurance_quotes",
+        "get_policy_details",
+        "calculate_premium",
+        "calculate_fleet_premiums",
+        "get_customer_policies",
+        "get_full_record"
+    ),
+    "customer": (
+        "get_customer_profile",
+        "update_customer_details",
+        "get_customer_policies",
+        "get_full_record"
+    ),
+    "vehicle": (
+        "get_vehicle_details",
+        "validate_vehicle_registration",
+        "validate_fleet_registrations",
+        "get_full_record"
+    ),
+    "claim": (
+        "check_claim_status",
+        "get_customer_open_claims",
+        "get_policy_claims",
+        "get_full_record"
+    ),
+    "commission": (
+        "get_agent_commission",
+        "record_policy_sale",
+        "get_commission_statement"
+    )
+}
+
+# Words and phrases that point at each group, matched as whole words; a
+# trailing "*" matches any ending, and English words also match their plural.
+# Generic words every caller uses ("insurance", "bima", "cover") are left out,
+# and so are words like "pata" that are fillers as often as they are topics.
+KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    "policy": (
+        "polic*", "premium", "quote", "quotation", "renew*", "idv", "ncb", "no claim bonus",
+        "zero dep", "add-on", "addon", "fleet", "comprehensive", "third party",
+        "price", "kitna", "kitne", "kitni", "sasta", "sasti", "mehenga", "mehengi", "expir*",
+        "पॉलिसी", "पालिसी", "प्रीमियम", "क्वोट", "कोटेशन", "रिन्यू*", "आईडीवी", "एनसीबी", "नो क्लेम बोनस",
+        "ज़ीरो डेप", "जीरो डेप", "ऐड ऑन", "ऐड-ऑन", "फ्लीट", "कॉम्प्रिहेंसिव", "थर्ड पार्टी",
+        "कीमत", "दाम", "कितना", "कितने", "कितनी", "सस्ता", "सस्ती", "महंगा", "महँगा", "महंगी", "एक्सपायर*"
+    ),
+    "customer": (
+        "customer", "profile", "account", "my details", "meri details", "address", "mera pata", "naya pata",
+        "phone", "mobile", "email", "e-mail", "update", "change", "badal*", "naam",
+        "कस्टमर", "ग्राहक", "प्रोफाइल", "प्रोफ़ाइल", "अकाउंट", "खाता", "डिटेल्स", "एड्रेस", "मेरा पता", "नया पता",
+        "फोन", "फ़ोन", "मोबाइल", "ईमेल", "अपडेट", "चेंज", "बदल*", "नाम"
+    ),
+    "vehicle": (
+        "vehicle", "registration", "number plate", "rc book", "car", "bike", "scooter", "truck",
+        "gaadi", "gadi", "gaari", "engine", "chassis", "rto", "model",
+        "व्हीकल", "वाहन", "रजिस्ट्रेशन", "नंबर प्लेट", "आरसी", "कार", "बाइक", "स्कूटर", "ट्रक",
+        "गाड़ी", "गाडी", "इंजन", "चेसिस", "आरटीओ", "मॉडल"
+    ),
+    "claim": (
+        "claim", "accident", "damage*", "garage", "repair*", "settle*", "surveyor",
+        "theft", "stolen", "chori", "nuksan", "nuksaan", "takkar", "toot*",
+        "क्लेम", "दावा", "एक्सीडेंट", "दुर्घटना", "डैमेज", "नुकसान", "नुक़सान", "गैराज", "रिपेयर", "मरम्मत",
+        "सेटल*", "सर्वेयर", "चोरी", "टक्कर", "टूट*"
+    ),
+    "commission": (
+        "commission", "payout", "earning*", "incentive", "statement", "sale", "sold",
+        "bech*", "kamai",
+        "कमीशन", "पेआउट", "कमाई", "इंसेंटिव", "स्टेटमेंट", "सेल", "बेच*"
+    )
+}
+
+# Devanagari vowel signs are not word characters to the re module, so word
+# boundaries are spelled out with the whole Devanagari block
+_WORD_CHAR = r"[\w\u0900-\u097F]"
+
+
+def _normalize(text: str) -> str:
+    # Nukta letters such as "ड़" come precomposed or as letter and nukta; NFC settles on one form
+    return unicodedata.normalize("NFC", text)
+
+
+def _keyword_pattern(word: str) -> str:
+    stem = word.endswith("*")
+    pattern = r"\s+".join(re.escape(part) for part in _normalize(word.rstrip("*")).split())
+    if stem:
+        return pattern
+    if word.isascii():
+        pattern += "(?:e?s)?"
+    return pattern + f"(?!{_WORD_CHAR})"
+
+
+_KEYWORD_RES = {
+    group: re.compile(
+        f"(?<!{_WORD_CHAR})(?:" + "|".join(_keyword_pattern(word) for word in words) + ")", re.IGNORECASE
+    )
+    for group, words in KEYWORDS.items()
+}
+
+# A registration number anywhere in the utterance, allowing for the spaces and
+# dashes speech-to-text puts between its parts ("MH 01 AB 1234")
+_REGISTRATION_MENTION_RE = re.compile(r"\b[A-Z]{2}[\s-]?[0-9]{1,2}[\s-]?[A-Z]{1,3}[\s-]?[0-9]{4}\b", re.IGNORECASE)
+
+
+def classify(text: str) -> FrozenSet[str]:
+    """Return the tool groups an utterance points at, possibly none."""
+    text = _normalize(text)
+    groups = {group for group, pattern in _KEYWORD_RES.items() if pattern.search(text)}
+    if _REGISTRATION_MENTION_RE.search(text):
+        groups.add("vehicle")
+    return frozenset(groups)
+
+
+def tool_names(groups: FrozenSet[str]) -> FrozenSet[str]:
+    return frozenset(name for group in groups for name in TOOL_GROUPS[group])
+
+
+def schema_tokens(tool: llm.Tool) -> int:
+    """
+    Estimate the prompt tokens a tool's schema costs.
+
+    OpenAI's tokenizer averages about four characters per token on JSON
+    schemas, which is close enough to compare tool sets with each other.
+    """
+    if not isinstance(tool, llm.FunctionTool):
+        return 0
+    return len(json.dumps(build_legacy_openai_schema(tool), separators=(",", ":"))) // 4
+
+
+class ToolRouter:
+    """
+    Per-session tool selection and accounting.
+
+    The LLM is called more than once per user turn when it uses tools; every
+    call in a turn gets the same selection, since the latest user message is
+    the same and the turn counter only moves on a new one.
+    """
+
+    def __init__(self, sticky_turns: int = STICKY_TURNS, enabled: bool = SUBSETTING_ENABLED) -> None:
+        self.sticky_turns = sticky_turns
+        self.enabled = enabled
+        self._last_matched: Dict[str, int] = {}
+        self._turn = 0
+        self._last_user_id: Optional[str] = None
+        self._schema_tokens: Dict[str, int] = {}
+
+        # Accounting over the session's LLM requests
+        self.requests = 0
+        self.schema_tokens_sent = 0
+        self.schema_tokens_full = 0
+        self.prompt_tokens: List[int] = []
+        self.ttft: List[float] = []
+        self.group_turns: Dict[str, int] = {group: 0 for group in TOOL_GROUPS}
+
+    def _tokens(self, tool: llm.Tool) -> int:
+        tool_id = tool.id
+        if tool_id not in self._schema_tokens:
+            self._schema_tokens[tool_id] = schema_tokens(tool)
+        return self._schema_tokens[tool_id]
+
+    def _latest_user(self, chat_ctx: llm.ChatContext) -> Optional[llm.ChatMessage]:
+        return next((item for item in reversed(chat_ctx.items) if item.type == "message" and item.role == "user"), None)
+
+    def _observe(self, chat_ctx: llm.ChatContext) -> None:
+        """Classify the latest user message, once per user turn."""
+        message = self._latest_user(chat_ctx)
+        if message is None or message.id == self._last_user_id:
+            return
+        self._last_user_id = message.id
+        self._turn += 1
+        for group in classify(message.text_content or ""):
+            self._last_matched[group] = self._turn
+            self.group_turns[group] += 1
+
+    def active_groups(self) -> FrozenSet[str]:
+        return self._active(self._last_matched, self._turn)
+
+    def _active(self, last_matched: Dict[str, int], turn: int) -> FrozenSet[str]:
+        return frozenset(group for group, matched in last_matched.items() if turn - matched < self.sticky_turns)
+
+    def _filter(self, tools: Sequence[llm.Tool], groups: FrozenSet[str]) -> List[llm.Tool]:
+        # Nothing matched recently: the topic is unknown, not absent
+        if not self.enabled or not groups:
+            return list(tools)
+        names = tool_names(groups)
+        return [tool for tool in tools if tool.id in names]
+
+    def select(self, chat_ctx: llm.ChatContext, tools: Sequence[llm.Tool]) -> List[llm.Tool]:
+        """Return the tools to send with this request and count what was saved."""
+        self._observe(chat_ctx)
+        selected = self._filter(tools, self.active_groups())
+
+        self.requests += 1
+        self.schema_tokens_full += sum(self._tokens(tool) for tool in tools)
+        self.schema_tokens_sent += sum(self._tokens(tool) for tool in selected)
+        return selected
+
+    def preview(self, chat_ctx: llm.ChatContext, tools: Sequence[llm.Tool]) -> List[llm.Tool]:
+        """Return what select() would, without moving the turn or counting the request."""
+        last_matched, turn = self._last_matched, self._turn
+        message = self._latest_user(chat_ctx)
+        if message is not None and message.id != self._last_user_id:
+            turn += 1
+            last_matched = {**last_matched, **{group: turn for group in classify(message.text_content or "")}}
+        return self._filter(tools, self._active(last_matched, turn))
+
+    def record_response(self, ttft: Optional[float], prompt_tokens: Optional[int]) -> None:
+        if ttft is not None:
+            self.ttft.append(ttft)
+        if prompt_tokens:
+            self.prompt_tokens.append(prompt_tokens)
+
+    def stats(self) -> Dict[str, Any]:
+        saved = self.schema_tokens_full - self.schema_tokens_sent
+        return {
+            "enabled": self.enabled,
+            "requests": self.requests,
+            "schema_tokens_sent": self.schema_tokens_sent,
+            "schema_tokens_full": self.schema_tokens_full,
+            "schema_tokens_saved_ratio": round(saved / self.schema_tokens_full, 4) if self.schema_tokens_full else 0.0,
+            "avg_prompt_tokens": round(sum(self.prompt_tokens) / len(self.prompt_tokens)) if self.prompt_tokens else None,
+            "avg_ttft_ms": round(sum(self.ttft) / len(self.ttft) * 1000, 1) if self.ttft else None,
+            "group_turns": dict(self.group_turns)
+        }
@@ -0,0 +1,313 @@
+"""
+Worker Load Reporting and Admission Control
+
+The worker's default load is its CPU use averaged over a few seconds, which
+only rises after a new call is already running; a session's Silero VAD,
+turn-detector inference and BVC noise cancellation cost far more than that
+leaves room for on small instances. This module's load_fnc instead reports
+how full the worker is against a session capacity: the number of sessions
+the measured per-session CPU and memory fit into the instance's CPU and
+memory budgets, capped by POLICY_BOSS_MAX_SESSIONS. The worker stops taking
+jobs once that capacity is reached or measured usage passes either budget,
+before audio starts to glitch.
+
+With POLICY_BOSS_LOAD_LOG set, the worker appends a load sample on every
+update and each job appends its event-loop lag, which is when audio frames
+start arriving late; benchmarks/capacity_report.py turns the log into
+sessions per core at a target p95.
+"""
+
+import asyncio
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, Optional
+
+import psutil
+from livekit.agents.utils.hw import get_cpu_monitor
+
+
+logger = logging.getLogger("policy-boss.load")
+
+# Hard cap on concurrent sessions per worker; 0 leaves it to measured capacity
+MAX_SESSIONS = int(os.environ.get("POLICY_BOSS_MAX_SESSIONS", 0))
+
+# Load at which the worker stops taking jobs; passed to WorkerOptions
+LOAD_THRESHOLD = float(os.environ.get("POLICY_BOSS_LOAD_THRESHOLD", 0.7))
+
+# Share of the instance's CPU and memory that sessions may use
+CPU_BUDGET = float(os.environ.get("POLICY_BOSS_CPU_BUDGET", 0.8))
+MEMORY_BUDGET = float(os.environ.get("POLICY_BOSS_MEMORY_BUDGET", 0.85))
+
+# Per-session cost assumed until enough has been measured
+SESSION_CPU = float(os.environ.get("POLICY_BOSS_SESSION_CPU", 0.35))
+SESSION_MEMORY_MB = float(os.environ.get("POLICY_BOSS_SESSION_MEMORY_MB", 300))
+
+# JSON-lines file that worker load samples and job loop lag are appended to, if set
+LOAD_LOG = os.environ.get("POLICY_BOSS_LOAD_LOG")
+
+SAMPLE_INTERVAL_S = 0.5
+
+# Weight of each new sample in the per-session and baseline estimates
+EWMA_ALPHA = 0.05
+
+# Job event-loop probe: how often it wakes, and how often it reports
+LAG_PROBE_INTERVAL_S = 0.1
+LAG_REPORT_INTERVAL_S = 10.0
+
+# Latest lags a job keeps for its session percentiles, about five minutes' worth
+LAG_SAMPLES = 3000
+
+_CGROUP_MEMORY_LIMITS = ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes")
+
+
+def memory_limit_mb() -> float:
+    """Memory available to the worker: the container's limit if it has one, else the machine's."""
+    total = psutil.virtual_memory().total
+    for path in _CGROUP_MEMORY_LIMITS:
+        try:
+            with open(path, encoding="utf-8") as f:
+                value = f.read().strip()
+        except OSError:
+            continue
+        if value.isdigit():
+            total = min(total, int(value))
+    return total / 1e6
+
+
+def process_tree_rss_mb(process: psutil.Process) -> float:
+    """Resident memory of a process and all of its children (job and inference processes)."""
+    rss = 0
+    for proc in [process] + process.children(recursive=True):
+        try:
+            rss += proc.memory_info().rss
+        except psutil.Error:
+            # Job processes come and go between listing and reading
+            continue
+    return rss / 1e6
+
+
+def append_record(record: Dict[str, Any]) -> None:
+    if LOAD_LOG:
+        with open(LOAD_LOG, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+
+
+class WorkerLoad:
+    """
+    Measures the worker's CPU and memory and learns what each session costs.
+
+    A background thread samples CPU (cgroup-aware, as the default load does)
+    and the resident memory of the worker's process tree. Usage with no
+    sessions running is the baseline: the worker, its idle job processes and
+    the inference process. Usage above it, divided by the sessions running, is
+    the per-session cost, averaged slowly so one busy call does not swing it.
+    """
+
+    def __init__(self, max_sessions: int = MAX_SESSIONS) -> None:
+        self.max_sessions = max_sessions
+        self.cpu_monitor = get_cpu_monitor()
+        self.cores = self.cpu_monitor.cpu_count()
+        self.memory_mb = memory_limit_mb()
+        self.cpu_budget = self.cores * CPU_BUDGET
+        self.memory_budget_mb = self.memory_mb * MEMORY_BUDGET
+
+        self.sessions = 0
+        self.cpu_used = 0.0
+        self.memory_used_mb = 0.0
+        self.baseline_cpu: Optional[float] = None
+        self.baseline_memory_mb: Optional[float] = None
+        self.session_cpu = SESSION_CPU
+        self.session_memory_mb = SESSION_MEMORY_MB
+        self.samples = 0
+
+        self._process = psutil.Process()
+        self._lock = threading.Lock()
+        self._warned = False
+        self._thread = threading.Thread(target=self._sample_forever, daemon=True, name="policy_boss_load_monitor")
+        self._thread.start()
+
+    def _sample_forever(self) -> None:
+        while True:
+            try:
+                cpu = self.cpu_monitor.cpu_percent(interval=SAMPLE_INTERVAL_S) * self.cores
+                memory = process_tree_rss_mb(self._process)
+            except Exception:
+                logger.exception("failed to sample worker load")
+                time.sleep(SAMPLE_INTERVAL_S)
+                continue
+            self.add_sample(cpu, memory)
+
+    def add_sample(self, cpu: float, memory_mb: float) -> None:
+        with self._lock:
+            self.cpu_used = cpu
+            self.memory_used_mb = memory_mb
+            self.samples += 1
+            if self.sessions == 0:
+                self.baseline_cpu = _ewma(self.baseline_cpu, cpu)
+                self.baseline_memory_mb = _ewma(self.baseline_memory_mb, memory_mb)
+                return
+            # Nothing to attribute against until an idle worker has been seen
+            if self.baseline_cpu is None or self.baseline_memory_mb is None:
+                return
+            self.session_cpu = _ewma(self.session_cpu, max(cpu - self.baseline_cpu, 0.0) / self.sessions)
+            self.session_memory_mb = _ewma(
+                self.session_memory_mb, max(memory_mb - self.baseline_memory_mb, 0.0) / self.sessions
+            )
+
+    def capacity(self) -> int:
+        """Sessions that fit in the CPU and memory budgets at the current per-session cost."""
+        with self._lock:
+            baseline_cpu = self.baseline_cpu or 0.0
+            baseline_memory = self.baseline_memory_mb or 0.0
+            by_cpu = (self.cpu_budget - baseline_cpu) / max(self.session_cpu, 1e-3)
+            by_memory = (self.memory_budget_mb - baseline_memory) / max(self.session_memory_mb, 1.0)
+        capacity = math.floor(min(by_cpu, by_memory))
+        if self.max_sessions > 0:
+            capacity = min(capacity, self.max_sessions)
+        if capacity < 1:
+            # A worker that refuses every job is worse than one that runs a single call slowly
+            if not self._warned:
+                self._warned = True
+                logger.warning("instance too small for one session at the measured cost", extra=self.stats())
+            capacity = 1
+        return capacity
+
+    def load(self, sessions: int) -> float:
+        """
+        Load to report with this many sessions running.
+
+        Scaled so it reaches LOAD_THRESHOLD exactly when the worker is full:
+        the sessions running reach capacity, or measured CPU or memory pass
+        their budgets. Below that, each session adds an even share, so the
+        worker's estimate for jobs it has accepted but not yet started is right.
+        """
+        with self._lock:
+            self.sessions = sessions
+            usage = max(self.cpu_used / self.cpu_budget, self.memory_used_mb / self.memory_budget_mb)
+        fullness = max(sessions / self.capacity(), usage)
+        return min(fullness * LOAD_THRESHOLD, 1.0)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "sessions": self.sessions,
+                "cores": self.cores,
+                "memory_mb": round(self.memory_mb),
+                "cpu_used": round(self.cpu_used, 3),
+                "memory_used_mb": round(self.memory_used_mb, 1),
+                "baseline_cpu": None if self.baseline_cpu is None else round(self.baseline_cpu, 3),
+                "baseline_memory_mb": None if self.baseline_memory_mb is None else round(self.baseline_memory_mb, 1),
+                "session_cpu": round(self.session_cpu, 3),
+                "session_memory_mb": round(self.session_memory_mb, 1),
+                "max_sessions": self.max_sessions
+            }
+
+
+def _ewma(current: Optional[float], sample: float) -> float:
+    return sample if current is None else current + EWMA_ALPHA * (sample - current)
+
+
+_worker_load: Optional[WorkerLoad] = None
+_worker_load_lock = threading.Lock()
+
+
+def get_worker_load() -> WorkerLoad:
+    """Return the worker's load monitor, starting it on first use."""
+    global _worker_load
+    if _worker_load is None:
+        with _worker_load_lock:
+            if _worker_load is None:
+                _worker_load = WorkerLoad()
+    return _worker_load
+
+
+def load_fnc(server: Any) -> float:
+    """load_fnc for the worker: how full it is against its measured session capacity."""
+    monitor = get_worker_load()
+    sessions = len(server.active_jobs)
+    load = monitor.load(sessions)
+    if LOAD_LOG:
+        append_record({"kind": "worker", "ts": time.time(), "load": round(load, 4), "capacity": monitor.capacity(), **monitor.stats()})
+    return load
+
+
+class LoopLagProbe:
+    """
+    Measures how late a job's event loop wakes up.
+
+    The job's audio pipeline runs on this loop in 10-20 ms frames, so a loop
+    that wakes late delivers audio late; its p95 lag is the signal for how
+    many sessions a worker can carry. Waking at 10 Hz samples it often enough
+    for a p95 at a negligible cost; the session percentiles are over the
+    latest LAG_SAMPLES lags, while the count and maximum cover the whole call.
+    """
+
+    def __init__(
+        self, job_id: str = "", interval: float = LAG_PROBE_INTERVAL_S, max_samples: int = LAG_SAMPLES
+    ) -> None:
+        self.job_id = job_id
+        self.interval = interval
+        self.window: Deque[float] = deque(maxlen=max_samples)
+        self.lags: Deque[float] = deque(maxlen=max_samples)
+        self.samples = 0
+        self.max_lag = 0.0
+        self._process = psutil.Process()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._process.cpu_percent()
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        reported = loop.time()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(loop.time() - expected, 0.0)
+            self.window.append(lag)
+            self.lags.append(lag)
+            self.samples += 1
+            self.max_lag = max(self.max_lag, lag)
+            if loop.time() - reported >= LAG_REPORT_INTERVAL_S:
+                reported = loop.time()
+                self._report()
+
+    def _report(self) -> None:
+        if not self.window:
+            return
+        window = list(self.window)
+        self.window.clear()
+        append_record({
+            "kind": "job",
+            "ts": time.time(),
+            "job_id": self.job_id,
+            "lag_p95_ms": round(_percentile(window, 95) * 1000, 2),
+            "cpu": round(self._process.cpu_percent() / 100, 3),
+            "rss_mb": round(self._process.memory_info().rss / 1e6, 1)
+        })
+
+    async def aclose(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self._report()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "samples": self.samples,
+            "lag_p50_ms": round(_percentile(self.lags, 50) * 1000, 2) if self.lags else None,
+            "lag_p95_ms": round(_percentile(self.lags, 95) * 1000, 2) if self.lags else None,
+            "lag_max_ms": round(self.max_lag * 1000, 2) if self.samples else None
+        }
+
+
+def _percentile(values: Iterable[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
@@ -0,0 +1,191 @@
+"""
+Per-Session Memory Accounting and Leak Detection
+
+For a sampled fraction of sessions (POLICY_BOSS_MEMORY_SAMPLE_RATE), this
+module traces Python allocations with tracemalloc from the session's start.
+When the session closes, a shutdown callback in the job collects garbage and
+reports the bytes allocated during the session that are still alive and the
+traced peak. A session that still holds more than POLICY_BOSS_MEMORY_LEAK_MB
+then is flagged and its top allocation sites are written to
+POLICY_BOSS_MEMORY_DIR. Job processes exit after their job, so everything is
+measured before the shutdown callbacks return; the figure includes the
+session objects the job context still references, so the threshold should
+sit above what a normal call holds at close.
+
+tracemalloc slows every allocation while it runs, so it is started only for
+sampled sessions, with a short traceback depth, and stopped when the last
+one in the process ends. With the thread job executor the sessions of a
+process share one trace, so their figures include each other's allocations.
+"""
+
+import asyncio
+import gc
+import json
+import logging
+import os
+import random
+import threading
+import time
+import tracemalloc
+from typing import Any, Dict, List, Optional
+
+
+logger = logging.getLogger("policy-boss.memory")
+
+# Fraction of sessions traced; 0 turns the instrumentation off
+SAMPLE_RATE = float(os.environ.get("POLICY_BOSS_MEMORY_SAMPLE_RATE", 0.0))
+
+# Traceback depth recorded per allocation; deeper traces cost more
+TRACE_FRAMES = int(os.environ.get("POLICY_BOSS_MEMORY_FRAMES", 4))
+
+# Memory still held at close above which a session is flagged as leaking
+LEAK_BYTES = float(os.environ.get("POLICY_BOSS_MEMORY_LEAK_MB", 25)) * 1e6
+
+MEMORY_DIR = os.environ.get(
+    "POLICY_BOSS_MEMORY_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "policy_boss", "memory")
+)
+
+# Allocation sites listed in a dump
+TOP_SITES = 25
+
+# Longest the report waits for the session to finish closing
+CLOSE_TIMEOUT_S = 10.0
+
+# tracemalloc is process-wide: started by the first traced session, stopped by the last
+_active = 0
+_active_lock = threading.Lock()
+
+
+def _start_tracing() -> None:
+    global _active
+    with _active_lock:
+        if _active == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(TRACE_FRAMES)
+        _active += 1
+
+
+def _stop_tracing() -> None:
+    global _active
+    with _active_lock:
+        _active -= 1
+        if _active == 0 and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+def _ignore_tracing_frames(snapshot: tracemalloc.Snapshot) -> tracemalloc.Snapshot:
+    return snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>")
+    ))
+
+
+class SessionMemoryProbe:
+    """
+    Traces one session's allocations from start to close.
+
+    Created at the top of the entrypoint; start() returns the probe for a
+    sampled session, or None. watch() follows the session's close, and
+    report_close() runs as a job shutdown callback.
+    """
+
+    def __init__(self, job_id: str) -> None:
+        self.job_id = job_id
+        self.started_at = time.time()
+        self.closed_at: Optional[float] = None
+        self.retained_at_close: Optional[int] = None
+        self.peak: Optional[int] = None
+        self.flagged: List[str] = []
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self._closed = asyncio.Event()
+        self._done = False
+
+    @classmethod
+    def start(cls, job_id: str, sample_rate: float = SAMPLE_RATE) -> Optional["SessionMemoryProbe"]:
+        if sample_rate <= 0 or random.random() >= sample_rate:
+            return None
+        probe = cls(job_id)
+        _start_tracing()
+        tracemalloc.reset_peak()
+        probe._baseline = _ignore_tracing_frames(tracemalloc.take_snapshot())
+        return probe
+
+    def watch(self, session: Any) -> None:
+        """Report once the session has closed."""
+        session.on("close", lambda _: self._closed.set())
+
+    async def report_close(self) -> None:
+        """Shutdown callback: once the session has closed, report what it still holds."""
+        try:
+            await asyncio.wait_for(self._closed.wait(), CLOSE_TIMEOUT_S)
+        except asyncio.TimeoutError:
+            logger.warning("session did not close in time for the memory report", extra={"job_id": self.job_id})
+        self.closed_at = time.time()
+        # Snapshots and dumps take a while on a large heap; keep them off the event loop
+        await asyncio.to_thread(self._report)
+
+    def _report(self) -> None:
+        # Freed objects may still sit in reference cycles with others; collect before measuring
+        gc.collect()
+        snapshot = self._snapshot()
+        if snapshot is None:
+            return
+        self.peak = tracemalloc.get_traced_memory()[1]
+        self.retained_at_close = self._retained(snapshot)
+        if self.retained_at_close > LEAK_BYTES:
+            self.flagged.append("retained_at_close")
+            self._dump(snapshot, "retained at close")
+        self._finish("closed", "session memory at close")
+
+    def _snapshot(self) -> Optional[tracemalloc.Snapshot]:
+        if self._done or not tracemalloc.is_tracing():
+            return None
+        return _ignore_tracing_frames(tracemalloc.take_snapshot())
+
+    def _retained(self, snapshot: Optional[tracemalloc.Snapshot]) -> Optional[int]:
+        if snapshot is None or self._baseline is None:
+            return None
+        return sum(max(stat.size_diff, 0) for stat in snapshot.compare_to(self._baseline, "lineno"))
+
+    def _dump(self, snapshot: tracemalloc.Snapshot, reason: str) -> None:
+        """Write the allocation sites that grew most since the session started."""
+        os.makedirs(MEMORY_DIR, exist_ok=True)
+        path = os.path.join(MEMORY_DIR, f"{self.job_id}.txt")
+        stats = snapshot.compare_to(self._baseline, "traceback")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"job {self.job_id}: {reason}\n\n")
+            for stat in [s for s in stats if s.size_diff > 0][:TOP_SITES]:
+                f.write(f"{stat.size_diff / 1024:.1f} KiB in {stat.count_diff} blocks\n")
+                for line in stat.traceback.format():
+                    f.write(f"    {line}\n")
+                f.write("\n")
+        logger.warning("wrote allocation sites", extra={"job_id": self.job_id, "reason": reason, "path": path})
+
+    def _record(self, stage: str, message: str) -> None:
+        """Log the figures so far and append them to the sessions log."""
+        record = {"stage": stage, **self.as_dict()}
+        if self.flagged:
+            logger.warning(message, extra=record)
+        else:
+            logger.info(message, extra=record)
+        os.makedirs(MEMORY_DIR, exist_ok=True)
+        with open(os.path.join(MEMORY_DIR, "sessions.jsonl"), "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+
+    def _finish(self, stage: str, message: str) -> None:
+        self._record(stage, message)
+        self._done = True
+        _stop_tracing()
+
+    def as_dict(self) -> Dict[str, Any]:
+        def mb(value: Optional[int]) -> Optional[float]:
+            return None if value is None else round(value / 1e6, 3)
+
+        return {
+            "job_id": self.job_id,
+            "started_at": self.started_at,
+            "closed_at": self.closed_at,
+            "peak_mb": mb(self.peak),
+            "retained_at_close_mb": mb(self.retained_at_close),
+            "flagged": self.flagged
+        }
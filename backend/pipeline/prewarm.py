@@ -0,0 +1,101 @@
+"""
+Model Prewarming and Startup Measurement
+
+This module loads the voice activity detector once per job process, before any
+job is assigned to it, so model loading stays off the path between accepting a
+call and the greeting. It also measures that path: with POLICY_BOSS_STARTUP_LOG
+set, every job appends how long it took from entrypoint to first agent audio,
+and whether its process was prewarmed, so runs with POLICY_BOSS_PREWARM=0 and
+=1 can be compared with benchmarks/startup_report.py.
+"""
+
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from livekit.agents import AgentSession, JobContext, JobProcess
+from livekit.plugins import silero
+from livekit.plugins.turn_detector.multilingual import MultilingualModel
+
+from tools.repository import get_repository
+
+
+logger = logging.getLogger("policy-boss.prewarm")
+
+# Set to 0 to skip prewarming, e.g. to measure the cost of loading per job
+PREWARM_ENABLED = os.environ.get("POLICY_BOSS_PREWARM", "1") != "0"
+
+# JSON-lines file that per-job startup timings are appended to, if set
+STARTUP_LOG = os.environ.get("POLICY_BOSS_STARTUP_LOG")
+
+
+def prewarm(proc: JobProcess) -> None:
+    """prewarm_fnc for the worker: load the VAD model into the process's userdata."""
+    # Opening the repository takes over customer updates that exited processes
+    # journaled but never wrote, so a restarted worker replays them right away
+    get_repository()
+    if not PREWARM_ENABLED:
+        return
+    start = time.perf_counter()
+    proc.userdata["vad"] = silero.VAD.load()
+    proc.userdata["prewarm_s"] = time.perf_counter() - start
+    logger.info("prewarmed models", extra={"load_ms": round(proc.userdata["prewarm_s"] * 1000, 1)})
+
+
+def session_models(proc: JobProcess) -> Tuple[Any, Any, float]:
+    """
+    Return the VAD and turn detector for a new session, loading what the process lacks.
+
+    The turn detector model itself runs in the worker's shared inference process;
+    the plugin object only needs the job's inference executor, so it cannot be
+    built in prewarm and is instead created by the first job and kept with the VAD.
+
+    Returns:
+        The VAD, the turn detector, and the seconds spent loading on this job's path
+    """
+    start = time.perf_counter()
+    vad = proc.userdata.get("vad")
+    if vad is None:
+        vad = proc.userdata["vad"] = silero.VAD.load()
+    turn_detection = proc.userdata.get("turn_detection")
+    if turn_detection is None:
+        turn_detection = proc.userdata["turn_detection"] = MultilingualModel()
+    return vad, turn_detection, time.perf_counter() - start
+
+
+class StartupTimer:
+    """Times one job from entrypoint to the first audio the agent plays."""
+
+    def __init__(self, ctx: JobContext) -> None:
+        self.job_id = ctx.job.id
+        self.prewarmed = "prewarm_s" in ctx.proc.userdata
+        self.started = time.perf_counter()
+        self.model_load_s = 0.0
+        self.first_audio_s: Optional[float] = None
+
+    def watch(self, session: AgentSession) -> None:
+        """Stop the clock the first time the agent starts speaking."""
+        def on_state_changed(event: Any) -> None:
+            if event.new_state == "speaking" and self.first_audio_s is None:
+                self.first_audio_s = time.perf_counter() - self.started
+                session.off("agent_state_changed", on_state_changed)
+                self.report()
+
+        session.on("agent_state_changed", on_state_changed)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "prewarmed": self.prewarmed,
+            "model_load_ms": round(self.model_load_s * 1000, 1),
+            "first_audio_ms": round(self.first_audio_s * 1000, 1) if self.first_audio_s is not None else None
+        }
+
+    def report(self) -> None:
+        record = self.as_dict()
+        logger.info("job startup", extra=record)
+        if STARTUP_LOG:
+            with open(STARTUP_LOG, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
@@ -0,0 +1,558 @@
+"""
+Latency-aware Provider Routing
+
+This module puts several providers behind each of the session's STT, LLM and
+TTS slots. Every provider's recent latency (rolling p95) and error rate are
+tracked per job process, and each new request goes to the first provider in
+configured order that is healthy: not cooling down after a failure, with its
+p95 within the modality's latency budget and few errors. Degraded providers
+are still used, slowest last, when nothing healthy is left.
+
+A request also fails over while it runs. An LLM or TTS provider that has not
+produced its first chunk within the stall timeout is abandoned for the next
+one, and an STT stream that errors or stops finalizing mid-utterance is
+replaced by the next provider's stream, replaying the audio since the last
+final transcript. Once an LLM or TTS response has started it cannot be
+handed over, so a failure after that point is raised as usual.
+
+Samples expire after WINDOW_S, so a provider that was routed around is tried
+again in its configured position once its bad samples have aged out.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+
+from livekit import rtc
+from livekit.agents import APIConnectionError, APIConnectOptions, llm, stt, tts, utils
+from livekit.agents.types import DEFAULT_API_CONNECT_OPTIONS, NOT_GIVEN, NotGivenOr
+from livekit.agents.utils import aio
+from livekit.agents.vad import VAD
+
+
+logger = logging.getLogger("policy-boss.routing")
+
+# Set to 0 to use only the primary provider of each modality
+ROUTING_ENABLED = os.environ.get("POLICY_BOSS_PROVIDER_ROUTING", "1") != "0"
+
+# Seconds of history a provider's latency and error rate are computed over
+WINDOW_S = 120.0
+
+# Samples needed before a provider can be judged degraded
+MIN_SAMPLES = 5
+
+# Error rate above which a provider counts as degraded
+MAX_ERROR_RATE = 0.2
+
+# How long a provider is skipped after it fails or stalls
+COOLDOWN_S = 30.0
+
+# p95 latency each modality should stay within: STT from end of speech to the
+# final transcript, LLM to first token, TTS to first audio
+LATENCY_BUDGETS = {"stt": 1.0, "llm": 1.5, "tts": 0.8}
+
+# How long a request may go without its first chunk before failing over
+STALL_TIMEOUTS = {"stt": 4.0, "llm": 5.0, "tts": 3.0}
+
+# Inner requests do not retry on their own: the next provider is the retry
+ATTEMPT_CONN_OPTIONS = APIConnectOptions(max_retry=0, timeout=10.0)
+
+# Longest stretch of unfinalized audio kept for replay after an STT failover
+MAX_REPLAY_S = 30.0
+
+
+def provider_name(provider: Any) -> str:
+    return f"{provider.provider}:{provider.model}"
+
+
+class ProviderHealth:
+    """Rolling latency and error samples for one provider."""
+
+    def __init__(self, name: str, budget_s: float) -> None:
+        self.name = name
+        self.budget_s = budget_s
+        # (monotonic time, latency in seconds or None for an error)
+        self._samples: Deque[Tuple[float, Optional[float]]] = deque()
+        self.cooldown_until = 0.0
+        self.requests = 0
+        self.errors = 0
+
+    def _prune(self, now: float) -> None:
+        while self._samples and now - self._samples[0][0] > WINDOW_S:
+            self._samples.popleft()
+
+    def record(self, latency: float) -> None:
+        self.requests += 1
+        self._samples.append((time.monotonic(), latency))
+
+    def record_error(self) -> None:
+        self.requests += 1
+        self.errors += 1
+        now = time.monotonic()
+        self._samples.append((now, None))
+        self.cooldown_until = now + COOLDOWN_S
+
+    def p95(self) -> Optional[float]:
+        self._prune(time.monotonic())
+        latencies = sorted(latency for _, latency in self._samples if latency is not None)
+        if not latencies:
+            return None
+        return latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)]
+
+    def error_rate(self) -> float:
+        self._prune(time.monotonic())
+        if not self._samples:
+            return 0.0
+        return sum(1 for _, latency in self._samples if latency is None) / len(self._samples)
+
+    def cooling_down(self) -> bool:
+        return time.monotonic() < self.cooldown_until
+
+    def degraded(self) -> bool:
+        self._prune(time.monotonic())
+        if len(self._samples) < MIN_SAMPLES:
+            return False
+        p95 = self.p95()
+        return self.error_rate() > MAX_ERROR_RATE or (p95 is not None and p95 > self.budget_s)
+
+    def as_dict(self) -> Dict[str, Any]:
+        p95 = self.p95()
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "error_rate": round(self.error_rate(), 4),
+            "cooling_down": self.cooling_down(),
+            "degraded": self.degraded()
+        }
+
+
+class ModalityRouter:
+    """Health of the providers for one modality, in configured order."""
+
+    def __init__(self, modality: str, names: Sequence[str]) -> None:
+        self.modality = modality
+        self.health = [ProviderHealth(name, LATENCY_BUDGETS[modality]) for name in names]
+        self.failovers = 0
+
+    def ranked(self) -> List[int]:
+        """Provider indices in the order a new request should try them."""
+        def key(index: int) -> Tuple[bool, bool, float, int]:
+            health = self.health[index]
+            degraded = health.degraded()
+            return (health.cooling_down(), degraded, (health.p95() or 0.0) if degraded else 0.0, index)
+
+        return sorted(range(len(self.health)), key=key)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "failovers": self.failovers,
+            "providers": {health.name: health.as_dict() for health in self.health}
+        }
+
+
+_routers: Dict[Tuple[str, Tuple[str, ...]], ModalityRouter] = {}
+
+
+def get_modality_router(modality: str, names: Sequence[str]) -> ModalityRouter:
+    """Return this process's router for a modality and provider list, shared by its sessions."""
+    key = (modality, tuple(names))
+    if key not in _routers:
+        _routers[key] = ModalityRouter(modality, names)
+    return _routers[key]
+
+
+def routing_stats() -> Dict[str, Any]:
+    return {f"{modality}[{','.join(names)}]": router.stats() for (modality, names), router in _routers.items()}
+
+
+def _log_failure(modality: str, health: ProviderHealth, error: Exception) -> None:
+    # A stall is expected of a slow provider, not a bug worth a traceback
+    stalled = isinstance(error, asyncio.TimeoutError)
+    logger.warning(
+        f"{modality} provider {'stalled' if stalled else 'failed'}, moving to the next one",
+        extra={"provider": health.name},
+        exc_info=not stalled
+    )
+
+
+async def _first(iterator: Any, timeout: float) -> Any:
+    return await asyncio.wait_for(iterator.__anext__(), timeout)
+
+
+class RoutedLLM(llm.LLM):
+    """LLM that sends each request to the healthiest of several providers."""
+
+    def __init__(self, providers: Sequence[llm.LLM], router: Optional[ModalityRouter] = None) -> None:
+        if not providers:
+            raise ValueError("at least one LLM provider is required")
+        super().__init__()
+        self.providers = list(providers)
+        self.router = router or get_modality_router("llm", [provider_name(p) for p in self.providers])
+
+    @property
+    def model(self) -> str:
+        return self.providers[self.router.ranked()[0]].model
+
+    @property
+    def provider(self) -> str:
+        return self.providers[self.router.ranked()[0]].provider
+
+    def chat(
+        self,
+        *,
+        chat_ctx: llm.ChatContext,
+        tools: Optional[List[llm.Tool]] = None,
+        conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS,
+        parallel_tool_calls: NotGivenOr[bool] = NOT_GIVEN,
+        tool_choice: NotGivenOr[llm.ToolChoice] = NOT_GIVEN,
+        extra_kwargs: NotGivenOr[Dict[str, Any]] = NOT_GIVEN
+    ) -> llm.LLMStream:
+        return _RoutedLLMStream(
+            self,
+            chat_ctx=chat_ctx,
+            tools=tools or [],
+            conn_options=conn_options,
+            options={
+                "parallel_tool_calls": parallel_tool_calls,
+                "tool_choice": tool_choice,
+                "extra_kwargs": extra_kwargs
+            }
+        )
+
+    def prewarm(self, *, loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+        self.providers[self.router.ranked()[0]].prewarm(loop=loop)
+
+    async def aclose(self) -> None:
+        for provider in self.providers:
+            await provider.aclose()
+
+
+class _RoutedLLMStream(llm.LLMStream):
+    def __init__(self, routed: RoutedLLM, *, options: Dict[str, Any], **kwargs: Any) -> None:
+        super().__init__(routed, **kwargs)
+        self._options = options
+
+    async def _run(self) -> None:
+        routed: RoutedLLM = self._llm
+        router = routed.router
+        for attempt, index in enumerate(router.ranked()):
+            provider, health = routed.providers[index], router.health[index]
+            if attempt:
+                router.failovers += 1
+            start = time.perf_counter()
+            started = False
+            try:
+                async with provider.chat(
+                    chat_ctx=self._chat_ctx,
+                    tools=self._tools,
+                    conn_options=ATTEMPT_CONN_OPTIONS,
+                    **self._options
+                ) as stream:
+                    iterator = stream.__aiter__()
+                    try:
+                        chunk = await _first(iterator, STALL_TIMEOUTS["llm"])
+                    except StopAsyncIteration:
+                        health.record(time.perf_counter() - start)
+                        return
+                    health.record(time.perf_counter() - start)
+                    started = True
+                    self._event_ch.send_nowait(chunk)
+                    async for chunk in iterator:
+                        self._event_ch.send_nowait(chunk)
+                return
+            except Exception as e:
+                health.record_error()
+                if started:
+                    # Part of the response has gone out and cannot be taken back
+                    raise
+                _log_failure("llm", health, e)
+        raise APIConnectionError("every LLM provider failed")
+
+
+class RoutedTTS(tts.TTS):
+    """
+    Non-streaming TTS that sends each sentence to the healthiest of several providers.
+
+    Providers with a different sample rate from the first are resampled to it.
+    """
+
+    def __init__(self, providers: Sequence[tts.TTS], router: Optional[ModalityRouter] = None) -> None:
+        if not providers:
+            raise ValueError("at least one TTS provider is required")
+        super().__init__(
+            capabilities=tts.TTSCapabilities(streaming=False),
+            sample_rate=providers[0].sample_rate,
+            num_channels=1
+        )
+        self.providers = list(providers)
+        self.router = router or get_modality_router("tts", [provider_name(p) for p in self.providers])
+
+    @property
+    def model(self) -> str:
+        return self.providers[self.router.ranked()[0]].model
+
+    @property
+    def provider(self) -> str:
+        return self.providers[self.router.ranked()[0]].provider
+
+    def synthesize(
+        self, text: str, *, conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS
+    ) -> tts.ChunkedStream:
+        return _RoutedChunkedStream(tts=self, input_text=text, conn_options=conn_options)
+
+    def prewarm(self) -> None:
+        self.providers[self.router.ranked()[0]].prewarm()
+
+    async def aclose(self) -> None:
+        for provider in self.providers:
+            await provider.aclose()
+
+
+class _RoutedChunkedStream(tts.ChunkedStream):
+    async def _run(self, output_emitter: tts.AudioEmitter) -> None:
+        routed: RoutedTTS = self._tts
+        router = routed.router
+        output_emitter.initialize(
+            request_id=utils.shortuuid(),
+            sample_rate=routed.sample_rate,
+            num_channels=1,
+            mime_type="audio/pcm"
+        )
+        for attempt, index in enumerate(router.ranked()):
+            provider, health = routed.providers[index], router.health[index]
+            if attempt:
+                router.failovers += 1
+            resampler = None
+            if provider.sample_rate != routed.sample_rate:
+                resampler = rtc.AudioResampler(provider.sample_rate, routed.sample_rate, num_channels=1)
+            start = time.perf_counter()
+            started = False
+            try:
+                async with provider.synthesize(self._input_text, conn_options=ATTEMPT_CONN_OPTIONS) as stream:
+                    iterator = stream.__aiter__()
+                    try:
+                        audio = await _first(iterator, STALL_TIMEOUTS["tts"])
+                    except StopAsyncIteration:
+                        health.record(time.perf_counter() - start)
+                        output_emitter.flush()
+                        return
+                    health.record(time.perf_counter() - start)
+                    started = True
+                    self._push(output_emitter, audio.frame, resampler)
+                    async for audio in iterator:
+                        self._push(output_emitter, audio.frame, resampler)
+                if resampler is not None:
+                    for frame in resampler.flush():
+                        output_emitter.push_frame(frame)
+                output_emitter.flush()
+                return
+            except Exception as e:
+                health.record_error()
+                if started:
+                    raise
+                _log_failure("tts", health, e)
+            finally:
+                # A failed attempt's traceback can outlive this frame in a
+                # reference cycle; the native resampler must not go with it
+                resampler = None
+        raise APIConnectionError("every TTS provider failed")
+
+    @staticmethod
+    def _push(output_emitter: tts.AudioEmitter, frame: rtc.AudioFrame, resampler: Optional[rtc.AudioResampler]) -> None:
+        if resampler is None:
+            output_emitter.push_frame(frame)
+            return
+        for resampled in resampler.push(frame):
+            output_emitter.push_frame(resampled)
+
+
+class RoutedSTT(stt.STT):
+    """
+    Streaming STT that opens each stream on the healthiest of several providers
+    and moves it to the next one if the provider errors or stalls.
+
+    Providers that cannot stream are wrapped in a StreamAdapter driven by the VAD.
+    Interim results are reported as the first provider has them: features built
+    on Deepgram's interims, such as speculation, stay on, and while a fallback
+    without interims is serving the session only gets finals.
+    """
+
+    def __init__(self, providers: Sequence[stt.STT], vad: Optional[VAD] = None, router: Optional[ModalityRouter] = None) -> None:
+        if not providers:
+            raise ValueError("at least one STT provider is required")
+        adapted = []
+        for provider in providers:
+            if not provider.capabilities.streaming:
+                if vad is None:
+                    raise ValueError(f"{provider.label} cannot stream; pass a VAD to adapt it")
+                provider = stt.StreamAdapter(stt=provider, vad=vad)
+            adapted.append(provider)
+        super().__init__(
+            capabilities=stt.STTCapabilities(
+                streaming=True,
+                interim_results=adapted[0].capabilities.interim_results
+            )
+        )
+        self.providers = adapted
+        self.router = router or get_modality_router("stt", [provider_name(p) for p in providers])
+
+    @property
+    def model(self) -> str:
+        return self.providers[self.router.ranked()[0]].model
+
+    @property
+    def provider(self) -> str:
+        return self.providers[self.router.ranked()[0]].provider
+
+    async def _recognize_impl(
+        self,
+        buffer: utils.AudioBuffer,
+        *,
+        language: NotGivenOr[str] = NOT_GIVEN,
+        conn_options: APIConnectOptions
+    ) -> stt.SpeechEvent:
+        for index in self.router.ranked():
+            provider, health = self.providers[index], self.router.health[index]
+            start = time.perf_counter()
+            try:
+                event = await provider.recognize(buffer, language=language, conn_options=ATTEMPT_CONN_OPTIONS)
+            except Exception as e:
+                health.record_error()
+                _log_failure("stt", health, e)
+                continue
+            health.record(time.perf_counter() - start)
+            return event
+        raise APIConnectionError("every STT provider failed")
+
+    def stream(
+        self,
+        *,
+        language: NotGivenOr[str] = NOT_GIVEN,
+        conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS
+    ) -> stt.RecognizeStream:
+        return _RoutedSpeechStream(stt=self, language=language, conn_options=conn_options)
+
+    def prewarm(self) -> None:
+        self.providers[self.router.ranked()[0]].prewarm()
+
+    async def aclose(self) -> None:
+        for provider in self.providers:
+            await provider.aclose()
+
+
+class _RoutedSpeechStream(stt.RecognizeStream):
+    def __init__(self, *, stt: RoutedSTT, language: NotGivenOr[str], conn_options: APIConnectOptions) -> None:
+        super().__init__(stt=stt, conn_options=conn_options, sample_rate=NOT_GIVEN)
+        self._language = language
+        self._inner: Optional[stt.RecognizeStream] = None
+        self._input_ended = False
+        # Input since the last final transcript (frames and flushes), replayed into a replacement stream
+        self._unfinalized: Deque[Any] = deque()
+        self._unfinalized_s = 0.0
+
+    async def _forward_input(self) -> None:
+        async for data in self._input_ch:
+            self._unfinalized.append(data)
+            if isinstance(data, rtc.AudioFrame):
+                self._unfinalized_s += data.duration
+                while self._unfinalized_s > MAX_REPLAY_S:
+                    dropped = self._unfinalized.popleft()
+                    if isinstance(dropped, rtc.AudioFrame):
+                        self._unfinalized_s -= dropped.duration
+            if self._inner is not None:
+                self._send(self._inner, data)
+        self._input_ended = True
+        if self._inner is not None:
+            self._inner.end_input()
+
+    @staticmethod
+    def _send(inner: stt.RecognizeStream, data: Any) -> None:
+        if isinstance(data, rtc.AudioFrame):
+            inner.push_frame(data)
+        else:
+            inner.flush()
+
+    async def _run(self) -> None:
+        routed: RoutedSTT = self._stt
+        router = routed.router
+        input_task = asyncio.create_task(self._forward_input())
+        failed = set()
+        try:
+            while True:
+                index = next((i for i in router.ranked() if i not in failed), None)
+                if index is None:
+                    raise APIConnectionError("every STT provider failed")
+                provider, health = routed.providers[index], router.health[index]
+                inner = provider.stream(language=self._language, conn_options=ATTEMPT_CONN_OPTIONS)
+                # The replacement hears the unfinalized audio again, so its timeline starts that much
+                # earlier; audio that arrived faster than real time must not put it before the stream's
+                audio_start = time.time() - self._unfinalized_s
+                inner.start_time_offset = max(0.0, self.start_time_offset + (audio_start - self._start_time))
+                for data in self._unfinalized:
+                    self._send(inner, data)
+                if self._input_ended:
+                    inner.end_input()
+                self._inner = inner
+                try:
+                    if not await self._relay(inner, index):
+                        return
+                    # Moved between utterances to a healthier provider: nothing failed
+                    failed.clear()
+                except Exception as e:
+                    health.record_error()
+                    _log_failure("stt", health, e)
+                    failed.add(index)
+                finally:
+                    self._inner = None
+                    await inner.aclose()
+                router.failovers += 1
+        finally:
+            await aio.cancel_and_wait(input_task)
+
+    async def _relay(self, inner: stt.RecognizeStream, index: int) -> bool:
+        """
+        Forward the inner stream's events, timing its finals and watching for stalls.
+
+        Returns:
+            True to move the stream to a healthier provider, False once the input is done
+        """
+        router: ModalityRouter = self._stt.router
+        health = router.health[index]
+        iterator = inner.__aiter__()
+        utterance_open = False
+        speech_ended_at: Optional[float] = None
+        while True:
+            # Silence may last any time; an utterance that stops producing results may not
+            try:
+                event = await asyncio.wait_for(
+                    iterator.__anext__(), STALL_TIMEOUTS["stt"] if utterance_open else None
+                )
+            except StopAsyncIteration:
+                if not self._input_ended:
+                    raise APIConnectionError("stt stream closed while audio was still coming") from None
+                return False
+            self._event_ch.send_nowait(event)
+            if event.type == stt.SpeechEventType.INTERIM_TRANSCRIPT:
+                utterance_open = True
+            elif event.type == stt.SpeechEventType.END_OF_SPEECH:
+                speech_ended_at = time.time()
+                utterance_open = True
+            elif event.type == stt.SpeechEventType.FINAL_TRANSCRIPT:
+                utterance_open = False
+                alternative = event.alternatives[0] if event.alternatives else None
+                if alternative is not None and alternative.end_time > 0:
+                    # How far the transcript trails the audio it covers
+                    lag = time.time() - (self._start_time + alternative.end_time - self.start_time_offset)
+                    health.record(max(0.0, lag))
+                elif speech_ended_at is not None:
+                    health.record(time.time() - speech_ended_at)
+                speech_ended_at = None
+                self._unfinalized.clear()
+                self._unfinalized_s = 0.0
+                # Between utterances is the one point a stream can move without losing words
+                if health.degraded() and router.ranked()[0] != index and not self._input_ended:
+                    return True
@@ -0,0 +1,235 @@
+"""
+Speculative LLM Generation on Stable Interim Transcripts
+
+Deepgram sends interim transcripts well before the turn detector decides the
+caller has finished. With speculation on, once the transcript of the turn so
+far has not changed for POLICY_BOSS_SPECULATION_STABLE_MS, the LLM request for
+it is started in the background and its chunks are buffered. When the turn is
+committed and its LLM request comes in, a speculation for the same history and
+the same transcript is replayed instead of starting a new request; any other
+speculation is cancelled.
+
+Off by default: a speculation that misses costs a full LLM request.
+"""
+
+import asyncio
+import logging
+import os
+import re
+import time
+from typing import Any, AsyncIterable, Callable, Dict, List, Optional, Tuple
+
+from livekit.agents import llm
+
+
+logger = logging.getLogger("policy-boss.speculation")
+
+# Set to 1 to start LLM requests on stable interim transcripts
+SPECULATION_ENABLED = os.environ.get("POLICY_BOSS_SPECULATION", "0") == "1"
+
+# How long the transcript must stay unchanged before a request is started
+STABLE_MS = int(os.environ.get("POLICY_BOSS_SPECULATION_STABLE_MS", 300))
+
+_NON_WORD_RE = re.compile(r"[^\w]+")
+
+HistoryKey = Tuple[str, ...]
+
+# Starts the LLM request for a transcript, returning the history it was made
+# against and the response stream
+StartFn = Callable[[str], Tuple[HistoryKey, AsyncIterable[llm.ChatChunk]]]
+
+
+def normalize_transcript(text: str) -> str:
+    """Compare transcripts by their words: case and punctuation differ between interim and final."""
+    return _NON_WORD_RE.sub(" ", text.lower()).strip()
+
+
+def history_key(items: List[llm.ChatItem]) -> HistoryKey:
+    """Identify the conversation a request continues, ignoring instructions."""
+    return tuple(
+        item.id for item in items
+        if item.type in ("function_call", "function_call_output")
+        or (item.type == "message" and item.role in ("user", "assistant"))
+    )
+
+
+class Speculation:
+    """One speculative LLM request, buffered so it can be replayed from the start."""
+
+    def __init__(self, transcript: str, history: HistoryKey, stream: AsyncIterable[llm.ChatChunk]) -> None:
+        self.transcript = transcript
+        self.history = history
+        self.started = time.perf_counter()
+        self.first_chunk_at: Optional[float] = None
+        self.chunks: List[Any] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self._changed = asyncio.Event()
+        self._task = asyncio.create_task(self._consume(stream))
+
+    async def _consume(self, stream: AsyncIterable[llm.ChatChunk]) -> None:
+        try:
+            async for chunk in stream:
+                if self.first_chunk_at is None:
+                    self.first_chunk_at = time.perf_counter()
+                self.chunks.append(chunk)
+                self._changed.set()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
+            self._changed.set()
+            # Close the LLM request too when the speculation is cancelled midway
+            aclose = getattr(stream, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+    def cancel(self) -> None:
+        self._task.cancel()
+
+    async def replay(self) -> AsyncIterable[llm.ChatChunk]:
+        """Yield the buffered chunks, then the rest as they arrive."""
+        index = 0
+        while True:
+            while index < len(self.chunks):
+                yield self.chunks[index]
+                index += 1
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            self._changed.clear()
+            await self._changed.wait()
+
+
+class Speculator:
+    """
+    Per-session speculation on interim transcripts.
+
+    attach() follows the session's transcripts; take() is called by the
+    agent's llm_node with each request and hands back a matching speculation.
+    """
+
+    def __init__(self, start: StartFn, stable_ms: int = STABLE_MS, enabled: bool = SPECULATION_ENABLED) -> None:
+        self.start = start
+        self.stable_s = stable_ms / 1000
+        self.enabled = enabled
+        self._finals: List[str] = []
+        self._transcript = ""
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._current: Optional[Speculation] = None
+        self._agent_state = "listening"
+
+        self.started = 0
+        self.hits = 0
+        self.misses = 0
+        self.saved_s: List[float] = []
+
+    def attach(self, session: Any) -> None:
+        if not self.enabled:
+            return
+        session.on("user_input_transcribed", self.on_transcript)
+        session.on("conversation_item_added", self.on_item_added)
+        session.on("agent_state_changed", self.on_agent_state)
+
+    def on_agent_state(self, event: Any) -> None:
+        self._agent_state = event.new_state
+
+    def on_transcript(self, event: Any) -> None:
+        """Re-arm the stability timer whenever the transcript of the turn changes."""
+        # Deepgram finalizes a long utterance in segments; interims cover the current one
+        if event.is_final:
+            self._finals.append(event.transcript)
+            transcript = " ".join(self._finals)
+        else:
+            transcript = " ".join(self._finals + [event.transcript])
+        transcript = transcript.strip()
+        if normalize_transcript(transcript) == normalize_transcript(self._transcript):
+            return
+        self._transcript = transcript
+        self._cancel_timer()
+        # Anything started on the shorter transcript can no longer match
+        self._discard()
+        if transcript and self._agent_state not in ("speaking", "thinking"):
+            self._timer = asyncio.get_running_loop().call_later(self.stable_s, self._on_stable, transcript)
+
+    def on_item_added(self, event: Any) -> None:
+        # The user's turn was committed: the next transcript starts a new one
+        if event.item.type == "message" and event.item.role == "user":
+            self._finals = []
+            self._transcript = ""
+            self._cancel_timer()
+
+    def _on_stable(self, transcript: str) -> None:
+        self._timer = None
+        if self._agent_state in ("speaking", "thinking"):
+            return
+        history, stream = self.start(transcript)
+        self._current = Speculation(transcript, history, stream)
+        self.started += 1
+
+    def _cancel_timer(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _discard(self) -> None:
+        if self._current is not None:
+            self._current.cancel()
+            self._current = None
+            self.misses += 1
+
+    def take(self, chat_ctx: llm.ChatContext) -> Optional[AsyncIterable[llm.ChatChunk]]:
+        """
+        Return the replay of a speculation made for this request, if there is one.
+
+        Only the first request of a turn, the one ending in the user's message,
+        can match; tool follow-ups leave a pending speculation alone.
+        """
+        items = chat_ctx.items
+        if self._current is None or not items or items[-1].type != "message" or items[-1].role != "user":
+            return None
+        speculation = self._current
+        self._current = None
+        if (
+            speculation.error is not None
+            or history_key(items[:-1]) != speculation.history
+            or normalize_transcript(items[-1].text_content or "") != normalize_transcript(speculation.transcript)
+        ):
+            speculation.cancel()
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        taken = time.perf_counter()
+        return self._replay(speculation, taken)
+
+    async def _replay(self, speculation: Speculation, taken: float) -> AsyncIterable[llm.ChatChunk]:
+        first = True
+        async for chunk in speculation.replay():
+            if first:
+                first = False
+                # The head start is the time-to-first-token the caller did not wait for
+                ttft = speculation.first_chunk_at - speculation.started
+                self.saved_s.append(min(taken - speculation.started, ttft))
+            yield chunk
+
+    async def aclose(self) -> None:
+        self._cancel_timer()
+        if self._current is not None:
+            self._current.cancel()
+            self._current = None
+
+    def stats(self) -> Dict[str, Any]:
+        decided = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "started": self.started,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / decided, 4) if decided else 0.0,
+            "avg_saved_ms": round(sum(self.saved_s) / len(self.saved_s) * 1000, 1) if self.saved_s else None,
+            "total_saved_ms": round(sum(self.saved_s) * 1000, 1)
+        }
@@ -0,0 +1,237 @@
+"""
+Per-Turn Latency Tracing
+
+A caller's "slow to answer" is the sum of several stages: the VAD noticing
+the end of speech, Deepgram's final transcript, the turn detector's
+decision, the LLM's first token (once per request when tools are called),
+each tool call, and the TTS's first audio byte. TurnTracer follows a
+session and, for every user turn, emits a "turn" span from the end of the
+caller's speech to the agent's first audio, with one child span per stage
+placed on the same timeline. Stage timings come from the metrics the
+session attaches to chat messages, the Assistant's LLM requests and the
+tool call listener the tracer keeps in its session's userdata, so each
+session's spans hold only its own tool calls.
+
+Spans go to OpenTelemetry through a tracer provider of their own: to an
+OTLP collector when OTEL_EXPORTER_OTLP_ENDPOINT is set, and to a JSON-lines
+file when POLICY_BOSS_TRACE_LOG is set, which benchmarks/trace_report.py
+summarizes per stage.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import ReadableSpan, TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, SpanExporter, SpanExportResult
+from opentelemetry.trace import Span, Tracer, set_span_in_context
+
+from tools.metrics import get_tool_metrics
+
+
+logger = logging.getLogger("policy-boss.tracing")
+
+# JSON-lines file that finished spans are appended to, if set
+TRACE_LOG = os.environ.get("POLICY_BOSS_TRACE_LOG")
+
+# Standard OpenTelemetry variable naming the collector to export to, if set
+OTLP_ENDPOINT = os.environ.get("OTEL_EXPORTER_OTLP_ENDPOINT")
+
+TRACING_ENABLED = bool(TRACE_LOG or OTLP_ENDPOINT)
+
+SERVICE_NAME = "policy-boss-agent"
+
+# Longest a job's shutdown waits for its spans to be exported
+FLUSH_TIMEOUT_S = 5.0
+
+
+class JsonlSpanExporter(SpanExporter):
+    """Appends each finished span to a JSON-lines file, one object per span."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        lines = []
+        for span in spans:
+            parent = span.parent.span_id if span.parent is not None else None
+            lines.append(json.dumps({
+                "name": span.name,
+                "trace_id": f"{span.context.trace_id:032x}",
+                "span_id": f"{span.context.span_id:016x}",
+                "parent_id": f"{parent:016x}" if parent is not None else None,
+                "start": span.start_time / 1e9,
+                "end": span.end_time / 1e9,
+                "duration_ms": round((span.end_time - span.start_time) / 1e6, 3),
+                "attributes": dict(span.attributes or {})
+            }))
+        try:
+            with self._lock, open(self.path, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+        except OSError:
+            logger.exception("failed to write spans", extra={"path": self.path})
+            return SpanExportResult.FAILURE
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self) -> None:
+        pass
+
+
+_provider: Optional[TracerProvider] = None
+
+
+def get_tracer_provider() -> TracerProvider:
+    """Return this process's tracer provider for turn spans, set up from the environment."""
+    global _provider
+    if _provider is None:
+        provider = TracerProvider(resource=Resource.create({"service.name": SERVICE_NAME}))
+        if TRACE_LOG:
+            provider.add_span_processor(BatchSpanProcessor(JsonlSpanExporter(TRACE_LOG)))
+        if OTLP_ENDPOINT:
+            # Only needed when exporting to a collector
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+            provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+        _provider = provider
+    return _provider
+
+
+def _ns(wall: float) -> int:
+    return int(wall * 1e9)
+
+
+class Turn:
+    """What one user turn has recorded so far."""
+
+    def __init__(self, index: int, user_metrics: Dict[str, Any], speech_ended_at: Optional[float]) -> None:
+        self.index = index
+        self.user = user_metrics
+        self.speech_ended_at = speech_ended_at
+        self.assistant: List[Dict[str, Any]] = []
+        self.llm_calls: List[Dict[str, float]] = []
+        self.tool_calls: List[Dict[str, Any]] = []
+
+
+class TurnTracer:
+    """
+    Traces one session's turns.
+
+    attach() follows the session's chat items and user state and registers
+    for its tool calls; the Assistant reports its LLM requests with
+    record_llm(). A turn is exported when the next one starts
+    or the session ends.
+    """
+
+    def __init__(self, session_id: str, provider: Optional[TracerProvider] = None) -> None:
+        self.session_id = session_id
+        self.provider = provider or get_tracer_provider()
+        self.tracer: Tracer = self.provider.get_tracer("policy-boss.turns")
+        self.turns = 0
+        self._turn: Optional[Turn] = None
+        self._vad_end_at: Optional[float] = None
+        # Tool timings use the monotonic clock; spans need wall-clock times
+        self._wall_offset = time.time() - time.perf_counter()
+        self._userdata: Optional[Dict[str, Any]] = None
+
+    def attach(self, session: Any) -> None:
+        session.on("user_state_changed", self.on_user_state)
+        session.on("conversation_item_added", self.on_item_added)
+        if isinstance(session.userdata, dict):
+            self._userdata = session.userdata
+            get_tool_metrics().add_listener(self._userdata, self.on_tool_call)
+
+    def on_user_state(self, event: Any) -> None:
+        # The VAD has decided the caller stopped speaking
+        if event.old_state == "speaking" and event.new_state != "speaking":
+            self._vad_end_at = event.created_at
+
+    def on_item_added(self, event: Any) -> None:
+        item = event.item
+        if item.type != "message":
+            return
+        if item.role == "user":
+            self._export()
+            self.turns += 1
+            self._turn = Turn(self.turns, dict(item.metrics), self._vad_end_at)
+            self._vad_end_at = None
+        elif item.role == "assistant" and self._turn is not None:
+            self._turn.assistant.append(dict(item.metrics))
+
+    def record_llm(self, started_at: float, ttft: Optional[float]) -> None:
+        """Called by the Assistant for each LLM request, with its wall-clock start."""
+        if self._turn is not None and ttft is not None:
+            self._turn.llm_calls.append({"start": started_at, "ttft": ttft})
+
+    def on_tool_call(self, tool: str, started: float, elapsed: float, ok: bool) -> None:
+        if self._turn is not None:
+            self._turn.tool_calls.append({
+                "tool": tool, "start": started + self._wall_offset, "duration": elapsed, "ok": ok
+            })
+
+    def _export(self) -> None:
+        turn, self._turn = self._turn, None
+        if turn is None:
+            return
+        user = turn.user
+        spoken_end = user.get("stopped_speaking_at")
+        if spoken_end is None:
+            # Typed input has no speech to measure from
+            return
+
+        # Each stage: (name, start, end, attributes), on the wall clock
+        stages = []
+        if turn.speech_ended_at is not None and turn.speech_ended_at >= spoken_end:
+            stages.append(("vad_end_of_speech", spoken_end, turn.speech_ended_at, {}))
+        if "transcription_delay" in user:
+            stages.append(("stt_final_transcript", spoken_end, spoken_end + user["transcription_delay"], {}))
+        if "end_of_turn_delay" in user:
+            decided_at = spoken_end + user["end_of_turn_delay"]
+            stages.append(("turn_decision", spoken_end, decided_at, {}))
+            if "on_user_turn_completed_delay" in user:
+                stages.append((
+                    "on_user_turn_completed", decided_at, decided_at + user["on_user_turn_completed_delay"], {}
+                ))
+        for index, call in enumerate(turn.llm_calls):
+            stages.append(("llm_first_token", call["start"], call["start"] + call["ttft"], {"llm.request": index}))
+        for call in turn.tool_calls:
+            stages.append((
+                "tool_call", call["start"], call["start"] + call["duration"], {"tool.name": call["tool"], "tool.ok": call["ok"]}
+            ))
+        # The first reply that reached the caller's ear
+        reply = next((metrics for metrics in turn.assistant if "e2e_latency" in metrics), None)
+        first_audio_at = None
+        if reply is not None:
+            first_audio_at = spoken_end + reply["e2e_latency"]
+            if "tts_node_ttfb" in reply:
+                stages.append(("tts_first_byte", first_audio_at - reply["tts_node_ttfb"], first_audio_at, {}))
+
+        end = max([first_audio_at or spoken_end] + [stage[2] for stage in stages])
+        attributes = {
+            "session.id": self.session_id,
+            "turn.index": turn.index,
+            "turn.llm_requests": len(turn.llm_calls),
+            "turn.tool_calls": len(turn.tool_calls)
+        }
+        if reply is not None:
+            attributes["turn.e2e_ms"] = round(reply["e2e_latency"] * 1000, 1)
+        span: Span = self.tracer.start_span("turn", start_time=_ns(spoken_end), attributes=attributes)
+        context = set_span_in_context(span)
+        for name, start, stage_end, stage_attributes in stages:
+            child = self.tracer.start_span(
+                name, context=context, start_time=_ns(start),
+                attributes={"session.id": self.session_id, "turn.index": turn.index, **stage_attributes}
+            )
+            child.end(end_time=_ns(max(stage_end, start)))
+        span.end(end_time=_ns(end))
+
+    async def aclose(self) -> None:
+        """Export the last turn and wait for the spans to leave the process."""
+        self._export()
+        if self._userdata is not None:
+            get_tool_metrics().remove_listener(self._userdata)
+        await asyncio.to_thread(self.provider.force_flush, int(FLUSH_TIMEOUT_S * 1000))
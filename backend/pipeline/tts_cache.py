@@ -0,0 +1,308 @@
+"""
+Shared TTS Phrase Cache
+
+This module caches synthesized audio for recurring utterances ("ek second,
+main check karti hoon", confirmations, policy-type explanations) so they are
+synthesized once per node instead of once per call. Audio lives in one
+memory-mapped PCM file split into fixed-size slots, indexed by a SQLite
+database; every job process on the node maps the same file. When the file is
+full the least recently used phrase gives up its slot.
+
+CachedTTS wraps the real TTS. It reports itself as non-streaming, so the
+session splits replies into sentences and each sentence is looked up on its
+own; misses fall through to the wrapped TTS and are stored for next time.
+Lookups run on a worker thread and the bookkeeping and stores in the
+background, so the event loop that plays every session's audio never waits
+on SQLite or a slot copy.
+"""
+
+import asyncio
+import hashlib
+import logging
+import mmap
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, NamedTuple, Optional, Set
+
+from livekit.agents import APIConnectOptions, tts, utils
+from livekit.agents.types import DEFAULT_API_CONNECT_OPTIONS
+
+
+logger = logging.getLogger("policy-boss.tts-cache")
+
+# Set to 0 to send every sentence to the TTS provider
+CACHE_ENABLED = os.environ.get("POLICY_BOSS_TTS_CACHE", "1") != "0"
+
+CACHE_DIR = os.environ.get(
+    "POLICY_BOSS_TTS_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "policy_boss", "tts_cache")
+)
+CAPACITY_BYTES = int(os.environ.get("POLICY_BOSS_TTS_CACHE_MB", 256)) * 1024 * 1024
+
+# Longest phrase that fits a slot: 512 KB is about 10 s of 24 kHz mono audio
+SLOT_BYTES = int(os.environ.get("POLICY_BOSS_TTS_CACHE_SLOT_KB", 512)) * 1024
+
+# Each slot starts with the key of the phrase it holds; a reader checks it
+# before and after copying so a slot rewritten underneath it reads as a miss
+_HEADER_BYTES = 16
+_EMPTY_HEADER = bytes(_HEADER_BYTES)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS phrases (
+    key BLOB PRIMARY KEY,
+    slot INTEGER NOT NULL UNIQUE,
+    length INTEGER NOT NULL,
+    sample_rate INTEGER NOT NULL,
+    num_channels INTEGER NOT NULL,
+    chars INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS phrases_lru_idx ON phrases (last_used);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+COUNTERS = ("hits", "misses", "chars_saved", "chars_synthesized")
+
+
+class Phrase(NamedTuple):
+    pcm: bytes
+    sample_rate: int
+    num_channels: int
+
+
+def phrase_key(text: str, voice_id: str, model: str, sample_rate: int) -> bytes:
+    return hashlib.sha256(f"{voice_id}\0{model}\0{sample_rate}\0{text}".encode("utf-8")).digest()[:_HEADER_BYTES]
+
+
+class PhraseCache:
+    """
+    Size-bounded LRU cache of PCM audio shared by the job processes on a node.
+
+    Slot allocation and eviction happen inside one SQLite write transaction,
+    so concurrent writers in different processes never pick the same slot.
+    """
+
+    def __init__(self, directory: str, capacity_bytes: int = CAPACITY_BYTES, slot_bytes: int = SLOT_BYTES) -> None:
+        os.makedirs(directory, exist_ok=True)
+        self.slot_bytes = slot_bytes
+        self.slots = max(capacity_bytes // slot_bytes, 1)
+        size = self.slots * slot_bytes
+
+        self._fd = os.open(os.path.join(directory, "phrases.pcm"), os.O_RDWR | os.O_CREAT, 0o644)
+        if os.fstat(self._fd).st_size != size:
+            # Sparse on Linux: disk is only used as slots get written
+            os.ftruncate(self._fd, size)
+        self._map = mmap.mmap(self._fd, size)
+
+        self._conn = sqlite3.connect(os.path.join(directory, "phrases.db"), timeout=1.0, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+        # Counters for this process; the node-wide ones are in the counters table
+        self.hits = 0
+        self.misses = 0
+        self.chars_saved = 0
+        self.chars_synthesized = 0
+
+    def close(self) -> None:
+        self._map.close()
+        os.close(self._fd)
+        self._conn.close()
+
+    @property
+    def max_phrase_bytes(self) -> int:
+        return self.slot_bytes - _HEADER_BYTES
+
+    def get(self, key: bytes) -> Optional[Phrase]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT slot, length, sample_rate, num_channels FROM phrases WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        slot, length, sample_rate, num_channels = row
+        offset = slot * self.slot_bytes
+        if self._map[offset:offset + _HEADER_BYTES] != key:
+            return None
+        pcm = self._map[offset + _HEADER_BYTES:offset + _HEADER_BYTES + length]
+        if self._map[offset:offset + _HEADER_BYTES] != key:
+            return None
+        return Phrase(pcm, sample_rate, num_channels)
+
+    def put(self, key: bytes, phrase: Phrase, chars: int) -> bool:
+        """
+        Store a phrase, evicting the least recently used one if every slot is taken.
+
+        Returns:
+            False if the phrase is too long for a slot or was already stored
+        """
+        if len(phrase.pcm) > self.max_phrase_bytes:
+            return False
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            if self._conn.execute("SELECT 1 FROM phrases WHERE key = ?", (key,)).fetchone():
+                return False
+            used = self._conn.execute("SELECT COUNT(*) FROM phrases").fetchone()[0]
+            if used < self.slots:
+                # Slots are only freed by eviction, which reuses them at once,
+                # so the ones in use are always 0..used-1
+                slot = used
+            else:
+                slot = self._conn.execute(
+                    "SELECT slot FROM phrases ORDER BY last_used LIMIT 1"
+                ).fetchone()[0]
+                self._conn.execute("DELETE FROM phrases WHERE slot = ?", (slot,))
+
+            offset = slot * self.slot_bytes
+            self._map[offset:offset + _HEADER_BYTES] = _EMPTY_HEADER
+            self._map[offset + _HEADER_BYTES:offset + _HEADER_BYTES + len(phrase.pcm)] = phrase.pcm
+            self._map[offset:offset + _HEADER_BYTES] = key
+            self._conn.execute(
+                "INSERT INTO phrases VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, slot, len(phrase.pcm), phrase.sample_rate, phrase.num_channels, chars, time.time())
+            )
+        return True
+
+    def record(self, key: bytes, hit: bool, chars: int) -> None:
+        """Count a lookup here and node-wide, and mark a hit phrase as recently used."""
+        if hit:
+            self.hits += 1
+            self.chars_saved += chars
+            increments = (("hits", 1), ("chars_saved", chars))
+        else:
+            self.misses += 1
+            self.chars_synthesized += chars
+            increments = (("misses", 1), ("chars_synthesized", chars))
+        try:
+            with self._lock, self._conn:
+                if hit:
+                    self._conn.execute("UPDATE phrases SET last_used = ? WHERE key = ?", (time.time(), key))
+                for name, value in increments:
+                    self._conn.execute(
+                        "INSERT INTO counters VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET value = value + ?",
+                        (name, value, value)
+                    )
+        except sqlite3.OperationalError:
+            # Another process holds the write lock; bookkeeping is best effort
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            node = dict(self._conn.execute("SELECT name, value FROM counters").fetchall())
+            phrases, used_bytes = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(length), 0) FROM phrases").fetchone()
+        lookups = self.hits + self.misses
+        node_lookups = node.get("hits", 0) + node.get("misses", 0)
+        return {
+            "process": {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "chars_saved": self.chars_saved,
+                "chars_synthesized": self.chars_synthesized
+            },
+            "node": {
+                **{name: node.get(name, 0) for name in COUNTERS},
+                "hit_ratio": round(node.get("hits", 0) / node_lookups, 4) if node_lookups else 0.0,
+                "phrases": phrases,
+                "slots": self.slots,
+                "audio_bytes": used_bytes
+            }
+        }
+
+
+_cache: Optional[PhraseCache] = None
+
+
+def get_phrase_cache() -> PhraseCache:
+    """Return this process's handle on the node-wide cache in POLICY_BOSS_TTS_CACHE_DIR."""
+    global _cache
+    if _cache is None:
+        _cache = PhraseCache(CACHE_DIR)
+    return _cache
+
+
+class CachedTTS(tts.TTS):
+    """TTS that serves recurring sentences from the phrase cache and synthesizes the rest."""
+
+    def __init__(self, wrapped: tts.TTS, voice_id: str, model: str, cache: Optional[PhraseCache] = None) -> None:
+        super().__init__(
+            capabilities=tts.TTSCapabilities(streaming=False),
+            sample_rate=wrapped.sample_rate,
+            num_channels=wrapped.num_channels
+        )
+        self.wrapped = wrapped
+        self.voice_id = voice_id
+        self.tts_model = model
+        self.cache = cache if cache is not None else get_phrase_cache()
+        self._background: Set["asyncio.Task[Any]"] = set()
+
+    @property
+    def model(self) -> str:
+        return self.wrapped.model
+
+    @property
+    def provider(self) -> str:
+        return self.wrapped.provider
+
+    def synthesize(
+        self, text: str, *, conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS
+    ) -> tts.ChunkedStream:
+        return _CachedChunkedStream(tts=self, input_text=text, conn_options=conn_options)
+
+    def in_background(self, fn: Callable[..., Any], *args: Any) -> None:
+        """Run a cache write on a worker thread without holding up the audio."""
+        task = asyncio.create_task(asyncio.to_thread(fn, *args))
+        self._background.add(task)
+        task.add_done_callback(self._background_done)
+
+    def _background_done(self, task: "asyncio.Task[Any]") -> None:
+        self._background.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("phrase cache write failed", exc_info=task.exception())
+
+    async def aclose(self) -> None:
+        # Let pending stores finish, so phrases synthesized late in the call are kept
+        if self._background:
+            await asyncio.gather(*self._background, return_exceptions=True)
+        await self.wrapped.aclose()
+
+
+class _CachedChunkedStream(tts.ChunkedStream):
+    async def _run(self, output_emitter: tts.AudioEmitter) -> None:
+        cached_tts: CachedTTS = self._tts
+        cache = cached_tts.cache
+        text = self._input_text.strip()
+        key = phrase_key(text, cached_tts.voice_id, cached_tts.tts_model, cached_tts.sample_rate)
+
+        output_emitter.initialize(
+            request_id=utils.shortuuid(),
+            sample_rate=cached_tts.sample_rate,
+            num_channels=cached_tts.num_channels,
+            mime_type="audio/pcm"
+        )
+
+        phrase = await asyncio.to_thread(cache.get, key) if text else None
+        if phrase is not None:
+            cached_tts.in_background(cache.record, key, True, len(text))
+            output_emitter.push(phrase.pcm)
+            output_emitter.flush()
+            return
+
+        chunks = []
+        async with cached_tts.wrapped.synthesize(self._input_text, conn_options=self._conn_options) as stream:
+            async for audio in stream:
+                chunks.append(bytes(audio.frame.data))
+                output_emitter.push_frame(audio.frame)
+        output_emitter.flush()
+
+        if text:
+            phrase = Phrase(b"".join(chunks), cached_tts.sample_rate, cached_tts.num_channels)
+            cached_tts.in_background(cache.record, key, False, len(text))
+            cached_tts.in_background(cache.put, key, phrase, len(text))
@@ -0,0 +1,201 @@
+"""
+Tests for single-flight lookups and per-turn deadlines
+
+SingleFlight must run one execution for callers that arrive together, from
+the same event loop or from the loops of other threads, start afresh once a
+key is forgotten, and let waiters run the lookup themselves when the loop of
+the execution they joined shuts down. turn_deadline must fail a call that
+outlives its turn's budget with a ToolError.
+
+Usage: python -m pytest tests (from backend/)
+"""
+
+import asyncio
+import os
+import sys
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from livekit.agents import ToolError  # noqa: E402
+
+from tools import concurrency  # noqa: E402
+from tools.concurrency import SingleFlight, TurnDeadlines, turn_deadline  # noqa: E402
+
+
+class Lookup:
+    """A lookup that counts its executions and takes `latency` seconds."""
+
+    def __init__(self, latency: float = 0.05) -> None:
+        self.latency = latency
+        self.executions = 0
+        self.started = threading.Event()
+
+    async def __call__(self) -> str:
+        self.executions += 1
+        execution = self.executions
+        self.started.set()
+        await asyncio.sleep(self.latency)
+        return f"result {execution}"
+
+
+def test_concurrent_callers_join_one_execution():
+    async def run():
+        flight, lookup = SingleFlight(), Lookup()
+        results = await asyncio.gather(*(flight.do("customer:1001", lookup) for _ in range(3)))
+
+        assert results == ["result 1"] * 3
+        assert lookup.executions == 1
+        assert flight.executions == 1 and flight.joined == 2
+        assert len(flight) == 0
+
+    asyncio.run(run())
+
+
+def test_errors_are_shared_and_not_kept():
+    async def run():
+        flight = SingleFlight()
+
+        async def failing() -> str:
+            await asyncio.sleep(0.01)
+            raise RuntimeError("database is locked")
+
+        results = await asyncio.gather(flight.do("quote", failing), flight.do("quote", failing), return_exceptions=True)
+        assert [str(r) for r in results] == ["database is locked"] * 2
+        assert await flight.do("quote", Lookup(latency=0)) == "result 1"
+
+    asyncio.run(run())
+
+
+def test_forgotten_key_starts_a_fresh_execution():
+    async def run():
+        flight, lookup = SingleFlight(), Lookup()
+        first = asyncio.ensure_future(flight.do("customer:1001", lookup))
+        await asyncio.sleep(0)
+
+        # Written while the first lookup ran: the next caller must not get its older result
+        flight.forget("customer:1001")
+        second = asyncio.ensure_future(flight.do("customer:1001", lookup))
+        await asyncio.sleep(0)
+        third = asyncio.ensure_future(flight.do("customer:1001", lookup))
+
+        assert await asyncio.gather(first, second, third) == ["result 1", "result 2", "result 2"]
+        assert lookup.executions == 2
+        assert flight.executions == 2 and flight.joined == 1
+        assert len(flight) == 0
+
+    asyncio.run(run())
+
+
+def test_cancelled_caller_does_not_cancel_the_execution():
+    async def run():
+        flight, lookup = SingleFlight(), Lookup()
+        leader = asyncio.ensure_future(flight.do("policy:P-1", lookup))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do("policy:P-1", lookup))
+        await asyncio.sleep(0)
+
+        leader.cancel()
+        assert await follower == "result 1"
+        assert leader.cancelled()
+        assert lookup.executions == 1
+
+    asyncio.run(run())
+
+
+def test_waiters_on_another_loop_join_the_flight():
+    flight, lookup = SingleFlight(), Lookup(latency=0.2)
+    results = []
+
+    def other_job() -> None:
+        lookup.started.wait(5)
+        results.append(asyncio.run(flight.do("vehicle:MH01AB1234", lookup)))
+
+    async def run():
+        thread = threading.Thread(target=other_job)
+        thread.start()
+        result = await flight.do("vehicle:MH01AB1234", lookup)
+        await asyncio.to_thread(thread.join, 5)
+        return result
+
+    assert asyncio.run(run()) == "result 1"
+    assert results == ["result 1"]
+    assert lookup.executions == 1
+    assert flight.joined == 1
+
+
+def test_waiters_run_the_lookup_when_its_loop_shuts_down():
+    flight = SingleFlight()
+    release = threading.Event()
+    executions = []
+
+    async def lookup() -> str:
+        executions.append(threading.current_thread().name)
+        if len(executions) == 1:
+            # The first job's lookup never finishes before its loop goes away
+            await asyncio.sleep(3600)
+        return "fresh"
+
+    def first_job() -> None:
+        async def job():
+            asyncio.ensure_future(flight.do("customer:1002", lookup))
+            await asyncio.to_thread(release.wait, 5)
+
+        # Shutting the loop down cancels the execution it started
+        asyncio.run(job())
+
+    async def run():
+        thread = threading.Thread(target=first_job, name="first-job")
+        thread.start()
+        while not executions:
+            await asyncio.sleep(0.01)
+        waiter = asyncio.ensure_future(flight.do("customer:1002", lookup))
+        await asyncio.sleep(0)
+        assert flight.joined == 1
+
+        release.set()
+        result = await asyncio.wait_for(waiter, 5)
+        await asyncio.to_thread(thread.join, 5)
+        return result
+
+    assert asyncio.run(run()) == "fresh"
+    assert executions == ["first-job", "MainThread"]
+
+
+@pytest.fixture
+def deadlines(monkeypatch):
+    deadlines = TurnDeadlines(deadline=0.1, min_budget=0.05)
+    monkeypatch.setattr(concurrency, "_deadlines", deadlines)
+    return deadlines
+
+
+def turn(speech_id: str) -> SimpleNamespace:
+    # Only the speech handle is read from the RunContext
+    return SimpleNamespace(speech_handle=SimpleNamespace(id=speech_id))
+
+
+@turn_deadline
+async def lookup_quote(context, latency: float) -> str:
+    await asyncio.sleep(latency)
+    return "quote"
+
+
+def test_call_past_the_turn_budget_raises_tool_error(deadlines):
+    async def run():
+        with pytest.raises(ToolError, match="lookup_quote is taking longer than expected"):
+            await lookup_quote(turn("speech_1"), 1.0)
+        assert deadlines.stats()["timeouts"] == 1
+
+        # The turn's budget is spent, but a later call still gets the minimum
+        assert await lookup_quote(turn("speech_1"), 0.01) == "quote"
+        with pytest.raises(ToolError):
+            await lookup_quote(turn("speech_1"), 0.08)
+
+        # A new turn starts with the full budget
+        assert await lookup_quote(turn("speech_2"), 0.08) == "quote"
+        assert deadlines.stats() == {"deadline_ms": 100, "calls": 4, "timeouts": 2}
+
+    asyncio.run(run())
@@ -0,0 +1,35 @@
+"""
+Tests for fleet pricing
+
+calculate_fleet_premiums must price every vehicle as calculate_premium
+prices it on its own, whatever spelling the LLM uses for the vehicle and
+coverage types.
+
+Usage: python -m pytest tests (from backend/)
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools import calculate_fleet_premiums, calculate_premium  # noqa: E402
+
+
+VEHICLES = [
+    ("Four Wheeler", 500000, 3, "Zero Dep", ["Engine Protection"]),
+    ("four_wheeler", 500000, 3, "zero_dep", []),
+    ("two-wheeler", 80000, 1, "Comprehensive", []),
+    (" Commercial ", 1200000, 7, "third party", []),
+]
+
+
+@pytest.mark.parametrize("vehicle_type,value,age,coverage,add_ons", VEHICLES)
+def test_fleet_price_matches_single_vehicle_price(vehicle_type, value, age, coverage, add_ons):
+    single = asyncio.run(calculate_premium(None, vehicle_type, value, age, coverage, add_ons))
+    fleet = asyncio.run(calculate_fleet_premiums(None, [vehicle_type], [value], [age], [coverage], [add_ons]))
+    assert fleet["vehicles"][0]["final_premium"] == single["final_premium"]
+    assert fleet["fleet_totals"]["total_final_premium"] == single["final_premium"]
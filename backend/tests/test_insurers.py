@@ -0,0 +1,66 @@
+"""
+Tests for the process-wide insurer adapter list
+
+Registering an insurer integration must add it to the catalog's default
+adapters, whether or not they were created yet, and only
+replace_insurer_adapters may drop the defaults.
+
+Usage: python -m pytest tests (from backend/)
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools import insurers  # noqa: E402
+from tools.insurers import (  # noqa: E402
+    CatalogInsurerAdapter,
+    InsurerAdapter,
+    get_insurer_adapters,
+    register_insurer_adapter,
+    replace_insurer_adapters
+)
+from tools.rate_catalog import get_rate_catalog  # noqa: E402
+
+
+class LiveAdapter(InsurerAdapter):
+    """Stands in for a live integration added by a deployment."""
+
+    async def quote(self, request):
+        return ()
+
+
+@pytest.fixture(autouse=True)
+def fresh_adapters(monkeypatch):
+    monkeypatch.delenv("POLICY_BOSS_INSURER_ADAPTERS", raising=False)
+    monkeypatch.setattr(insurers, "_adapters", None)
+
+
+def companies():
+    return [adapter.company for adapter in get_insurer_adapters()]
+
+
+def test_registering_before_first_use_keeps_the_defaults():
+    register_insurer_adapter(LiveAdapter("Live General"))
+
+    catalog = list(get_rate_catalog().companies)
+    assert catalog
+    assert companies() == catalog + ["Live General"]
+    assert all(isinstance(adapter, CatalogInsurerAdapter) for adapter in get_insurer_adapters()[:-1])
+
+
+def test_registering_after_first_use_adds_to_the_defaults():
+    defaults = companies()
+    register_insurer_adapter(LiveAdapter("Live General"))
+
+    assert companies() == defaults + ["Live General"]
+
+
+def test_replacing_drops_the_defaults():
+    replace_insurer_adapters([LiveAdapter("Live General")])
+    register_insurer_adapter(LiveAdapter("Live Motor"))
+
+    assert companies() == ["Live General", "Live Motor"]
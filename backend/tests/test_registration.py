@@ -0,0 +1,63 @@
+"""
+Tests for registration number validation
+
+A number must be judged the same whether the agent validates it on its own or
+it arrives in a fleet CSV, and the bulk validator must report the same counts
+and invalid lines however the file is split into chunks.
+
+Usage: python -m pytest tests (from backend/)
+"""
+
+import io
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.registration import InvalidRow, validate_registration, validate_registration_stream  # noqa: E402
+
+
+NUMBERS = ["MH01AB1234", " KA02EF9012", "DL05CD5678 ", "\tTN10XYZ1234", "mh01ab1234", "MH1AB1234", "MH01 AB1234", ""]
+
+FLEET = (
+    b"make,registration,year\n"
+    b"Tata,MH01AB1234,2019\n"
+    b"Tata, KA02EF9012 ,2020\n"
+    b"Mahindra,\"DL05CD5678\",2021\r\n"
+    b"\n"
+    b"Maruti,MH1AB1234,2018\n"
+    b"Maruti,dl05cd5678,2018\n"
+    b"Ashok Leyland,UP32AB0001"
+)
+
+
+@pytest.mark.parametrize("number", NUMBERS)
+def test_bulk_and_single_validation_agree(number):
+    result = validate_registration_stream(io.BytesIO(f"registration\n{number},x\n".encode()))
+    single = validate_registration(number)
+
+    assert result.valid == int(single["is_valid"])
+    if single["is_valid"]:
+        assert single["registration_number"] == number.strip()
+        assert result.by_state == {single["state_code"]: 1}
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 4 * 1024 * 1024])
+def test_fleet_file_is_validated_the_same_in_any_chunking(chunk_size):
+    result = validate_registration_stream(io.BytesIO(FLEET), column="registration", chunk_size=chunk_size)
+
+    assert (result.total, result.valid, result.invalid) == (6, 4, 2)
+    assert result.by_state == {"MH": 1, "KA": 1, "DL": 1, "UP": 1}
+    assert result.invalid_rows == [InvalidRow(6, "MH1AB1234"), InvalidRow(7, "dl05cd5678")]
+    assert not result.invalid_rows_truncated
+
+
+def test_invalid_rows_beyond_the_limit_are_only_counted():
+    rows = b"".join(b"MH%02dA123\n" % i for i in range(10))
+    result = validate_registration_stream(io.BytesIO(rows), has_header=False, max_invalid_rows=3)
+
+    assert result.invalid == 10
+    assert [row.line for row in result.invalid_rows] == [1, 2, 3]
+    assert result.invalid_rows_truncated
@@ -0,0 +1,321 @@
+"""
+Tests for latency-aware provider routing
+
+Two stand-in providers sit behind each of RoutedLLM, RoutedTTS and RoutedSTT,
+with stall timeouts and cooldowns shortened so a test takes a fraction of a
+second. A request whose primary errors or stalls must be served by the
+backup, an STT stream must move to the backup mid-utterance without losing
+the final transcript, and the primary must be tried again once its cooldown
+has passed.
+
+Usage: python -m pytest tests (from backend/)
+"""
+
+import asyncio
+import os
+import sys
+from typing import List, Optional
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from livekit import rtc  # noqa: E402
+from livekit.agents import APIConnectionError, APIConnectOptions, llm, stt, tts, utils  # noqa: E402
+from livekit.agents.types import DEFAULT_API_CONNECT_OPTIONS  # noqa: E402
+
+from pipeline import routing  # noqa: E402
+from pipeline.routing import ModalityRouter, RoutedLLM, RoutedSTT, RoutedTTS  # noqa: E402
+
+
+SAMPLE_RATE = 24000
+
+STALL_S = 0.2
+
+COOLDOWN_S = 0.3
+
+
+class Behaviour:
+    """How a stand-in provider answers: after a latency, never (None), or with an error."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.latency: Optional[float] = 0.01
+        self.fails = False
+        self.served = 0
+
+    async def wait(self) -> None:
+        if self.fails:
+            raise APIConnectionError(f"{self.name} is down", retryable=False)
+        if self.latency is None:
+            await asyncio.sleep(3600)
+        await asyncio.sleep(self.latency)
+        self.served += 1
+
+
+class StandInLLM(llm.LLM):
+    def __init__(self, behaviour: Behaviour) -> None:
+        super().__init__()
+        self.behaviour = behaviour
+
+    @property
+    def model(self) -> str:
+        return self.behaviour.name
+
+    @property
+    def provider(self) -> str:
+        return "stand-in"
+
+    def chat(self, *, chat_ctx: llm.ChatContext, tools=None, conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS, **kwargs) -> llm.LLMStream:
+        return _StandInLLMStream(self, chat_ctx=chat_ctx, tools=tools or [], conn_options=conn_options)
+
+
+class _StandInLLMStream(llm.LLMStream):
+    async def _run(self) -> None:
+        await self._llm.behaviour.wait()
+        self._event_ch.send_nowait(llm.ChatChunk(
+            id="stand-in", delta=llm.ChoiceDelta(role="assistant", content=self._llm.behaviour.name)
+        ))
+
+
+class StandInTTS(tts.TTS):
+    def __init__(self, behaviour: Behaviour, sample_rate: int = SAMPLE_RATE) -> None:
+        super().__init__(capabilities=tts.TTSCapabilities(streaming=False), sample_rate=sample_rate, num_channels=1)
+        self.behaviour = behaviour
+
+    @property
+    def model(self) -> str:
+        return self.behaviour.name
+
+    @property
+    def provider(self) -> str:
+        return "stand-in"
+
+    def synthesize(self, text: str, *, conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS) -> tts.ChunkedStream:
+        return _StandInChunkedStream(tts=self, input_text=text, conn_options=conn_options)
+
+
+class _StandInChunkedStream(tts.ChunkedStream):
+    async def _run(self, output_emitter: tts.AudioEmitter) -> None:
+        output_emitter.initialize(
+            request_id=utils.shortuuid(), sample_rate=self._tts.sample_rate, num_channels=1, mime_type="audio/pcm"
+        )
+        await self._tts.behaviour.wait()
+        output_emitter.push(bytes(self._tts.sample_rate // 5 * 2))
+        output_emitter.flush()
+
+
+class StandInSTT(stt.STT):
+    """Sends an interim per pushed frame and finalizes the utterance on flush, after its latency."""
+
+    def __init__(self, behaviour: Behaviour) -> None:
+        super().__init__(capabilities=stt.STTCapabilities(streaming=True, interim_results=True))
+        self.behaviour = behaviour
+
+    @property
+    def model(self) -> str:
+        return self.behaviour.name
+
+    @property
+    def provider(self) -> str:
+        return "stand-in"
+
+    async def _recognize_impl(self, buffer, *, language=None, conn_options=None) -> stt.SpeechEvent:
+        raise NotImplementedError
+
+    def stream(self, *, language=None, conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS) -> stt.RecognizeStream:
+        return _StandInSpeechStream(stt=self, conn_options=conn_options)
+
+
+class _StandInSpeechStream(stt.RecognizeStream):
+    async def _run(self) -> None:
+        async for data in self._input_ch:
+            if isinstance(data, rtc.AudioFrame):
+                self._event_ch.send_nowait(stt.SpeechEvent(
+                    type=stt.SpeechEventType.INTERIM_TRANSCRIPT,
+                    alternatives=[stt.SpeechData(language="hi", text="haan")]
+                ))
+                continue
+            await self._stt.behaviour.wait()
+            self._event_ch.send_nowait(stt.SpeechEvent(
+                type=stt.SpeechEventType.FINAL_TRANSCRIPT,
+                alternatives=[stt.SpeechData(language="hi", text=self._stt.behaviour.name)]
+            ))
+
+
+@pytest.fixture(autouse=True)
+def fast_routing(monkeypatch):
+    monkeypatch.setattr(routing, "COOLDOWN_S", COOLDOWN_S)
+    monkeypatch.setitem(routing.STALL_TIMEOUTS, "stt", STALL_S)
+    monkeypatch.setitem(routing.STALL_TIMEOUTS, "llm", STALL_S)
+    monkeypatch.setitem(routing.STALL_TIMEOUTS, "tts", STALL_S)
+
+
+def routed_llm() -> RoutedLLM:
+    return RoutedLLM(
+        [StandInLLM(Behaviour("primary")), StandInLLM(Behaviour("backup"))],
+        router=ModalityRouter("llm", ["primary", "backup"])
+    )
+
+
+def routed_tts() -> RoutedTTS:
+    # The backup produces 16 kHz audio, which the router resamples
+    return RoutedTTS(
+        [StandInTTS(Behaviour("primary")), StandInTTS(Behaviour("backup"), sample_rate=16000)],
+        router=ModalityRouter("tts", ["primary", "backup"])
+    )
+
+
+def routed_stt() -> RoutedSTT:
+    return RoutedSTT(
+        [StandInSTT(Behaviour("primary")), StandInSTT(Behaviour("backup"))],
+        router=ModalityRouter("stt", ["primary", "backup"])
+    )
+
+
+async def ask(routed: RoutedLLM, conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS) -> str:
+    chat_ctx = llm.ChatContext()
+    chat_ctx.add_message(role="user", content="Namaste")
+    async with routed.chat(chat_ctx=chat_ctx, conn_options=conn_options) as stream:
+        return "".join([chunk.delta.content async for chunk in stream])
+
+
+async def say(routed: RoutedTTS) -> List[rtc.AudioFrame]:
+    async with routed.synthesize("Ji bilkul") as stream:
+        return [audio.frame async for audio in stream]
+
+
+async def utterance(stream: stt.RecognizeStream) -> str:
+    """Speak one utterance into the stream and return its final transcript."""
+    samples = SAMPLE_RATE // 50
+    stream.push_frame(rtc.AudioFrame(bytes(samples * 2), SAMPLE_RATE, 1, samples))
+    stream.flush()
+    async for event in stream:
+        if event.type == stt.SpeechEventType.FINAL_TRANSCRIPT:
+            return event.alternatives[0].text
+    raise AssertionError("stream ended without a final transcript")
+
+
+def served_by(providers: List[object]) -> List[int]:
+    return [provider.behaviour.served for provider in providers]
+
+
+@pytest.mark.parametrize("failure", ["error", "stall"])
+def test_llm_fails_over_to_the_backup(failure):
+    async def run():
+        routed = routed_llm()
+        primary = routed.providers[0].behaviour
+        if failure == "error":
+            primary.fails = True
+        else:
+            primary.latency = None
+
+        assert await ask(routed) == "backup"
+        assert served_by(routed.providers) == [0, 1]
+        assert routed.router.failovers == 1
+        assert routed.router.health[0].errors == 1
+        assert routed.router.health[0].cooling_down()
+        assert routed.router.ranked() == [1, 0]
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize("failure", ["error", "stall"])
+def test_tts_fails_over_to_the_backup(failure):
+    async def run():
+        routed = routed_tts()
+        primary = routed.providers[0].behaviour
+        if failure == "error":
+            primary.fails = True
+        else:
+            primary.latency = None
+
+        frames = await say(routed)
+        assert served_by(routed.providers) == [0, 1]
+        # Resampled from the backup's 16 kHz to the session's rate
+        assert frames and all(frame.sample_rate == SAMPLE_RATE for frame in frames)
+        assert routed.router.failovers == 1
+        assert routed.router.health[0].errors == 1
+        assert routed.router.health[0].cooling_down()
+
+    asyncio.run(run())
+
+
+def test_all_providers_failing_raises():
+    async def run():
+        routed = routed_llm()
+        for provider in routed.providers:
+            provider.behaviour.fails = True
+
+        # Without the session's own retries, each provider is tried once
+        with pytest.raises(APIConnectionError):
+            await ask(routed, conn_options=APIConnectOptions(max_retry=0))
+        assert [health.errors for health in routed.router.health] == [1, 1]
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize("failure", ["error", "stall"])
+def test_stt_stream_moves_to_the_backup_mid_utterance(failure):
+    async def run():
+        routed = routed_stt()
+        stream = routed.stream()
+        try:
+            assert await utterance(stream) == "primary"
+
+            primary = routed.providers[0].behaviour
+            if failure == "error":
+                primary.fails = True
+            else:
+                primary.latency = None
+            # The backup hears the unfinalized audio again and finalizes it
+            assert await utterance(stream) == "backup"
+            assert routed.router.failovers == 1
+            assert routed.router.health[0].errors == 1
+
+            # The stream stays on the backup for the utterances that follow
+            assert await utterance(stream) == "backup"
+            assert served_by(routed.providers) == [1, 2]
+            assert routed.router.failovers == 1
+        finally:
+            await stream.aclose()
+
+    asyncio.run(run())
+
+
+def test_primary_is_retried_after_its_cooldown():
+    async def run():
+        llm_routed, tts_routed = routed_llm(), routed_tts()
+        llm_routed.providers[0].behaviour.fails = True
+        tts_routed.providers[0].behaviour.fails = True
+        assert await ask(llm_routed) == "backup"
+        await say(tts_routed)
+
+        # Still cooling down: the next requests go straight to the backup
+        llm_routed.providers[0].behaviour.fails = False
+        tts_routed.providers[0].behaviour.fails = False
+        assert await ask(llm_routed) == "backup"
+        await say(tts_routed)
+        assert llm_routed.router.failovers == 1 and tts_routed.router.failovers == 1
+
+        await asyncio.sleep(COOLDOWN_S)
+        for routed in (llm_routed, tts_routed):
+            assert not routed.router.health[0].cooling_down()
+            assert routed.router.ranked() == [0, 1]
+        assert await ask(llm_routed) == "primary"
+        await say(tts_routed)
+        assert served_by(llm_routed.providers) == [1, 2]
+        assert served_by(tts_routed.providers) == [1, 2]
+
+        # A new STT stream opens on the recovered primary too
+        stt_routed = routed_stt()
+        stt_routed.router.health[0].record_error()
+        assert stt_routed.router.ranked() == [1, 0]
+        await asyncio.sleep(COOLDOWN_S)
+        stream = stt_routed.stream()
+        try:
+            assert await utterance(stream) == "primary"
+        finally:
+            await stream.aclose()
+
+    asyncio.run(run())
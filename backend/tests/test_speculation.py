@@ -0,0 +1,176 @@
+"""
+Tests for speculative LLM generation on stable interim transcripts
+
+A scripted STT plays a caller turn into a Speculator as timed interim and
+final transcripts, through the same events the session emits, and the turn is
+then committed. Speculator.take must replay a speculation whose transcript and
+history match the request, cancel one that diverged, and stay out of the way
+when speculation is off.
+
+Usage: python -m pytest tests (from backend/)
+"""
+
+import asyncio
+import importlib
+import os
+import sys
+from typing import List, Sequence, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from livekit.agents import ConversationItemAddedEvent, UserInputTranscribedEvent, llm  # noqa: E402
+from livekit.agents.utils import EventEmitter  # noqa: E402
+
+from pipeline import speculation  # noqa: E402
+from pipeline.speculation import Speculator, history_key  # noqa: E402
+
+
+STABLE_MS = 30
+
+REPLY = ["Ji ", "bilkul, ", "main ", "check ", "karti ", "hoon."]
+
+
+class FakeSession(EventEmitter):
+    """Stands in for the AgentSession: only the events the Speculator follows."""
+
+
+class ScriptedLLM:
+    """Starts speculations as the agent would, and remembers each stream it opened."""
+
+    def __init__(self, history: Sequence[str] = ()) -> None:
+        self.history = tuple(history)
+        self.transcripts: List[str] = []
+        self.closed: List[bool] = []
+
+    def start(self, transcript: str) -> Tuple[Tuple[str, ...], object]:
+        self.transcripts.append(transcript)
+        self.closed.append(False)
+        return self.history, self._generate(len(self.closed) - 1)
+
+    async def _generate(self, index: int):
+        try:
+            for word in REPLY:
+                await asyncio.sleep(0.005)
+                yield llm.ChatChunk(id="scripted", delta=llm.ChoiceDelta(role="assistant", content=word))
+        finally:
+            self.closed[index] = True
+
+
+async def speak(session: FakeSession, transcripts: Sequence[Tuple[int, str, bool]]) -> None:
+    """Play (at_ms, text, is_final) transcripts at their times from now."""
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    for at_ms, text, is_final in transcripts:
+        await asyncio.sleep(max(0.0, start + at_ms / 1000 - loop.time()))
+        session.emit("user_input_transcribed", UserInputTranscribedEvent(transcript=text, is_final=is_final))
+
+
+def commit(session: FakeSession, text: str, history: Sequence[llm.ChatItem] = ()) -> llm.ChatContext:
+    message = llm.ChatMessage(role="user", content=[text])
+    session.emit("conversation_item_added", ConversationItemAddedEvent(item=message))
+    return llm.ChatContext([*history, message])
+
+
+async def reply(stream) -> str:
+    return "".join([chunk.delta.content async for chunk in stream])
+
+
+def setup(scripted: ScriptedLLM, enabled: bool = True) -> Tuple[Speculator, FakeSession]:
+    speculator = Speculator(scripted.start, stable_ms=STABLE_MS, enabled=enabled)
+    session = FakeSession()
+    speculator.attach(session)
+    return speculator, session
+
+
+def test_stable_transcript_is_replayed():
+    async def run():
+        scripted = ScriptedLLM()
+        speculator, session = setup(scripted)
+        await speak(session, [
+            (0, "meri gaadi", False),
+            (10, "meri gaadi ka claim status batao", False),
+            # Stable long enough to start, then finalized with different case and punctuation
+            (80, "Meri gaadi ka claim status batao.", True)
+        ])
+        await asyncio.sleep(0.01)
+        stream = speculator.take(commit(session, "Meri gaadi ka claim status batao."))
+
+        assert stream is not None
+        assert await reply(stream) == "".join(REPLY)
+        assert scripted.transcripts == ["meri gaadi ka claim status batao"]
+        assert speculator.stats()["hits"] == 1 and speculator.stats()["misses"] == 0
+        assert len(speculator.saved_s) == 1
+
+    asyncio.run(run())
+
+
+def test_final_transcript_that_diverges_cancels_the_speculation():
+    async def run():
+        scripted = ScriptedLLM()
+        speculator, session = setup(scripted)
+        await speak(session, [(0, "policy number do hazar ek", False)])
+        await asyncio.sleep(STABLE_MS / 1000 * 2)
+        assert scripted.transcripts == ["policy number do hazar ek"]
+
+        # The final corrects a word and the turn is committed before it could be speculated on
+        await speak(session, [(0, "Policy number 2001.", True)])
+        await asyncio.sleep(0.01)
+        assert speculator.take(commit(session, "Policy number 2001.")) is None
+        assert scripted.closed == [True]
+        assert speculator.misses == 1 and speculator.hits == 0
+
+    asyncio.run(run())
+
+
+def test_committed_text_that_differs_from_the_speculation_is_a_miss():
+    async def run():
+        scripted = ScriptedLLM()
+        speculator, session = setup(scripted)
+        await speak(session, [(0, "address change karna hai", False)])
+        await asyncio.sleep(STABLE_MS / 1000 * 2)
+
+        assert speculator.take(commit(session, "Address change karna hai aur phone bhi.")) is None
+        await asyncio.sleep(0.01)
+        assert scripted.closed == [True]
+        assert speculator.misses == 1
+
+    asyncio.run(run())
+
+
+def test_speculation_on_another_history_is_a_miss():
+    async def run():
+        earlier = llm.ChatMessage(role="assistant", content=["Namaste, kaise madad karun?"])
+        # Started against an empty conversation; the request continues one with a greeting
+        scripted = ScriptedLLM(history=())
+        speculator, session = setup(scripted)
+        await speak(session, [(0, "mujhe quote chahiye", False)])
+        await asyncio.sleep(STABLE_MS / 1000 * 2)
+
+        chat_ctx = commit(session, "Mujhe quote chahiye.", history=[earlier])
+        assert history_key(chat_ctx.items[:-1]) != scripted.history
+        assert speculator.take(chat_ctx) is None
+        await asyncio.sleep(0.01)
+        assert scripted.closed == [True]
+        assert speculator.misses == 1
+
+    asyncio.run(run())
+
+
+def test_speculation_is_off_by_default(monkeypatch):
+    monkeypatch.delenv("POLICY_BOSS_SPECULATION", raising=False)
+    module = importlib.reload(speculation)
+
+    async def run():
+        scripted = ScriptedLLM()
+        speculator = module.Speculator(scripted.start, stable_ms=STABLE_MS)
+        session = FakeSession()
+        speculator.attach(session)
+        await speak(session, [(0, "haan", False), (10, "Haan.", True)])
+        await asyncio.sleep(STABLE_MS / 1000 * 2)
+
+        assert not speculator.enabled
+        assert speculator.take(commit(session, "Haan.")) is None
+        assert scripted.transcripts == []
+        assert speculator.stats()["started"] == 0
+
+    asyncio.run(run())
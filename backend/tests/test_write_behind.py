@@ -0,0 +1,183 @@
+"""
+Tests for the write-behind journal of customer updates
+
+Customer updates run against a scratch copy of the seeded SQLite database
+behind a stand-in that adds latency to every statement. The journal must
+acknowledge an update before the store has it, coalesce repeated updates of
+a field, replay what a crashed process left unflushed, and checkpoint and
+compact its file as the store catches up.
+
+Usage: python -m pytest tests (from backend/)
+"""
+
+import asyncio
+import os
+import sys
+import time
+from typing import Any, Optional, Sequence, Tuple
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools import journal as journal_module  # noqa: E402
+from tools.cache import TTLCache  # noqa: E402
+from tools.concurrency import SingleFlight  # noqa: E402
+from tools.journal import WriteBehindJournal, read_journal  # noqa: E402
+from tools.repository import Repository, SQLitePool  # noqa: E402
+
+
+LATENCY = 0.2
+
+
+class SlowDatabase:
+    """SQLite pool whose every statement takes at least LATENCY seconds, counting the writes."""
+
+    def __init__(self, pool: SQLitePool, latency: float = LATENCY) -> None:
+        self.pool = pool
+        self.latency = latency
+        self.statements = 0
+
+    async def fetch_one(self, query: str, params: Sequence[Any]) -> Optional[Tuple[Any, ...]]:
+        await asyncio.sleep(self.latency)
+        return await self.pool.fetch_one(query, params)
+
+    async def fetch_all(self, query: str, params: Sequence[Any]) -> Any:
+        await asyncio.sleep(self.latency)
+        return await self.pool.fetch_all(query, params)
+
+    async def execute_many(self, statements: Sequence[Tuple[str, Sequence[Any]]]) -> int:
+        await asyncio.sleep(self.latency)
+        self.statements += len(statements)
+        return await self.pool.execute_many(statements)
+
+
+class StuckDatabase:
+    """A store that never answers, standing in for one a process crashes waiting on."""
+
+    async def execute_many(self, statements: Any) -> int:
+        await asyncio.sleep(3600)
+        return 0
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = SQLitePool(str(tmp_path / "policy_boss.db"))
+    pool.initialize()
+    yield pool
+    pool.close()
+
+
+@pytest.fixture
+def directory(tmp_path, monkeypatch):
+    # Batches go out when a test flushes, not on the background interval
+    monkeypatch.setattr(journal_module, "FLUSH_INTERVAL", 3600)
+    return str(tmp_path / "journal")
+
+
+async def stored_phone(pool: SQLitePool, customer_id: str) -> str:
+    return (await pool.fetch_one("customer_by_id", (customer_id,)))[4]
+
+
+def crash(journal: WriteBehindJournal) -> None:
+    # Releases the file lock as the kernel does when the process dies
+    journal._file.close()
+
+
+def test_update_is_acknowledged_before_it_is_flushed(pool, directory):
+    async def run():
+        journal = WriteBehindJournal(SlowDatabase(pool), directory)
+        journal.open()
+        repository = Repository(journal.db, TTLCache(maxsize=16, ttl=60), flight=SingleFlight(), journal=journal)
+        before = await stored_phone(pool, "1001")
+
+        start = time.perf_counter()
+        assert await repository.update_customer_field("1001", "phone", "+91 9000000001")
+        assert time.perf_counter() - start < LATENCY
+
+        # Not in the store yet, but reads through the repository see it
+        assert await stored_phone(pool, "1001") == before
+        assert (await repository.get_customer("1001"))["contact"]["phone"] == "+91 9000000001"
+
+        assert await journal.flush(timeout=5)
+        assert await stored_phone(pool, "1001") == "+91 9000000001"
+        assert (await repository.get_customer("1001"))["contact"]["phone"] == "+91 9000000001"
+
+    asyncio.run(run())
+
+
+def test_repeated_updates_of_a_field_are_coalesced(pool, directory):
+    async def run():
+        store = SlowDatabase(pool)
+        journal = WriteBehindJournal(store, directory)
+        journal.open()
+        for i in range(5):
+            await journal.append("1001", "phone", f"+91 900000000{i}")
+        await journal.append("1002", "email", "priya@example.com")
+
+        assert await journal.flush(timeout=5)
+        assert store.statements == 2
+        assert journal.coalesced == 4
+        assert await stored_phone(pool, "1001") == "+91 9000000004"
+
+    asyncio.run(run())
+
+
+def test_crashed_journal_is_replayed(pool, directory):
+    async def journal_and_crash():
+        journal = WriteBehindJournal(StuckDatabase(), directory)
+        journal.open()
+        await journal.append("1001", "phone", "+91 9000000001")
+        await journal.append("1001", "phone", "+91 9000000002")
+        await journal.append("1003", "address", "Pune")
+        crash(journal)
+        return journal.path
+
+    path = asyncio.run(journal_and_crash())
+    with open(path, "a", encoding="utf-8") as f:
+        # An append cut short by the crash; never acknowledged
+        f.write('{"seq": 99, "ts": 1, "customer_id": "1002", "fie')
+
+    async def replay():
+        journal = WriteBehindJournal(SlowDatabase(pool), directory)
+        journal.open()
+        assert journal.replayed == 2
+        assert await journal.flush(timeout=5)
+        assert await stored_phone(pool, "1001") == "+91 9000000002"
+        assert (await pool.fetch_one("customer_by_id", ("1003",)))[6] == "Pune"
+        return journal
+
+    journal = asyncio.run(replay())
+    assert os.listdir(directory) == [os.path.basename(journal.path)]
+
+
+def test_checkpoint_skips_flushed_updates_on_replay(pool, directory):
+    async def run():
+        journal = WriteBehindJournal(SlowDatabase(pool, latency=0), directory)
+        journal.open()
+        await journal.append("1001", "phone", "+91 9000000001")
+        await journal.append("1002", "phone", "+91 9000000002")
+        assert await journal.flush(timeout=5)
+        journal.db = StuckDatabase()
+        await journal.append("1003", "phone", "+91 9000000003")
+        crash(journal)
+        return journal.path
+
+    path = asyncio.run(run())
+    assert [(u.customer_id, u.value) for u in read_journal(path)] == [("1003", "+91 9000000003")]
+
+
+def test_flushed_journal_is_compacted(pool, directory, monkeypatch):
+    monkeypatch.setattr(journal_module, "COMPACT_BYTES", 256)
+
+    async def run():
+        journal = WriteBehindJournal(SlowDatabase(pool, latency=0), directory)
+        journal.open()
+        for i in range(10):
+            await journal.append("1001", "address", f"Flat {i}, Andheri West, Mumbai")
+        assert await journal.flush(timeout=5)
+        return journal
+
+    journal = asyncio.run(run())
+    assert os.path.getsize(journal.path) == 0
+    assert read_journal(journal.path) == []
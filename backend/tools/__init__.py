@@ -9,8 +9,13 @@ from .policy_tools import (
     get_vehicle_insurance_quotes,
     get_policy_details,
     calculate_premium,
+    calculate_fleet_premiums,
     check_claim_status,
-    get_agent_commission
+    get_customer_open_claims,
+    get_policy_claims,
+    get_agent_commission,
+    record_policy_sale,
+    get_commission_statement
 )
 
 from .customer_tools import (
@@ -21,18 +26,28 @@ from .customer_tools import (
 
 from .vehicle_tools import (
     get_vehicle_details,
-    validate_vehicle_registration
+    validate_vehicle_registration,
+    validate_fleet_registrations
 )
 
+from .shaping import get_full_record
+
 __all__ = [
     'get_vehicle_insurance_quotes',
     'get_policy_details',
     'calculate_premium',
+    'calculate_fleet_premiums',
     'check_claim_status',
+    'get_customer_open_claims',
+    'get_policy_claims',
     'get_agent_commission',
+    'record_policy_sale',
+    'get_commission_statement',
     'get_customer_profile',
     'update_customer_details',
     'get_customer_policies',
     'get_vehicle_details',
-    'validate_vehicle_registration'
+    'validate_vehicle_registration',
+    'validate_fleet_registrations',
+    'get_full_record'
 ]
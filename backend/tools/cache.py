@@ -0,0 +1,115 @@
+"""
+Result Cache for Vehicle Insurance Agent Tools
+
+This module provides a small per-process TTL/LRU cache shared by every session
+running in the same worker process.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Bounded LRU cache whose entries also expire after a fixed time-to-live.
+
+    Thread-executor jobs share it from the event loops of several threads, so
+    every operation takes a lock. Values are stored as given; callers that
+    hand results to a session must store immutable values or copy them on the
+    way out.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float,
+        clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at <= self._clock():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+def cache_from_env(prefix: str, maxsize: int, ttl: float) -> TTLCache:
+    """
+    Build a TTLCache sized from <prefix>_CACHE_SIZE and <prefix>_CACHE_TTL if set.
+
+    Args:
+        prefix: Environment variable prefix, e.g. "POLICY_BOSS_QUOTE"
+        maxsize: Default number of entries
+        ttl: Default time-to-live in seconds
+    """
+    return TTLCache(
+        maxsize=int(os.environ.get(f"{prefix}_CACHE_SIZE", maxsize)),
+        ttl=float(os.environ.get(f"{prefix}_CACHE_TTL", ttl))
+    )
+
+
+def normalize_choice(value: Optional[str]) -> str:
+    """Normalize an enum-like argument such as "Four Wheeler" to "four_wheeler"."""
+    return (value or "").strip().lower().replace("-", "_").replace(" ", "_")
+
+
+def normalize_text(value: Optional[str]) -> str:
+    """Normalize free text such as a city or model name for use in a cache key."""
+    return " ".join((value or "").split()).casefold()
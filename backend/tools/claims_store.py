@@ -0,0 +1,168 @@
+"""
+Claims Store for Vehicle Insurance Agent
+
+This module keeps insurance claims in a local SQLite database (WAL mode) with
+secondary indexes on policy, customer and vehicle registration, so claim
+lookups stay single-digit milliseconds with millions of claims on disk.
+Lookups run on a SQLitePool, off the event loop and with one connection per
+pool thread, so every session of the process can share the store.
+"""
+
+import json
+import os
+import sqlite3
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .repository import SQLitePool
+
+
+SEED_PATH = os.path.join(os.path.dirname(__file__), "data", "claims_seed.json")
+
+# Claim statuses that still need action from the insurer or the customer
+OPEN_STATUSES = ("submitted", "processing", "under_review", "documents_pending")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS claims (
+    claim_id TEXT PRIMARY KEY,
+    policy_id TEXT NOT NULL,
+    customer_id TEXT,
+    customer_name TEXT,
+    vehicle_model TEXT,
+    vehicle_registration TEXT,
+    incident_date TEXT,
+    claim_amount INTEGER,
+    status TEXT NOT NULL,
+    settlement_amount INTEGER,
+    processing_time TEXT,
+    notes TEXT
+);
+CREATE INDEX IF NOT EXISTS claims_policy_idx ON claims (policy_id, incident_date);
+CREATE INDEX IF NOT EXISTS claims_customer_status_idx ON claims (customer_id, status);
+CREATE INDEX IF NOT EXISTS claims_registration_idx ON claims (vehicle_registration);
+"""
+
+COLUMNS = (
+    "claim_id", "policy_id", "customer_id", "customer_name", "vehicle_model",
+    "vehicle_registration", "incident_date", "claim_amount", "status",
+    "settlement_amount", "processing_time", "notes"
+)
+
+_SELECT = f"SELECT {', '.join(COLUMNS)} FROM claims"
+_OPEN_PLACEHOLDERS = ", ".join("?" * len(OPEN_STATUSES))
+
+# Every lookup the claim tools run, by name, for the store's SQLitePool
+QUERIES = {
+    "claim_by_id": f"{_SELECT} WHERE claim_id = ?",
+    "open_claims_by_customer": (
+        f"{_SELECT} WHERE customer_id = ? AND status IN ({_OPEN_PLACEHOLDERS}) "
+        "ORDER BY incident_date DESC LIMIT ?"
+    ),
+    "claims_by_policy": f"{_SELECT} WHERE policy_id = ? ORDER BY incident_date DESC LIMIT ?",
+    "claims_by_registration": f"{_SELECT} WHERE vehicle_registration = ? ORDER BY incident_date DESC LIMIT ?"
+}
+
+
+def claim_to_row(claim: Dict[str, Any]) -> Tuple[Any, ...]:
+    """Flatten a claim dict (as returned by check_claim_status) into a table row."""
+    vehicle = claim.get("vehicle_details", {})
+    return (
+        claim["claim_id"], claim["policy_id"], claim.get("customer_id"), claim.get("customer_name"),
+        vehicle.get("model"), vehicle.get("registration"), claim.get("incident_date"),
+        claim.get("claim_amount"), claim["status"], claim.get("settlement_amount"),
+        claim.get("processing_time"), claim.get("notes")
+    )
+
+
+def row_to_claim(row: Sequence[Any]) -> Dict[str, Any]:
+    """Rebuild the claim dict shape the tools have always returned."""
+    (claim_id, policy_id, customer_id, customer_name, vehicle_model, vehicle_registration,
+     incident_date, claim_amount, status, settlement_amount, processing_time, notes) = row
+    claim = {
+        "claim_id": claim_id,
+        "policy_id": policy_id,
+        "customer_id": customer_id,
+        "customer_name": customer_name,
+        "vehicle_details": {
+            "model": vehicle_model,
+            "registration": vehicle_registration
+        },
+        "incident_date": incident_date,
+        "claim_amount": claim_amount,
+        "status": status
+    }
+    if settlement_amount is not None:
+        claim["settlement_amount"] = settlement_amount
+    claim["processing_time"] = processing_time
+    claim["notes"] = notes
+    return claim
+
+
+class ClaimsStore:
+    """
+    Indexed claim lookups over one SQLite database file.
+
+    Each worker process opens its own connections; WAL mode lets many job
+    processes read while one writes. Lookups are async and go through the
+    pool. Creating the schema, seeding and bulk inserts use a connection of
+    their own and block; they are for startup and scripts, not tools.
+    """
+
+    def __init__(self, path: str, pool_size: int = 4) -> None:
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self.pool = SQLitePool(path, size=pool_size, queries=QUERIES)
+
+    def close(self) -> None:
+        self.pool.close()
+        self._conn.close()
+
+    def count(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM claims").fetchone()[0]
+
+    def insert_many(self, rows: Iterable[Tuple[Any, ...]]) -> None:
+        """Insert or replace claims given as table rows (see claim_to_row)."""
+        with self._conn:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO claims VALUES ({', '.join('?' * len(COLUMNS))})", rows
+            )
+
+    def seed_if_empty(self, seed_path: str = SEED_PATH) -> None:
+        if self._conn.execute("SELECT 1 FROM claims LIMIT 1").fetchone() is None:
+            with open(seed_path, encoding="utf-8") as f:
+                self.insert_many(claim_to_row(claim) for claim in json.load(f))
+
+    async def get(self, claim_id: str) -> Optional[Dict[str, Any]]:
+        row = await self.pool.fetch_one("claim_by_id", (claim_id,))
+        return row_to_claim(row) if row else None
+
+    async def open_claims_for_customer(self, customer_id: str, limit: int) -> List[Dict[str, Any]]:
+        rows = await self.pool.fetch_all("open_claims_by_customer", (customer_id, *OPEN_STATUSES, limit))
+        return [row_to_claim(row) for row in rows]
+
+    async def claims_for_policy(self, policy_id: str, limit: int) -> List[Dict[str, Any]]:
+        rows = await self.pool.fetch_all("claims_by_policy", (policy_id, limit))
+        return [row_to_claim(row) for row in rows]
+
+    async def claims_for_vehicle(self, registration: str, limit: int) -> List[Dict[str, Any]]:
+        rows = await self.pool.fetch_all("claims_by_registration", (registration, limit))
+        return [row_to_claim(row) for row in rows]
+
+
+_store: Optional[ClaimsStore] = None
+
+
+def get_claims_store() -> ClaimsStore:
+    """Return the process-wide claims store at POLICY_BOSS_CLAIMS_DB, seeding it if new."""
+    global _store
+    if _store is None:
+        _store = ClaimsStore(os.environ.get(
+            "POLICY_BOSS_CLAIMS_DB",
+            os.path.join(os.path.expanduser("~"), ".cache", "policy_boss", "claims.db")
+        ), pool_size=int(os.environ.get("POLICY_BOSS_DB_POOL_SIZE", 4)))
+        _store.seed_if_empty()
+    return _store
@@ -0,0 +1,308 @@
+"""
+Commission Calculation and Ledger for Vehicle Insurance Agents
+
+This module holds the commission rate tables, the per-policy commission
+calculation and an append-only commission ledger per agent. The ledger keeps
+running totals by month, insurer and policy type that are updated in O(1) per
+sale, so monthly statements never rescan an agent's history.
+"""
+
+import json
+import os
+import threading
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional
+
+
+# Base commission rates by policy type
+BASE_COMMISSION_RATES = {
+    "two_wheeler": 0.15,  # 15% for two-wheeler policies
+    "four_wheeler": 0.175,  # 17.5% for four-wheeler policies
+    "commercial": 0.20    # 20% for commercial vehicle policies
+}
+DEFAULT_COMMISSION_RATE = 0.15
+
+# 30% lower commission for renewals
+RENEWAL_FACTOR = 0.7
+
+# Company-specific adjustments
+COMPANY_MULTIPLIERS = {
+    "Bajaj Allianz": 1.05,
+    "ICICI Lombard": 1.0,
+    "HDFC ERGO": 1.1,
+    "Tata AIG": 1.15,
+    "Reliance General": 0.95,
+    "Kotak General Insurance": 1.0,
+    "New India Assurance": 0.9,
+    "Oriental Insurance": 0.85,
+    "United India Insurance": 0.8
+}
+DEFAULT_COMPANY_MULTIPLIER = 1.0
+
+CAMPAIGN_COMPANIES = frozenset(["Bajaj Allianz", "HDFC ERGO", "Tata AIG"])
+
+# Monthly premium an agent needs to sell to hit their incentive target
+MONTHLY_PREMIUM_TARGET = float(os.environ.get("POLICY_BOSS_MONTHLY_PREMIUM_TARGET", 500000))
+
+PAYMENT_TIMELINE = "15th of next month"
+
+
+def compute_commission(
+    policy_type: str,
+    premium_amount: float,
+    is_new_policy: bool,
+    insurance_company: str
+) -> Dict[str, Any]:
+    """
+    Calculate the commission and incentives for a single policy sale.
+
+    Returns:
+        A dictionary containing unrounded rates and amounts plus incentive details
+    """
+    base_rate = BASE_COMMISSION_RATES.get(policy_type, DEFAULT_COMMISSION_RATE)
+    if not is_new_policy:
+        base_rate = base_rate * RENEWAL_FACTOR
+
+    commission_rate = base_rate * COMPANY_MULTIPLIERS.get(insurance_company, DEFAULT_COMPANY_MULTIPLIER)
+    commission_amount = premium_amount * commission_rate
+
+    incentives = 0
+    incentive_details = []
+
+    # Monthly target incentive (dummy logic)
+    if premium_amount > 10000:
+        target_incentive = premium_amount * 0.02
+        incentives += target_incentive
+        incentive_details.append({
+            "type": "Monthly Target Bonus",
+            "amount": round(target_incentive, 2)
+        })
+
+    # Special campaign incentive (dummy logic)
+    if insurance_company in CAMPAIGN_COMPANIES and is_new_policy:
+        campaign_incentive = premium_amount * 0.03
+        incentives += campaign_incentive
+        incentive_details.append({
+            "type": "Special Campaign Bonus",
+            "amount": round(campaign_incentive, 2)
+        })
+
+    return {
+        "base_rate": base_rate,
+        "commission_rate": commission_rate,
+        "commission_amount": commission_amount,
+        "incentives": incentives,
+        "incentive_details": incentive_details,
+        "total_earnings": commission_amount + incentives
+    }
+
+
+class CommissionEntry(NamedTuple):
+    """One recorded policy sale in an agent's ledger."""
+    policy_id: str
+    sold_at: str
+    policy_type: str
+    insurance_company: str
+    premium_amount: float
+    is_new_policy: bool
+    commission_amount: float
+    incentives: float
+
+    @property
+    def month(self) -> str:
+        return self.sold_at[:7]
+
+    @property
+    def total_earnings(self) -> float:
+        return self.commission_amount + self.incentives
+
+
+class Totals:
+    """Running totals for one statement bucket."""
+
+    __slots__ = ("policies", "premium", "commission", "incentives")
+
+    def __init__(self) -> None:
+        self.policies = 0
+        self.premium = 0.0
+        self.commission = 0.0
+        self.incentives = 0.0
+
+    def add(self, entry: CommissionEntry) -> None:
+        self.policies += 1
+        self.premium += entry.premium_amount
+        self.commission += entry.commission_amount
+        self.incentives += entry.incentives
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "policies": self.policies,
+            "premium": round(self.premium, 2),
+            "commission": round(self.commission, 2),
+            "incentives": round(self.incentives, 2),
+            "total_earnings": round(self.commission + self.incentives, 2)
+        }
+
+
+class AgentLedger:
+    """
+    Append-only ledger of one agent's sales, backed by a JSON-lines file.
+
+    Other job processes may append to the same file, so every read first
+    applies any lines added since this process last looked. The methods do
+    blocking file I/O; tools call them through asyncio.to_thread, and a lock
+    keeps those threads from applying the same lines twice.
+    """
+
+    def __init__(self, agent_id: str, path: Optional[str]) -> None:
+        self.agent_id = agent_id
+        self.path = path
+        self.entries: List[CommissionEntry] = []
+        self._policy_ids = set()
+        self._offset = 0
+        self.by_month: Dict[str, Totals] = defaultdict(Totals)
+        self.by_insurer: Dict[str, Dict[str, Totals]] = defaultdict(lambda: defaultdict(Totals))
+        self.by_policy_type: Dict[str, Dict[str, Totals]] = defaultdict(lambda: defaultdict(Totals))
+        self.campaign_sales: Dict[str, int] = defaultdict(int)
+        self._lock = threading.RLock()
+
+    def _apply(self, entry: CommissionEntry) -> None:
+        month = entry.month
+        self.entries.append(entry)
+        self._policy_ids.add(entry.policy_id)
+        self.by_month[month].add(entry)
+        self.by_insurer[month][entry.insurance_company].add(entry)
+        self.by_policy_type[month][entry.policy_type].add(entry)
+        if entry.is_new_policy and entry.insurance_company in CAMPAIGN_COMPANIES:
+            self.campaign_sales[month] += 1
+
+    def sync(self) -> None:
+        """Apply entries appended to the backing file since the last sync."""
+        if self.path is None or not os.path.exists(self.path):
+            return
+        with self._lock:
+            with open(self.path, "rb") as f:
+                f.seek(self._offset)
+                data = f.read()
+            # A line without its newline is still being written by another process
+            complete = data[:data.rfind(b"\n") + 1]
+            for line in complete.splitlines():
+                if line.strip():
+                    entry = CommissionEntry._make(json.loads(line))
+                    if entry.policy_id not in self._policy_ids:
+                        self._apply(entry)
+            self._offset += len(complete)
+
+    def record(self, entry: CommissionEntry) -> bool:
+        """
+        Append a sale to the ledger.
+
+        Returns:
+            False if the policy was already recorded, True otherwise
+        """
+        with self._lock:
+            self.sync()
+            if entry.policy_id in self._policy_ids:
+                return False
+            if self.path is not None:
+                # Stored as a positional JSON array in CommissionEntry field order
+                line = (json.dumps(entry, separators=(",", ":")) + "\n").encode("utf-8")
+                # One O_APPEND write per entry keeps concurrent appenders from interleaving
+                fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                try:
+                    os.write(fd, line)
+                finally:
+                    os.close(fd)
+                # The offset is left alone: another process may have appended first,
+                # and the next sync skips this entry by policy_id anyway
+            self._apply(entry)
+            return True
+
+    def statement(self, month: str) -> Dict[str, Any]:
+        """Build the statement for a month ("YYYY-MM") from the running totals."""
+        with self._lock:
+            self.sync()
+            return self._statement(month)
+
+    def _statement(self, month: str) -> Dict[str, Any]:
+        totals = self.by_month.get(month) or Totals()
+        achieved = totals.premium
+        return {
+            "agent_id": self.agent_id,
+            "month": month,
+            **totals.as_dict(),
+            "by_insurer": {
+                insurer: bucket.as_dict() for insurer, bucket in self.by_insurer.get(month, {}).items()
+            },
+            "by_policy_type": {
+                policy_type: bucket.as_dict() for policy_type, bucket in self.by_policy_type.get(month, {}).items()
+            },
+            "incentive_progress": {
+                "monthly_premium_target": MONTHLY_PREMIUM_TARGET,
+                "premium_achieved": round(achieved, 2),
+                "progress": f"{min(achieved / MONTHLY_PREMIUM_TARGET, 1.0) * 100:.1f}%",
+                "premium_remaining": round(max(MONTHLY_PREMIUM_TARGET - achieved, 0.0), 2),
+                "campaign_policies_sold": self.campaign_sales.get(month, 0)
+            },
+            "payment_timeline": PAYMENT_TIMELINE
+        }
+
+
+class CommissionLedger:
+    """Per-process registry of agent ledgers stored under one directory."""
+
+    def __init__(self, directory: Optional[str]) -> None:
+        self.directory = directory
+        self._agents: Dict[str, AgentLedger] = {}
+
+    def agent(self, agent_id: str) -> AgentLedger:
+        ledger = self._agents.get(agent_id)
+        if ledger is None:
+            path = None
+            if self.directory is not None:
+                os.makedirs(self.directory, exist_ok=True)
+                safe_id = "".join(c if c.isalnum() or c in "-_" else "_" for c in agent_id)
+                path = os.path.join(self.directory, f"{safe_id}.jsonl")
+            ledger = self._agents[agent_id] = AgentLedger(agent_id, path)
+        return ledger
+
+
+_ledger: Optional[CommissionLedger] = None
+
+
+def get_commission_ledger() -> CommissionLedger:
+    """Return the process-wide ledger, stored in POLICY_BOSS_LEDGER_DIR."""
+    global _ledger
+    if _ledger is None:
+        _ledger = CommissionLedger(os.environ.get(
+            "POLICY_BOSS_LEDGER_DIR",
+            os.path.join(os.path.expanduser("~"), ".cache", "policy_boss", "ledger")
+        ))
+    return _ledger
+
+
+def current_month() -> str:
+    return datetime.now().strftime("%Y-%m")
+
+
+def new_entry(
+    policy_id: str,
+    policy_type: str,
+    premium_amount: float,
+    is_new_policy: bool,
+    insurance_company: str,
+    sold_at: Optional[str] = None
+) -> CommissionEntry:
+    """Price a sale's commission and wrap it as a ledger entry."""
+    commission = compute_commission(policy_type, premium_amount, is_new_policy, insurance_company)
+    return CommissionEntry(
+        policy_id=policy_id,
+        sold_at=sold_at or datetime.now().isoformat(timespec="seconds"),
+        policy_type=policy_type,
+        insurance_company=insurance_company,
+        premium_amount=float(premium_amount),
+        is_new_policy=is_new_policy,
+        commission_amount=commission["commission_amount"],
+        incentives=commission["incentives"]
+    )
@@ -0,0 +1,204 @@
+"""
+Single-Flight Lookups and Per-Turn Deadlines for Vehicle Insurance Agent Tools
+
+The session already runs the tool calls of one LLM step concurrently, each in
+its own task. This module makes that concurrency cheap for the backends and
+bounded for the caller.
+
+SingleFlight collapses identical in-flight lookups into one execution whose
+result every caller shares: two tools of the same step asking for the same
+customer, or two sessions of the worker asking for the same quote. It is
+process-wide and safe across the event loops of thread-executor jobs.
+
+turn_deadline gives all the tool calls of a turn one shared time budget,
+counted from the first call. A call still running when the budget runs out
+fails with a ToolError the LLM can explain; the lookup underneath keeps
+running in its flight, so a retry joins it instead of starting over.
+"""
+
+import asyncio
+import concurrent.futures
+import functools
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, TypeVar
+
+from livekit.agents import RunContext, ToolError
+
+
+# Seconds all the tool calls of one turn may take together, from the first one's start
+TURN_DEADLINE = float(os.environ.get("POLICY_BOSS_TOOL_TURN_DEADLINE_MS", 2500)) / 1000
+
+# Least a call started late in the turn is given, so it is not failed unstarted
+MIN_CALL_BUDGET = float(os.environ.get("POLICY_BOSS_TOOL_MIN_BUDGET_MS", 250)) / 1000
+
+# Turns whose start is remembered; only the current ones of each session matter
+MAX_TURNS = 1024
+
+T = TypeVar("T", bound=Callable[..., Awaitable[Any]])
+
+
+class _Abandoned(Exception):
+    """The execution was cancelled, usually because its job's event loop shut down."""
+
+
+class SingleFlight:
+    """
+    Runs at most one execution per key at a time.
+
+    The first caller starts the execution as a task on its own event loop;
+    callers arriving while it runs wait for the same result, from any thread.
+    A caller that is cancelled or times out stops waiting without cancelling
+    the execution. Results are shared as they are, so they must be immutable
+    or rebuilt by each caller.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._flights: Dict[Hashable, "concurrent.futures.Future[Any]"] = {}
+        self.executions = 0
+        self.joined = 0
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        with self._lock:
+            future = self._flights.get(key)
+            leader = future is None
+            if leader:
+                future = self._flights[key] = concurrent.futures.Future()
+                self.executions += 1
+            else:
+                self.joined += 1
+        if leader:
+            task = asyncio.ensure_future(fn())
+            task.add_done_callback(functools.partial(self._land, key, future))
+        waiter = asyncio.wrap_future(future)
+        # A caller cancelled before the result lands leaves nobody to read its error
+        waiter.add_done_callback(_retrieve)
+        try:
+            return await asyncio.shield(waiter)
+        except _Abandoned:
+            # Nobody will finish it; run it for this caller alone
+            return await fn()
+
+    def _land(self, key: Hashable, future: "concurrent.futures.Future[Any]", task: "asyncio.Task[Any]") -> None:
+        with self._lock:
+            if self._flights.get(key) is future:
+                del self._flights[key]
+        if task.cancelled():
+            future.set_exception(_Abandoned())
+        elif task.exception() is not None:
+            future.set_exception(task.exception())
+        else:
+            future.set_result(task.result())
+
+    def forget(self, key: Hashable) -> None:
+        """Let the next caller start a fresh execution, e.g. after the data was written."""
+        with self._lock:
+            self._flights.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        calls = self.executions + self.joined
+        return {
+            "executions": self.executions,
+            "joined": self.joined,
+            "in_flight": len(self),
+            "joined_ratio": round(self.joined / calls, 4) if calls else 0.0
+        }
+
+
+def _retrieve(waiter: "asyncio.Future[Any]") -> None:
+    if not waiter.cancelled():
+        waiter.exception()
+
+
+_flight = SingleFlight()
+
+
+def get_single_flight() -> SingleFlight:
+    """Return the process-wide single flight shared by every session in this worker process."""
+    return _flight
+
+
+class TurnDeadlines:
+    """Start times of the turns tools are running in, keyed by speech handle."""
+
+    def __init__(self, deadline: float = TURN_DEADLINE, min_budget: float = MIN_CALL_BUDGET) -> None:
+        self.deadline = deadline
+        self.min_budget = min_budget
+        self._started: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.timeouts = 0
+
+    def budget(self, turn_id: Optional[str]) -> float:
+        """Seconds left for a call starting now in the given turn."""
+        now = time.monotonic()
+        with self._lock:
+            self.calls += 1
+            if turn_id is None:
+                return self.deadline
+            started = self._started.setdefault(turn_id, now)
+            self._started.move_to_end(turn_id)
+            while len(self._started) > MAX_TURNS:
+                self._started.popitem(last=False)
+        return max(self.deadline - (now - started), self.min_budget)
+
+    def timed_out(self) -> None:
+        """Count a call that ran out of its turn's budget."""
+        with self._lock:
+            self.timeouts += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "deadline_ms": round(self.deadline * 1000),
+            "calls": self.calls,
+            "timeouts": self.timeouts
+        }
+
+
+_deadlines = TurnDeadlines()
+
+
+def get_turn_deadlines() -> TurnDeadlines:
+    return _deadlines
+
+
+def _turn_id(context: Optional[RunContext]) -> Optional[str]:
+    # Every LLM step of one reply runs under the same speech handle
+    try:
+        return context.speech_handle.id
+    except AttributeError:
+        return None
+
+
+def turn_deadline(func: T) -> T:
+    """
+    Bound a tool call by what is left of its turn's budget. Apply it under
+    @metered so timeouts are counted as errors. Tools that write are left
+    unbounded: abandoning a write halfway would leave the caller unsure
+    whether it happened.
+    """
+    name = func.__name__
+
+    @functools.wraps(func)
+    async def wrapper(context: RunContext, *args: Any, **kwargs: Any) -> Any:
+        budget = _deadlines.budget(_turn_id(context))
+        try:
+            return await asyncio.wait_for(func(context, *args, **kwargs), budget)
+        except asyncio.TimeoutError:
+            _deadlines.timed_out()
+            raise ToolError(
+                f"{name} is taking longer than expected; tell the caller you are still checking "
+                "and try again in a moment"
+            )
+
+    return wrapper  # type: ignore[return-value]
+
+
+def concurrency_stats() -> Dict[str, Any]:
+    return {"single_flight": _flight.stats(), "turn_deadline": _deadlines.stats()}
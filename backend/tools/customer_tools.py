@@ -4,11 +4,27 @@ Customer Tools for Vehicle Insurance Agent
 This module contains tools related to customer profiles and policy management.
 """
 
-from livekit.agents import function_tool, RunContext, ToolError
-from typing import Dict, List, Any, Optional
+from datetime import datetime, timedelta, timezone
+
+from livekit.agents import function_tool, RunContext
+from typing import Dict, Any, Optional
+
+from .concurrency import turn_deadline
+from .entities import session_entities
+from .metrics import metered
+from .prefetch import fetch_customer, session_prefetcher
+from .repository import UPDATABLE_CUSTOMER_FIELDS, get_repository
+from .shaping import shaped
+
+
+# Timestamps are reported in Indian Standard Time
+IST = timezone(timedelta(hours=5, minutes=30))
 
 
 @function_tool()
+@metered
+@turn_deadline
+@shaped
 async def get_customer_profile(
     context: RunContext,
     customer_id: str
@@ -22,67 +38,11 @@ async def get_customer_profile(
     Returns:
         A dictionary containing customer profile details
     """
-    # Dummy customer profiles with 4-digit numeric IDs in sequential order
-    customers = {
-        "1001": {
-            "customer_id": "1001",
-            "name": "Rahul Sharma",
-            "age": 35,
-            "gender": "Male",
-            "contact": {
-                "phone": "+91 9876543210",
-                "email": "rahul.sharma@example.com",
-                "address": "123 Park Street, Mumbai, Maharashtra"
-            },
-            "occupation": "Software Engineer",
-            "driving_experience": 12,
-            "claim_history": {
-                "total_claims": 1,
-                "last_claim_date": "2022-05-10"
-            },
-            "customer_since": "2018-03-15"
-        },
-        "1002": {
-            "customer_id": "1002",
-            "name": "Priya Patel",
-            "age": 28,
-            "gender": "Female",
-            "contact": {
-                "phone": "+91 8765432109",
-                "email": "priya.patel@example.com",
-                "address": "456 Lake View, Delhi"
-            },
-            "occupation": "Doctor",
-            "driving_experience": 8,
-            "claim_history": {
-                "total_claims": 0,
-                "last_claim_date": None
-            },
-            "customer_since": "2020-07-22"
-        },
-        "1003": {
-            "customer_id": "1003",
-            "name": "Amit Singh",
-            "age": 42,
-            "gender": "Male",
-            "contact": {
-                "phone": "+91 7654321098",
-                "email": "amit.singh@example.com",
-                "address": "789 Business Park, Bangalore, Karnataka"
-            },
-            "occupation": "Business Owner",
-            "driving_experience": 20,
-            "claim_history": {
-                "total_claims": 2,
-                "last_claim_date": "2023-01-18"
-            },
-            "customer_since": "2015-11-30"
-        }
-    }
+    customer = await fetch_customer(context, customer_id)
     
-    # Return a default customer if the customer_id doesn't exist in our dummy data
-    if customer_id in customers:
-        return customers[customer_id]
+    # Return a default customer if the customer_id doesn't exist in the repository
+    if customer is not None:
+        return customer
     else:
         # Instead of raising an error, return a default customer with the requested ID
         return {
@@ -106,6 +66,7 @@ async def get_customer_profile(
 
 
 @function_tool()
+@metered
 async def update_customer_details(
     context: RunContext,
     customer_id: str,
@@ -123,38 +84,46 @@ async def update_customer_details(
     Returns:
         A dictionary containing the update status and updated field
     """
-    # Dummy function to simulate updating customer details
-    valid_fields = [
-        "phone", "email", "address", "occupation", 
-        "driving_experience", "age"
-    ]
+    # An unknown field is treated as the address; an unknown customer is reported as not updated
+    valid_field = field if field in UPDATABLE_CUSTOMER_FIELDS else "address"
     
-    # Always proceed with the update, even if the field is invalid or customer doesn't exist
-    valid_field = field if field in valid_fields else "address"
+    # Usually answered from the record the session looked up earlier in the call
+    customer = await fetch_customer(context, customer_id)
+    updated = False
+    if customer is not None:
+        updated = await get_repository().update_customer_field(customer_id, valid_field, value)
     
-    # Check if the customer exists in our dummy data
-    customers = {
-        "1001": "Rahul Sharma",
-        "1002": "Priya Patel",
-        "1003": "Amit Singh"
-    }
+    # A profile prefetched or cached before the update is now stale
+    prefetcher = session_prefetcher(context)
+    if prefetcher is not None:
+        prefetcher.discard(("customer", customer_id))
+    entities = session_entities(context)
+    if entities is not None:
+        entities.invalidate("customer", customer_id)
     
     # Use the customer name if it exists, otherwise use a default name
-    customer_name = customers.get(customer_id, "Default Customer")
-        
-    # In a real implementation, this would update a database
+    if customer is not None:
+        customer_name = customer["name"]
+        contact = customer["contact"]
+        old_value = contact[valid_field] if valid_field in contact else customer[valid_field]
+    else:
+        customer_name = "Default Customer"
+        old_value = "Previous value would be fetched from database"
+    
     return {
-        "success": True,
+        "success": updated,
         "customer_id": customer_id,
         "customer_name": customer_name,
         "updated_field": valid_field,
-        "old_value": "Previous value would be fetched from database",
+        "old_value": old_value,
         "new_value": value,
-        "timestamp": "2025-05-14T17:10:50+05:30"
+        "timestamp": datetime.now(IST).isoformat(timespec="seconds")
     }
 
 
 @function_tool()
+@metered
+@turn_deadline
 async def get_customer_policies(
     context: RunContext,
     customer_id: str,
@@ -170,77 +139,9 @@ async def get_customer_policies(
     Returns:
         A dictionary containing the customer's policies
     """
-    # Dummy customer policies with 4-digit numeric customer IDs
-    customer_policies = {
-        "1001": [
-            {
-                "policy_id": "2001",
-                "type": "four_wheeler",
-                "vehicle": "Maruti Swift",
-                "coverage": 500000,
-                "premium": 8500,
-                "start_date": "2023-01-15",
-                "end_date": "2024-01-14",
-                "status": "active"
-            },
-            {
-                "policy_id": "2002",
-                "type": "two_wheeler",
-                "vehicle": "Honda CB Shine",
-                "coverage": 150000,
-                "premium": 2300,
-                "start_date": "2022-05-10",
-                "end_date": "2023-05-09",
-                "status": "expired"
-            }
-        ],
-        "1002": [
-            {
-                "policy_id": "2003",
-                "type": "two_wheeler",
-                "vehicle": "Honda Activa",
-                "coverage": 150000,
-                "premium": 2200,
-                "start_date": "2023-05-20",
-                "end_date": "2024-05-19",
-                "status": "active"
-            }
-        ],
-        "1003": [
-            {
-                "policy_id": "2004",
-                "type": "commercial",
-                "vehicle": "Tata Ace",
-                "coverage": 800000,
-                "premium": 15000,
-                "start_date": "2023-03-10",
-                "end_date": "2024-03-09",
-                "status": "active"
-            },
-            {
-                "policy_id": "2005",
-                "type": "four_wheeler",
-                "vehicle": "Toyota Innova",
-                "coverage": 650000,
-                "premium": 12000,
-                "start_date": "2023-08-15",
-                "end_date": "2024-08-14",
-                "status": "active"
-            },
-            {
-                "policy_id": "2006",
-                "type": "four_wheeler",
-                "vehicle": "Hyundai i20",
-                "coverage": 450000,
-                "premium": 7500,
-                "start_date": "2022-12-01",
-                "end_date": "2023-11-30",
-                "status": "pending_renewal"
-            }
-        ]
-    }
+    policies = await get_repository().get_customer_policies(customer_id)
     
-    if customer_id not in customer_policies:
+    if not policies:
         # Instead of raising an error, return a default policy list
         policies = [
             {
@@ -260,8 +161,6 @@ async def get_customer_policies(
             "policies": policies
         }
     
-    policies = customer_policies[customer_id]
-    
     # Filter by status if provided
     if policy_status:
         policies = [p for p in policies if p["status"] == policy_status]
@@ -0,0 +1,92 @@
+"""
+Session Entity Cache for Vehicle Insurance Agent Tools
+
+Over one call the LLM asks for the same customer, policy and vehicle again
+and again as the conversation moves between them. Each session keeps the
+records its tools have loaded, keyed by entity type and id, and answers
+repeat lookups from them without a repository round trip. The session is the
+only writer of its caller's record that matters during the call, so entries
+live until the call ends; update_customer_details drops exactly the customer
+it wrote.
+"""
+
+import copy
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from livekit.agents import RunContext
+
+from .session import session_userdata
+
+
+# Key under which each session keeps its entity cache in session userdata
+USERDATA_KEY = "entities"
+
+EntityKey = Tuple[str, str]
+
+
+class EntityCache:
+    """
+    Per-session records by (entity type, id).
+
+    Records are copied on the way in and out, so tools may modify what they
+    get. A load that was running when its entity was invalidated is returned
+    to its caller but not stored.
+    """
+
+    def __init__(self) -> None:
+        self._entries: Dict[EntityKey, Dict[str, Any]] = {}
+        # Bumped by each invalidation, so a load that started before it is not stored
+        self._generations: Dict[EntityKey, int] = {}
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: EntityKey) -> bool:
+        return key in self._entries
+
+    async def get(
+        self,
+        kind: str,
+        entity_id: str,
+        loader: Callable[[], Awaitable[Optional[Dict[str, Any]]]]
+    ) -> Optional[Dict[str, Any]]:
+        """Return the cached record, or call loader and keep what it finds."""
+        key = (kind, entity_id)
+        record = self._entries.get(key)
+        if record is not None:
+            self.hits[kind] = self.hits.get(kind, 0) + 1
+            return copy.deepcopy(record)
+        self.misses[kind] = self.misses.get(kind, 0) + 1
+        generation = self._generations.get(key, 0)
+        record = await loader()
+        # Records that do not exist are not kept; the caller may be about to create them
+        if record is not None and self._generations.get(key, 0) == generation:
+            self._entries[key] = copy.deepcopy(record)
+        return record
+
+    def invalidate(self, kind: str, entity_id: str) -> None:
+        """Drop a record the session has just written."""
+        key = (kind, entity_id)
+        self._generations[key] = self._generations.get(key, 0) + 1
+        if self._entries.pop(key, None) is not None:
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        hits = sum(self.hits.values())
+        lookups = hits + sum(self.misses.values())
+        return {
+            "entries": len(self._entries),
+            "hits": hits,
+            "misses": lookups - hits,
+            "invalidations": self.invalidations,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+            "hits_by_type": dict(self.hits)
+        }
+
+
+def session_entities(context: Optional[RunContext]) -> Optional[EntityCache]:
+    """Return the entity cache of the session a tool runs in, if it has one."""
+    return session_userdata(context, USERDATA_KEY)
@@ -0,0 +1,212 @@
+"""
+Insurer Adapters for Vehicle Insurance Quotes
+
+This module defines the adapter interface every insurer integration implements,
+the concurrent fan-out used by get_vehicle_insurance_quotes, and local stub
+adapters with configurable latency and failure rates for offline testing.
+"""
+
+import asyncio
+import os
+import random
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from .rate_catalog import QuoteRow, RateCatalog, get_rate_catalog
+
+
+class QuoteRequest(NamedTuple):
+    """Normalized vehicle details sent to every insurer."""
+    vehicle_type: str
+    vehicle_model: str
+    vehicle_age: int
+    coverage_type: str
+    city: str
+
+
+class InsurerError(Exception):
+    """Raised by an adapter when its insurer cannot quote the request."""
+
+
+class InsurerAdapter(ABC):
+    """
+    Interface for one insurer's quoting integration.
+
+    Adapters are shared by every session in the worker process, so quote() must
+    not keep per-request state on the instance.
+    """
+
+    def __init__(self, company: str, deadline: Optional[float] = None) -> None:
+        self.company = company
+        # Seconds this insurer is allowed before it counts as timed out; None
+        # uses the fan-out default
+        self.deadline = deadline
+
+    @abstractmethod
+    async def quote(self, request: QuoteRequest) -> Tuple[QuoteRow, ...]:
+        """Return this insurer's quote rows for the request, or raise InsurerError."""
+
+
+class CatalogInsurerAdapter(InsurerAdapter):
+    """Quotes one insurer's plans from the local rate catalog."""
+
+    def __init__(self, company: str, catalog: RateCatalog, deadline: Optional[float] = None) -> None:
+        super().__init__(company, deadline)
+        self.catalog = catalog
+
+    async def quote(self, request: QuoteRequest) -> Tuple[QuoteRow, ...]:
+        return self.catalog.company_quotes(
+            self.company, request.vehicle_type, request.coverage_type, request.vehicle_age
+        )
+
+
+class StubInsurerAdapter(CatalogInsurerAdapter):
+    """
+    Catalog-backed insurer that behaves like a remote API.
+
+    Each call sleeps for a latency drawn uniformly from `latency`, occasionally
+    from `tail_latency` instead, and fails with probability `failure_rate`.
+    """
+
+    def __init__(
+        self,
+        company: str,
+        catalog: RateCatalog,
+        latency: Tuple[float, float] = (0.05, 0.3),
+        failure_rate: float = 0.0,
+        tail_rate: float = 0.0,
+        tail_latency: Tuple[float, float] = (2.0, 5.0),
+        deadline: Optional[float] = None,
+        rng: Optional[random.Random] = None
+    ) -> None:
+        super().__init__(company, catalog, deadline)
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.tail_rate = tail_rate
+        self.tail_latency = tail_latency
+        self._rng = rng or random.Random()
+
+    async def quote(self, request: QuoteRequest) -> Tuple[QuoteRow, ...]:
+        low, high = self.tail_latency if self._rng.random() < self.tail_rate else self.latency
+        await asyncio.sleep(self._rng.uniform(low, high))
+        if self._rng.random() < self.failure_rate:
+            raise InsurerError(f"{self.company} quote service unavailable")
+        return await super().quote(request)
+
+
+class FanOutResult(NamedTuple):
+    """Outcome of asking every insurer for a quote."""
+    quotes: Tuple[QuoteRow, ...]
+    # Still running when the overall budget ran out
+    pending: Tuple[str, ...]
+    # Failed or missed their own per-insurer deadline
+    unavailable: Tuple[str, ...]
+    elapsed: float
+
+    @property
+    def complete(self) -> bool:
+        return not self.pending and not self.unavailable
+
+    def as_dict(self) -> Dict[str, Any]:
+        result: Dict[str, Any] = {"quotes": self.quotes}
+        if self.pending:
+            result["pending_insurers"] = list(self.pending)
+        if self.unavailable:
+            result["unavailable_insurers"] = list(self.unavailable)
+        return result
+
+
+async def fan_out_quotes(
+    adapters: Sequence[InsurerAdapter],
+    request: QuoteRequest,
+    insurer_deadline: float,
+    budget: float
+) -> FanOutResult:
+    """
+    Ask all insurers concurrently and return whatever arrives within the budget.
+
+    Args:
+        adapters: Insurers to query; results keep this order
+        request: The vehicle to quote
+        insurer_deadline: Default seconds each insurer gets before it is marked unavailable
+        budget: Overall seconds to wait; insurers still running are marked pending and cancelled
+
+    Returns:
+        A FanOutResult with the collected quotes and the pending/unavailable insurers
+    """
+    start = time.monotonic()
+    tasks = [
+        asyncio.ensure_future(asyncio.wait_for(adapter.quote(request), adapter.deadline or insurer_deadline))
+        for adapter in adapters
+    ]
+    if tasks:
+        await asyncio.wait(tasks, timeout=budget)
+
+    quotes: List[QuoteRow] = []
+    pending: List[str] = []
+    unavailable: List[str] = []
+    for adapter, task in zip(adapters, tasks):
+        if not task.done():
+            task.cancel()
+            pending.append(adapter.company)
+        elif task.cancelled() or task.exception() is not None:
+            unavailable.append(adapter.company)
+        else:
+            quotes.extend(task.result())
+
+    return FanOutResult(
+        quotes=tuple(quotes),
+        pending=tuple(pending),
+        unavailable=tuple(unavailable),
+        elapsed=time.monotonic() - start
+    )
+
+
+_adapters: Optional[List[InsurerAdapter]] = None
+
+
+def register_insurer_adapter(adapter: InsurerAdapter) -> None:
+    """Add an insurer integration to the process-wide adapter list, after the defaults."""
+    get_insurer_adapters().append(adapter)
+
+
+def replace_insurer_adapters(adapters: Sequence[InsurerAdapter]) -> None:
+    """
+    Quote exactly these insurers instead of the defaults, e.g. when every
+    insurer has a live integration. Later register_insurer_adapter() calls
+    add to this list.
+    """
+    global _adapters
+    _adapters = list(adapters)
+
+
+def get_insurer_adapters() -> List[InsurerAdapter]:
+    """
+    Return the insurer adapters, creating the defaults on first use.
+
+    By default every insurer in the rate catalog is quoted locally. Setting
+    POLICY_BOSS_INSURER_ADAPTERS=stub swaps in StubInsurerAdapter instances,
+    tuned with POLICY_BOSS_STUB_LATENCY_MS ("min,max"), POLICY_BOSS_STUB_FAILURE_RATE,
+    POLICY_BOSS_STUB_TAIL_RATE and POLICY_BOSS_STUB_TAIL_LATENCY_MS.
+    """
+    global _adapters
+    if _adapters is None:
+        catalog = get_rate_catalog()
+        if os.environ.get("POLICY_BOSS_INSURER_ADAPTERS", "catalog") == "stub":
+            latency = _ms_range(os.environ.get("POLICY_BOSS_STUB_LATENCY_MS", "50,300"))
+            tail_latency = _ms_range(os.environ.get("POLICY_BOSS_STUB_TAIL_LATENCY_MS", "2000,5000"))
+            failure_rate = float(os.environ.get("POLICY_BOSS_STUB_FAILURE_RATE", 0.0))
+            tail_rate = float(os.environ.get("POLICY_BOSS_STUB_TAIL_RATE", 0.0))
+            _adapters = [
+                StubInsurerAdapter(company, catalog, latency, failure_rate, tail_rate, tail_latency)
+                for company in catalog.companies
+            ]
+        else:
+            _adapters = [CatalogInsurerAdapter(company, catalog) for company in catalog.companies]
+    return _adapters
+
+
+def _ms_range(value: str) -> Tuple[float, float]:
+    low, _, high = value.partition(",")
+    return float(low) / 1000, float(high or low) / 1000
@@ -0,0 +1,393 @@
+"""
+Write-Behind Journal for Customer Updates
+
+update_customer_details runs while the caller waits for a reply, and a real
+backing store can take far longer to commit a write than a caller should sit
+in silence. With the journal, an update is appended to a local file and
+fsync'd, which makes it durable, and the tool answers straight away. A
+background task writes what is pending to the repository's database in
+batches, retrying with backoff until the store takes it. A batch holds at
+most one write per customer field: a later update to the same field replaces
+the earlier one before it is sent.
+
+Each process appends to its own journal file in POLICY_BOSS_JOURNAL_DIR and
+holds an exclusive lock on it while alive. After a batch is committed, a
+checkpoint line records how far the store has caught up. On start, a process
+claims every journal no live process holds, its own included after a pid
+reuse. It copies the updates past the last checkpoint into its own journal
+and deletes the old file. The copy is made first, and the directory is
+fsync'd after every rename and removal, so a crash at any point leaves every
+acknowledged update in some journal. Writes set a field to a value, so
+replaying one the store already has is harmless.
+
+Reads through the repository see this process's pending updates. Other
+processes see an update once it is flushed, a fraction of a second later
+with the default interval.
+"""
+
+import asyncio
+import fcntl
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+logger = logging.getLogger("policy-boss.journal")
+
+# Set to 0 to write customer updates to the store before answering
+WRITE_BEHIND_ENABLED = os.environ.get("POLICY_BOSS_WRITE_BEHIND", "1") != "0"
+
+JOURNAL_DIR = os.environ.get(
+    "POLICY_BOSS_JOURNAL_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "policy_boss", "journal")
+)
+
+# How long pending updates wait to be batched, and the most sent in one batch
+FLUSH_INTERVAL = float(os.environ.get("POLICY_BOSS_JOURNAL_FLUSH_MS", 200)) / 1000
+BATCH_SIZE = int(os.environ.get("POLICY_BOSS_JOURNAL_BATCH", 100))
+
+# Backoff between failed flushes, doubling up to the maximum; acknowledged
+# updates are never dropped, so retries go on until the store recovers
+RETRY_INITIAL = 0.2
+RETRY_MAX = 10.0
+
+# A fully flushed journal is truncated once it grows past this size
+COMPACT_BYTES = 1 << 20
+
+# (customer_id, field)
+FieldKey = Tuple[str, str]
+
+
+class Update:
+    """One acknowledged customer field update."""
+
+    __slots__ = ("seq", "ts", "customer_id", "field", "value")
+
+    def __init__(self, seq: int, ts: float, customer_id: str, field: str, value: Any) -> None:
+        self.seq = seq
+        self.ts = ts
+        self.customer_id = customer_id
+        self.field = field
+        self.value = value
+
+    @property
+    def key(self) -> FieldKey:
+        return (self.customer_id, self.field)
+
+    def to_line(self) -> str:
+        return json.dumps({
+            "seq": self.seq, "ts": self.ts, "customer_id": self.customer_id, "field": self.field, "value": self.value
+        }) + "\n"
+
+
+def read_journal(path: str) -> List[Update]:
+    """
+    Return the updates of a journal file that are past its last checkpoint.
+
+    A line cut short by a crash during the append that wrote it is skipped.
+    Its update was never acknowledged.
+    """
+    updates: List[Update] = []
+    flushed = 0
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if "flushed" in entry:
+                flushed = max(flushed, entry["flushed"])
+            else:
+                updates.append(Update(entry["seq"], entry["ts"], entry["customer_id"], entry["field"], entry["value"]))
+    return [update for update in updates if update.seq > flushed]
+
+
+class WriteBehindJournal:
+    """
+    Process-wide journal of customer updates and their background flush.
+
+    append() makes an update durable and returns; one flush task per process,
+    started on the event loop of the first append, sends pending updates to
+    the database with execute_many(). When that loop ends, the next append or
+    flush() starts the task again on its own loop. The file, the sequence
+    numbers and the pending updates are guarded by one lock, so a checkpoint
+    never covers an update that is not pending or already flushed. A second
+    lock keeps batches one at a time, so an older value of a field can never
+    reach the store after a newer one.
+    """
+
+    def __init__(
+        self,
+        db: Any,
+        directory: str = JOURNAL_DIR,
+        on_flushed: Optional[Callable[[List["Update"]], None]] = None
+    ) -> None:
+        self.db = db
+        self.directory = directory
+        # Called on the event loop with each batch the database has taken
+        self.on_flushed = on_flushed
+        self.path = os.path.join(directory, f"journal-{os.getpid()}.jsonl")
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._file = None
+        self._seq = 0
+        self._pending: Dict[FieldKey, Update] = {}
+        # The flush task and the Event that wakes it, both bound to its loop
+        self._flusher: Optional[Tuple["asyncio.Task[None]", asyncio.Event]] = None
+        # flush() calls waiting for the pending updates to drain, with their loops
+        self._drain_waiters: List[Tuple[asyncio.AbstractEventLoop, "asyncio.Future[None]"]] = []
+
+        self.appended = 0
+        self.coalesced = 0
+        self.replayed = 0
+        self.batches = 0
+        self.flushed = 0
+        self.missing = 0
+        self.failures = 0
+        self.max_lag = 0.0
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def open(self) -> None:
+        """Lock this process's journal and take over the updates of any unheld ones."""
+        os.makedirs(self.directory, exist_ok=True)
+        orphans = []
+        for path in sorted(glob.glob(os.path.join(self.directory, "journal-*.jsonl"))):
+            f = open(path, "a", encoding="utf-8")
+            try:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                # A live process still owns it
+                f.close()
+                continue
+            if path == self.path:
+                # Left by an earlier process with this pid; moved aside so this one starts fresh
+                moved = os.path.join(self.directory, f"journal-{os.getpid()}-{time.time_ns()}.jsonl")
+                self._rename(path, moved)
+                path = moved
+            orphans.append((path, f))
+        # Locked under a name the scan above skips, then moved into place, so no
+        # other process starting up can mistake it for an orphan
+        staging = os.path.join(self.directory, f".journal-{os.getpid()}.tmp")
+        self._file = open(staging, "a", encoding="utf-8")
+        fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        self._rename(staging, self.path)
+
+        # The same field updated in several journals takes its latest value
+        latest: Dict[FieldKey, Update] = {}
+        for update in sorted((u for path, _ in orphans for u in read_journal(path)), key=lambda u: (u.ts, u.seq)):
+            latest[update.key] = update
+        with self._lock:
+            for update in latest.values():
+                self._append_locked(update.ts, update.customer_id, update.field, update.value)
+            self._sync_locked()
+        self.replayed = len(latest)
+        # Only now that their updates are durable here can the old journals go
+        for path, f in orphans:
+            os.remove(path)
+            self._sync_directory()
+            f.close()
+        if latest:
+            logger.info("replayed journaled customer updates", extra={
+                "updates": len(latest), "journals": len(orphans)
+            })
+
+    def _rename(self, source: str, destination: str) -> None:
+        os.rename(source, destination)
+        self._sync_directory()
+
+    def _sync_directory(self) -> None:
+        # A rename or removal is only durable once the directory entry is on disk
+        fd = os.open(self.directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def _append_locked(self, ts: float, customer_id: str, field: str, value: Any) -> Update:
+        self._seq += 1
+        update = Update(self._seq, ts, customer_id, field, value)
+        self._file.write(update.to_line())
+        if update.key in self._pending:
+            self.coalesced += 1
+        self._pending[update.key] = update
+        return update
+
+    def _sync_locked(self) -> None:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def _write(self, customer_id: str, field: str, value: Any) -> None:
+        with self._lock:
+            self._append_locked(time.time(), customer_id, field, value)
+            self._sync_locked()
+        self.appended += 1
+
+    async def append(self, customer_id: str, field: str, value: Any) -> None:
+        """Make an update durable; it reaches the database with a later batch."""
+        await asyncio.to_thread(self._write, customer_id, field, value)
+        self._ensure_flushing()
+        if len(self._pending) >= BATCH_SIZE:
+            self._wake()
+
+    def start(self) -> None:
+        """Flush on the running event loop, e.g. updates replayed from an earlier process."""
+        self._ensure_flushing()
+        if self._pending:
+            self._wake()
+
+    def pending_for(self, customer_id: str) -> Dict[str, Any]:
+        """Fields of a customer updated but not yet flushed, with their new values."""
+        with self._lock:
+            return {field: u.value for (cid, field), u in self._pending.items() if cid == customer_id}
+
+    def _ensure_flushing(self) -> None:
+        if self._flusher is not None:
+            task, _ = self._flusher
+            if not task.done() and not task.get_loop().is_closed():
+                return
+        # No flush task, or its loop has ended: pending updates move to this loop's task
+        wakeup = asyncio.Event()
+        task = asyncio.get_running_loop().create_task(self._flush_loop(wakeup))
+        task.add_done_callback(self._flush_task_done)
+        self._flusher = (task, wakeup)
+
+    def _flush_task_done(self, task: "asyncio.Task[None]") -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("customer update flush task stopped", exc_info=task.exception(), extra={
+                "pending": len(self._pending)
+            })
+
+    def _wake(self) -> None:
+        """Wake the flush task, from whichever loop or thread the caller is on."""
+        if self._flusher is None:
+            return
+        task, wakeup = self._flusher
+        try:
+            task.get_loop().call_soon_threadsafe(wakeup.set)
+        except RuntimeError:
+            # Its loop has closed; the next append or flush() starts a new task
+            pass
+
+    async def _flush_loop(self, wakeup: asyncio.Event) -> None:
+        backoff = RETRY_INITIAL
+        while True:
+            try:
+                await asyncio.wait_for(wakeup.wait(), FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            wakeup.clear()
+            while self._pending:
+                try:
+                    await self.flush_once()
+                except Exception:
+                    self.failures += 1
+                    logger.warning("customer update flush failed; retrying", exc_info=True, extra={
+                        "pending": len(self._pending), "retry_s": backoff
+                    })
+                    await asyncio.sleep(backoff)
+                    backoff = min(backoff * 2, RETRY_MAX)
+                else:
+                    backoff = RETRY_INITIAL
+
+    async def flush_once(self) -> int:
+        """
+        Send one batch of pending updates and record the checkpoint; returns the number sent.
+
+        Only one batch is in flight at a time in the process: a batch taken
+        after another is still running waits for it to be checkpointed.
+        """
+        while not self._send_lock.acquire(blocking=False):
+            await asyncio.sleep(RETRY_INITIAL / 4)
+        try:
+            with self._lock:
+                batch = sorted(self._pending.values(), key=lambda u: u.seq)[:BATCH_SIZE]
+            if not batch:
+                return 0
+            changed = await self.db.execute_many([
+                (f"update_customer_{u.field}", (u.value, u.customer_id)) for u in batch
+            ])
+            now = time.time()
+            await asyncio.to_thread(self._checkpoint, batch)
+        finally:
+            self._send_lock.release()
+        if self.on_flushed is not None:
+            self.on_flushed(batch)
+        self.batches += 1
+        self.flushed += len(batch)
+        if changed < len(batch):
+            # Updates are acknowledged without a read, so one may name a customer the store lacks
+            self.missing += len(batch) - changed
+            logger.warning("journaled customer updates matched no customer", extra={
+                "missing": len(batch) - changed, "customers": sorted({u.customer_id for u in batch})
+            })
+        self.max_lag = max(self.max_lag, now - batch[0].ts)
+        if not self._pending:
+            self._notify_drained()
+        return len(batch)
+
+    def _notify_drained(self) -> None:
+        with self._lock:
+            if self._pending:
+                return
+            waiters, self._drain_waiters = self._drain_waiters, []
+        for loop, waiter in waiters:
+            try:
+                loop.call_soon_threadsafe(_resolve, waiter)
+            except RuntimeError:
+                pass
+
+    def _checkpoint(self, batch: List[Update]) -> None:
+        with self._lock:
+            for update in batch:
+                # A newer update to the same field stays pending
+                if self._pending.get(update.key) is update:
+                    del self._pending[update.key]
+            # Everything up to the oldest update still pending has been written
+            oldest = min((u.seq for u in self._pending.values()), default=self._seq + 1)
+            self._file.write(json.dumps({"flushed": oldest - 1}) + "\n")
+            if not self._pending and self._file.tell() > COMPACT_BYTES:
+                self._file.seek(0)
+                self._file.truncate()
+            self._sync_locked()
+
+    async def flush(self, timeout: float = 5.0) -> bool:
+        """Wait for the flush task to write everything pending; False if the store did not take it in time."""
+        waiter = asyncio.get_running_loop().create_future()
+        entry = (asyncio.get_running_loop(), waiter)
+        with self._lock:
+            if not self._pending:
+                return True
+            self._drain_waiters.append(entry)
+        self._ensure_flushing()
+        self._wake()
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                if entry in self._drain_waiters:
+                    self._drain_waiters.remove(entry)
+        return not self._pending
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "appended": self.appended,
+            "coalesced": self.coalesced,
+            "replayed": self.replayed,
+            "pending": len(self._pending),
+            "batches": self.batches,
+            "flushed": self.flushed,
+            "missing_customers": self.missing,
+            "failures": self.failures,
+            "max_lag_ms": round(self.max_lag * 1000, 1)
+        }
+
+
+def _resolve(waiter: "asyncio.Future[None]") -> None:
+    if not waiter.done():
+        waiter.set_result(None)
@@ -0,0 +1,207 @@
+"""
+Per-Tool Metrics for Vehicle Insurance Agent Tools
+
+This module records call counts, errors, latency histograms and argument and
+result sizes for every tool as prometheus_client metrics. Recording a call
+only appends its latency to a list; samples are folded into the histograms
+periodically and at shutdown, which keeps the per-call overhead under a
+microsecond. A session may also register a listener, kept in its userdata,
+that is told about each of its own tool calls, e.g. for tracing; calls are
+only checked for one while some session has registered it.
+
+Tools run in job processes, so the worker runs prometheus_client in
+multiprocess mode with PROMETHEUS_MULTIPROC_DIR: each job process writes its
+metrics there and the worker's Prometheus server, on
+POLICY_BOSS_METRICS_PORT, merges them at /metrics alongside the framework's
+own metrics.
+"""
+
+import asyncio
+import functools
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, TypeVar
+
+from prometheus_client import Counter, Histogram
+
+from .session import session_userdata
+
+
+# Upper bounds of the latency buckets, in seconds
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Upper bounds of the argument and result size buckets, in characters
+SIZE_BUCKETS = (64, 256, 1024, 4096, 16384, 65536)
+
+# Sizes are measured on one call in this many; counting characters of a large
+# result costs far more than the rest of the bookkeeping
+SIZE_SAMPLE_EVERY = int(os.environ.get("POLICY_BOSS_TOOL_METRICS_SIZE_SAMPLE", 16))
+if SIZE_SAMPLE_EVERY < 1:
+    raise ValueError(f"POLICY_BOSS_TOOL_METRICS_SIZE_SAMPLE must be at least 1, got {SIZE_SAMPLE_EVERY}")
+
+# How often a job process folds its latency samples into the histograms
+FLUSH_INTERVAL = float(os.environ.get("POLICY_BOSS_TOOL_METRICS_FLUSH_S", 5))
+
+# Port of the worker's Prometheus server; 0 turns it off
+METRICS_PORT = int(os.environ.get("POLICY_BOSS_METRICS_PORT", 8082))
+
+# prometheus_client multiprocess directory; the worker empties it on start
+METRICS_DIR = os.environ.get(
+    "PROMETHEUS_MULTIPROC_DIR",
+    os.path.join(tempfile.gettempdir(), "policy_boss_metrics")
+)
+
+# Key under which a session keeps its tool call listener in session userdata;
+# it is called with (tool, perf_counter start, seconds, ok) after every call
+LISTENER_USERDATA_KEY = "tool_call_listener"
+
+T = TypeVar("T", bound=Callable[..., Awaitable[Any]])
+
+ToolCallListener = Callable[[str, float, float, bool], None]
+
+_CALLS = Counter("policy_boss_tool_calls", "Tool calls, including failed ones", ["tool"])
+_ERRORS = Counter("policy_boss_tool_errors", "Tool calls that raised", ["tool"])
+_LATENCY = Histogram("policy_boss_tool_latency_seconds", "Tool call latency", ["tool"], buckets=LATENCY_BUCKETS)
+_ARG_SIZE = Histogram(
+    "policy_boss_tool_argument_size_chars", "Size of tool arguments (sampled)", ["tool"], buckets=SIZE_BUCKETS
+)
+_RESULT_SIZE = Histogram(
+    "policy_boss_tool_result_size_chars", "Size of tool results as sent to the LLM (sampled)", ["tool"],
+    buckets=SIZE_BUCKETS
+)
+
+
+class ToolStats:
+    """Metrics of one tool, and its latencies not yet folded into them."""
+
+    __slots__ = ("calls", "errors", "latency", "arg_size", "result_size", "samples")
+
+    def __init__(self, tool: str) -> None:
+        self.calls = _CALLS.labels(tool)
+        self.errors = _ERRORS.labels(tool)
+        self.latency = _LATENCY.labels(tool)
+        self.arg_size = _ARG_SIZE.labels(tool)
+        self.result_size = _RESULT_SIZE.labels(tool)
+        # Latencies recorded since the last fold
+        self.samples: List[float] = []
+
+    def fold(self) -> None:
+        # Cleared in place: metered() holds on to this list
+        if not self.samples:
+            return
+        samples = list(self.samples)
+        del self.samples[:len(samples)]
+        for elapsed in samples:
+            self.latency.observe(elapsed)
+        self.calls.inc(len(samples))
+
+    def record_sizes(self, arg_size: int, result_size: int) -> None:
+        self.arg_size.observe(arg_size)
+        self.result_size.observe(result_size)
+
+
+class ToolMetrics:
+    """Registry of ToolStats for every metered tool in this process."""
+
+    def __init__(self) -> None:
+        self.tools: Dict[str, ToolStats] = {}
+        # Sessions with a tool call listener; while none has, calls skip the lookup
+        self.listening = 0
+        self._lock = threading.Lock()
+
+    def add_listener(self, userdata: Dict[str, Any], listener: ToolCallListener) -> None:
+        """Tell listener about the tool calls of the session whose userdata this is."""
+        with self._lock:
+            if userdata.get(LISTENER_USERDATA_KEY) is None:
+                self.listening += 1
+            userdata[LISTENER_USERDATA_KEY] = listener
+
+    def remove_listener(self, userdata: Dict[str, Any]) -> None:
+        with self._lock:
+            if userdata.pop(LISTENER_USERDATA_KEY, None) is not None:
+                self.listening -= 1
+
+    def stats(self, tool: str) -> ToolStats:
+        stats = self.tools.get(tool)
+        if stats is None:
+            stats = self.tools[tool] = ToolStats(tool)
+        return stats
+
+    def flush(self) -> None:
+        """Fold every tool's pending latency samples into its metrics."""
+        for stats in self.tools.values():
+            stats.fold()
+
+    async def flush_periodically(self, interval: float = FLUSH_INTERVAL) -> None:
+        """Flush every interval seconds until cancelled, then once more."""
+        try:
+            while True:
+                await asyncio.sleep(interval)
+                self.flush()
+        finally:
+            self.flush()
+
+
+def _size(values: Iterable[Any]) -> int:
+    return sum(len(str(value)) for value in values)
+
+
+_metrics = ToolMetrics()
+
+
+def get_tool_metrics() -> ToolMetrics:
+    """Return this process's tool metrics registry."""
+    return _metrics
+
+
+def server_options(port: Optional[int] = None) -> Dict[str, Any]:
+    """WorkerOptions that serve the tool metrics of every job process at :port/metrics."""
+    port = METRICS_PORT if port is None else port
+    if not port:
+        return {}
+    return {"prometheus_port": port, "prometheus_multiproc_dir": METRICS_DIR}
+
+
+def metered(func: T) -> T:
+    """
+    Record metrics for a tool function. Apply it under @function_tool() so the
+    tool keeps the function's name, signature and docstring.
+    """
+    name = func.__name__
+    stats = _metrics.stats(name)
+    samples = stats.samples
+    metrics = _metrics
+    perf_counter = time.perf_counter
+    sample_every = SIZE_SAMPLE_EVERY
+
+    def notify(context: Any, start: float, elapsed: float, ok: bool) -> None:
+        listener: Optional[ToolCallListener] = session_userdata(context, LISTENER_USERDATA_KEY)
+        if listener is not None:
+            listener(name, start, elapsed, ok)
+
+    @functools.wraps(func)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        # The first argument is the RunContext
+        start = perf_counter()
+        try:
+            result = await func(*args, **kwargs)
+        except BaseException as e:
+            elapsed = perf_counter() - start
+            samples.append(elapsed)
+            # Cancellations are timed but not counted as errors
+            if isinstance(e, Exception):
+                stats.errors.inc()
+            if metrics.listening:
+                notify(args[0] if args else None, start, elapsed, False)
+            raise
+        elapsed = perf_counter() - start
+        samples.append(elapsed)
+        if metrics.listening:
+            notify(args[0] if args else None, start, elapsed, True)
+        if not len(samples) % sample_every:
+            stats.record_sizes(_size(args[1:]) + _size(kwargs.values()), len(str(result)))
+        return result
+
+    return wrapper  # type: ignore[return-value]
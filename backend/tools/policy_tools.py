@@ -4,11 +4,46 @@ Policy Tools for Vehicle Insurance Agent
 This module contains tools related to insurance policies, quotes, and commission calculations.
 """
 
+import asyncio
+import os
+from datetime import datetime
+
 from livekit.agents import function_tool, RunContext, ToolError
 from typing import Dict, List, Any, Optional
 
+from .cache import cache_from_env, normalize_choice, normalize_text
+from .claims_store import get_claims_store
+from .commission import (
+    PAYMENT_TIMELINE,
+    compute_commission,
+    current_month,
+    get_commission_ledger,
+    new_entry
+)
+from .concurrency import get_single_flight, turn_deadline
+from .insurers import QuoteRequest, fan_out_quotes, get_insurer_adapters
+from .metrics import metered
+from .prefetch import fetch_policy
+from .pricing import fleet_breakdowns, price_fleet, price_vehicle
+from .shaping import shaped
+
+
+# Per-process result caches shared by every session in this worker process
+_quote_cache = cache_from_env("POLICY_BOSS_QUOTE", maxsize=2048, ttl=300)
+_premium_cache = cache_from_env("POLICY_BOSS_PREMIUM", maxsize=4096, ttl=300)
+
+# Quote fan-out timing, in seconds. The budget bounds how long the caller waits
+# in silence; insurers still running when it expires are reported as pending.
+QUOTE_BUDGET = float(os.environ.get("POLICY_BOSS_QUOTE_BUDGET_MS", 1200)) / 1000
+INSURER_DEADLINE = float(os.environ.get("POLICY_BOSS_INSURER_DEADLINE_MS", 1000)) / 1000
+
+# Most claims a claim listing returns; a spoken answer cannot cover more
+MAX_CLAIMS_RETURNED = 20
+
 
 @function_tool()
+@metered
+@turn_deadline
 async def get_vehicle_insurance_quotes(
     context: RunContext,
     vehicle_type: str,
@@ -20,6 +55,9 @@ async def get_vehicle_insurance_quotes(
     """
     Get insurance quotes for a vehicle from multiple insurance companies.
     
+    Insurers that have not answered in time are listed under pending_insurers
+    and insurers that could not quote under unavailable_insurers.
+    
     Args:
         vehicle_type: Type of vehicle (two_wheeler, four_wheeler, commercial)
         vehicle_model: Model of the vehicle (e.g., "Honda Activa", "Maruti Swift")
@@ -30,104 +68,34 @@ async def get_vehicle_insurance_quotes(
     Returns:
         A dictionary containing quotes from different insurance companies
     """
-    # Dummy data for different vehicle types and coverage options
-    quotes = {
-        "quotes": []
-    }
-    
-    if vehicle_type == "two_wheeler":
-        quotes["quotes"] = [
-            {
-                "company": "Bajaj Allianz",
-                "premium": 2500,
-                "coverage": 150000,
-                "features": ["Roadside Assistance", "Personal Accident Cover"],
-                "discount": "10% for online purchase"
-            },
-            {
-                "company": "ICICI Lombard",
-                "premium": 2200,
-                "coverage": 140000,
-                "features": ["Zero Depreciation", "Engine Protection"],
-                "discount": "No Claim Bonus up to 50%"
-            },
-            {
-                "company": "HDFC ERGO",
-                "premium": 2350,
-                "coverage": 145000,
-                "features": ["Cashless Claims", "24x7 Assistance"],
-                "discount": "5% for HDFC Bank customers"
-            }
-        ]
-    elif vehicle_type == "four_wheeler":
-        quotes["quotes"] = [
-            {
-                "company": "Tata AIG",
-                "premium": 8500,
-                "coverage": 500000,
-                "features": ["Zero Depreciation", "Engine Protection", "Key Replacement"],
-                "discount": "NCB up to 50% for claim-free years"
-            },
-            {
-                "company": "Reliance General",
-                "premium": 7800,
-                "coverage": 480000,
-                "features": ["Roadside Assistance", "Return to Invoice"],
-                "discount": "15% for online purchase"
-            },
-            {
-                "company": "Kotak General Insurance",
-                "premium": 8200,
-                "coverage": 490000,
-                "features": ["Cashless Claims", "Hydrostatic Lock Cover"],
-                "discount": "10% for existing customers"
-            }
-        ]
-    elif vehicle_type == "commercial":
-        quotes["quotes"] = [
-            {
-                "company": "New India Assurance",
-                "premium": 15000,
-                "coverage": 1000000,
-                "features": ["Comprehensive Coverage", "Third-party Liability"],
-                "discount": "Fleet discount available"
-            },
-            {
-                "company": "Oriental Insurance",
-                "premium": 14500,
-                "coverage": 950000,
-                "features": ["Passenger Cover", "Driver Cover"],
-                "discount": "5% for renewal"
-            },
-            {
-                "company": "United India Insurance",
-                "premium": 14800,
-                "coverage": 980000,
-                "features": ["Goods in Transit", "Legal Liability"],
-                "discount": "No Claim Bonus up to 40%"
-            }
-        ]
-    
-    # Adjust quotes based on vehicle age
-    for quote in quotes["quotes"]:
-        if vehicle_age > 5:
-            quote["premium"] = int(quote["premium"] * 1.2)  # 20% increase for older vehicles
-        elif vehicle_age < 2:
-            quote["premium"] = int(quote["premium"] * 0.9)  # 10% discount for newer vehicles
-    
-    # Adjust quotes based on coverage type
-    for quote in quotes["quotes"]:
-        if coverage_type == "third_party":
-            quote["premium"] = int(quote["premium"] * 0.6)  # 40% cheaper for third-party only
-            quote["coverage"] = int(quote["coverage"] * 0.5)
-        elif coverage_type == "zero_dep":
-            quote["premium"] = int(quote["premium"] * 1.3)  # 30% more expensive for zero depreciation
-            quote["coverage"] = int(quote["coverage"] * 1.2)
-    
-    return quotes
+    vehicle_type = normalize_choice(vehicle_type)
+    coverage_type = normalize_choice(coverage_type)
+    key = (vehicle_type, normalize_text(vehicle_model), vehicle_age, coverage_type, normalize_text(city))
+    
+    # Rows are immutable tuples, so the cache can share them between sessions
+    # and only the response envelope is built per call
+    quotes = _quote_cache.get(key)
+    if quotes is not None:
+        return {"quotes": quotes}
+    
+    # Sessions asking for the same comparison at the same time share one fan-out
+    result = await get_single_flight().do(("quotes",) + key, lambda: fan_out_quotes(
+        get_insurer_adapters(),
+        QuoteRequest(vehicle_type, vehicle_model.strip(), vehicle_age, coverage_type, city.strip()),
+        insurer_deadline=INSURER_DEADLINE,
+        budget=QUOTE_BUDGET
+    ))
+    # Only a full comparison is cached; a partial one is retried on the next call
+    if result.complete:
+        _quote_cache.set(key, result.quotes)
+    
+    return result.as_dict()
 
 
 @function_tool()
+@metered
+@turn_deadline
+@shaped
 async def get_policy_details(
     context: RunContext,
     policy_id: str
@@ -141,73 +109,11 @@ async def get_policy_details(
     Returns:
         A dictionary containing policy details
     """
-    # Dummy policy details based on policy ID with 4-digit numeric IDs
-    policies = {
-        "2001": {
-            "policy_number": "2001",
-            "customer_id": "1001",
-            "customer_name": "Rahul Sharma",
-            "vehicle_details": {
-                "type": "four_wheeler",
-                "model": "Maruti Swift",
-                "registration": "3001",
-                "year": 2020
-            },
-            "coverage": {
-                "type": "comprehensive",
-                "amount": 500000,
-                "start_date": "2023-01-15",
-                "end_date": "2024-01-14",
-                "add_ons": ["Zero Depreciation", "Engine Protection"]
-            },
-            "premium": 8500,
-            "status": "active"
-        },
-        "2003": {
-            "policy_number": "2003",
-            "customer_id": "1002",
-            "customer_name": "Priya Patel",
-            "vehicle_details": {
-                "type": "two_wheeler",
-                "model": "Honda Activa",
-                "registration": "3002",
-                "year": 2021
-            },
-            "coverage": {
-                "type": "third_party",
-                "amount": 150000,
-                "start_date": "2023-05-20",
-                "end_date": "2024-05-19",
-                "add_ons": []
-            },
-            "premium": 2200,
-            "status": "active"
-        },
-        "2004": {
-            "policy_number": "2004",
-            "customer_id": "1003",
-            "customer_name": "Amit Singh",
-            "vehicle_details": {
-                "type": "commercial",
-                "model": "Tata Ace",
-                "registration": "3003",
-                "year": 2019
-            },
-            "coverage": {
-                "type": "comprehensive",
-                "amount": 800000,
-                "start_date": "2023-03-10",
-                "end_date": "2024-03-09",
-                "add_ons": ["Passenger Cover", "Goods in Transit"]
-            },
-            "premium": 15000,
-            "status": "active"
-        }
-    }
+    policy = await fetch_policy(context, policy_id)
     
-    # Return a default policy if the policy_id doesn't exist in our dummy data
-    if policy_id in policies:
-        return policies[policy_id]
+    # Return a default policy if the policy_id doesn't exist in the repository
+    if policy is not None:
+        return policy
     else:
         # Instead of raising an error, return a default policy with the requested ID
         return {
@@ -232,6 +138,7 @@ async def get_policy_details(
 
 
 @function_tool()
+@metered
 async def calculate_premium(
     context: RunContext,
     vehicle_type: str,
@@ -253,90 +160,76 @@ async def calculate_premium(
     Returns:
         A dictionary containing premium details and breakdown
     """
-    if add_ons is None:
-        add_ons = []
-    
-    # Base premium calculation (dummy logic)
-    base_rates = {
-        "two_wheeler": 0.02,  # 2% of vehicle value
-        "four_wheeler": 0.025,  # 2.5% of vehicle value
-        "commercial": 0.035   # 3.5% of vehicle value
-    }
+    vehicle_type = normalize_choice(vehicle_type)
+    coverage_type = normalize_choice(coverage_type)
+    add_ons = tuple(add_ons or ())
+    key = (vehicle_type, vehicle_value, vehicle_age, coverage_type, add_ons)
+    
+    premium = _premium_cache.get(key)
+    if premium is None:
+        premium = price_vehicle(vehicle_type, vehicle_value, vehicle_age, coverage_type, add_ons)
+        _premium_cache.set(key, premium)
+    
+    # Hand each caller its own copy so no session can mutate the cached breakdown
+    return {**premium, "add_on_costs": dict(premium["add_on_costs"])}
+
+
+@function_tool()
+@metered
+async def calculate_fleet_premiums(
+    context: RunContext,
+    vehicle_types: List[str],
+    vehicle_values: List[int],
+    vehicle_ages: List[int],
+    coverage_types: List[str],
+    add_ons: Optional[List[List[str]]] = None,
+    include_breakdowns: bool = True
+) -> Dict[str, Any]:
+    """
+    Calculate premiums for a whole fleet of vehicles in a single call.
     
-    coverage_multipliers = {
-        "third_party": 0.6,
-        "comprehensive": 1.0,
-        "zero_dep": 1.3
-    }
+    Inputs are columns: the i-th entry of every list describes the i-th vehicle.
     
-    age_factors = {
-        0: 0.9,  # New vehicle discount
-        1: 0.95,
-        2: 1.0,
-        3: 1.05,
-        4: 1.1,
-        5: 1.15,
-        6: 1.2,
-        7: 1.25,
-        8: 1.3,
-        9: 1.35,
-        10: 1.4
-    }
+    Args:
+        vehicle_types: Type of each vehicle (two_wheeler, four_wheeler, commercial)
+        vehicle_values: Current market value of each vehicle in INR
+        vehicle_ages: Age of each vehicle in years
+        coverage_types: Coverage type for each vehicle (third_party, comprehensive, zero_dep)
+        add_ons: Optional list of add-on coverages for each vehicle
+        include_breakdowns: Whether to return the premium breakdown of every vehicle
     
-    # Cap vehicle age at 10 years for calculation
-    calc_age = min(vehicle_age, 10)
-    
-    # Calculate base premium
-    base_premium = vehicle_value * base_rates.get(vehicle_type, 0.03)
-    
-    # Apply coverage type multiplier
-    adjusted_premium = base_premium * coverage_multipliers.get(coverage_type, 1.0)
-    
-    # Apply age factor
-    adjusted_premium = adjusted_premium * age_factors.get(calc_age, 1.5)
-    
-    # Calculate add-on costs
-    add_on_costs = {}
-    total_add_on_cost = 0
-    
-    add_on_rates = {
-        "Zero Depreciation": 0.15 * base_premium,
-        "Engine Protection": 0.1 * base_premium,
-        "Roadside Assistance": 0.05 * base_premium,
-        "Return to Invoice": 0.12 * base_premium,
-        "Key Replacement": 0.03 * base_premium,
-        "Passenger Cover": 0.08 * base_premium,
-        "Driver Cover": 0.07 * base_premium,
-        "Goods in Transit": 0.2 * base_premium,
-        "Personal Accident Cover": 0.06 * base_premium,
-        "Consumables Cover": 0.04 * base_premium
+    Returns:
+        A dictionary containing fleet totals and per-vehicle premium breakdowns
+    """
+    vehicle_count = len(vehicle_values)
+    columns = [vehicle_types, vehicle_ages, coverage_types] + ([add_ons] if add_ons is not None else [])
+    if any(len(column) != vehicle_count for column in columns):
+        raise ToolError("Every fleet column must have one entry per vehicle")
+    
+    # The same spellings calculate_premium accepts, so both tools price a vehicle alike
+    vehicle_types = [normalize_choice(v) for v in vehicle_types]
+    coverage_types = [normalize_choice(c) for c in coverage_types]
+    pricing = price_fleet(vehicle_types, vehicle_values, vehicle_ages, coverage_types, add_ons)
+    breakdowns = fleet_breakdowns(pricing, add_ons)
+    
+    # Totals add up the rounded per-vehicle amounts so they reconcile with the breakdowns
+    fleet_totals = {
+        "vehicle_count": vehicle_count,
+        "total_pre_tax_premium": round(sum(b["pre_tax_premium"] for b in breakdowns), 2),
+        "total_gst": round(sum(b["gst"] for b in breakdowns), 2),
+        "total_final_premium": round(sum(b["final_premium"] for b in breakdowns), 2)
     }
     
-    for add_on in add_ons:
-        if add_on in add_on_rates:
-            cost = add_on_rates[add_on]
-            add_on_costs[add_on] = cost
-            total_add_on_cost += cost
-    
-    # Calculate total premium
-    total_premium = adjusted_premium + total_add_on_cost
-    
-    # Apply GST (18%)
-    gst = total_premium * 0.18
-    final_premium = total_premium + gst
-    
-    return {
-        "base_premium": round(base_premium, 2),
-        "adjusted_premium": round(adjusted_premium, 2),
-        "add_on_costs": {k: round(v, 2) for k, v in add_on_costs.items()},
-        "total_add_on_cost": round(total_add_on_cost, 2),
-        "pre_tax_premium": round(total_premium, 2),
-        "gst": round(gst, 2),
-        "final_premium": round(final_premium, 2)
-    }
+    result = {"fleet_totals": fleet_totals}
+    if include_breakdowns:
+        result["vehicles"] = breakdowns
+    return result
 
 
 @function_tool()
+@metered
+@turn_deadline
+@shaped
 async def check_claim_status(
     context: RunContext,
     claim_id: str
@@ -350,59 +243,11 @@ async def check_claim_status(
     Returns:
         A dictionary containing claim status and details
     """
-    # Dummy claim data with 4-digit numeric IDs
-    claims = {
-        "4001": {
-            "claim_id": "4001",
-            "policy_id": "2001",
-            "customer_id": "1001",
-            "customer_name": "Rahul Sharma",
-            "vehicle_details": {
-                "model": "Maruti Swift",
-                "registration": "3001"
-            },
-            "incident_date": "2023-08-15",
-            "claim_amount": 25000,
-            "status": "approved",
-            "settlement_amount": 22500,
-            "processing_time": "5 days",
-            "notes": "Claim approved with 10% depreciation"
-        },
-        "4002": {
-            "claim_id": "4002",
-            "policy_id": "2003",
-            "customer_id": "1002",
-            "customer_name": "Priya Patel",
-            "vehicle_details": {
-                "model": "Honda Activa",
-                "registration": "3002"
-            },
-            "incident_date": "2023-09-20",
-            "claim_amount": 8000,
-            "status": "processing",
-            "processing_time": "2 days so far",
-            "notes": "Documents verification in progress"
-        },
-        "4003": {
-            "claim_id": "4003",
-            "policy_id": "2004",
-            "customer_id": "1003",
-            "customer_name": "Amit Singh",
-            "vehicle_details": {
-                "model": "Tata Ace",
-                "registration": "3003"
-            },
-            "incident_date": "2023-07-05",
-            "claim_amount": 45000,
-            "status": "rejected",
-            "processing_time": "10 days",
-            "notes": "Claim rejected due to policy exclusions"
-        }
-    }
+    claim = await get_claims_store().get(claim_id)
     
-    # Return a default claim if the claim_id doesn't exist in our dummy data
-    if claim_id in claims:
-        return claims[claim_id]
+    # Return a default claim if the claim_id doesn't exist in the claims store
+    if claim is not None:
+        return claim
     else:
         # Instead of raising an error, return a default claim with the requested ID
         return {
@@ -422,6 +267,57 @@ async def check_claim_status(
 
 
 @function_tool()
+@metered
+@turn_deadline
+async def get_customer_open_claims(
+    context: RunContext,
+    customer_id: str
+) -> Dict[str, Any]:
+    """
+    Get all open (not yet settled or rejected) claims for a customer.
+    
+    Args:
+        customer_id: The unique identifier for the customer
+    
+    Returns:
+        A dictionary containing the customer's open claims, most recent first
+    """
+    claims = await get_claims_store().open_claims_for_customer(customer_id, limit=MAX_CLAIMS_RETURNED)
+    
+    return {
+        "customer_id": customer_id,
+        "open_claim_count": len(claims),
+        "claims": claims
+    }
+
+
+@function_tool()
+@metered
+@turn_deadline
+async def get_policy_claims(
+    context: RunContext,
+    policy_id: str
+) -> Dict[str, Any]:
+    """
+    Get all claims made on a specific insurance policy.
+    
+    Args:
+        policy_id: The unique identifier for the policy
+    
+    Returns:
+        A dictionary containing the policy's claims, most recent first
+    """
+    claims = await get_claims_store().claims_for_policy(policy_id, limit=MAX_CLAIMS_RETURNED)
+    
+    return {
+        "policy_id": policy_id,
+        "claim_count": len(claims),
+        "claims": claims
+    }
+
+
+@function_tool()
+@metered
 async def get_agent_commission(
     context: RunContext,
     policy_type: str,
@@ -441,73 +337,86 @@ async def get_agent_commission(
     Returns:
         A dictionary containing commission details
     """
-    # Base commission rates by policy type
-    base_commission_rates = {
-        "two_wheeler": 0.15,  # 15% for two-wheeler policies
-        "four_wheeler": 0.175,  # 17.5% for four-wheeler policies
-        "commercial": 0.20    # 20% for commercial vehicle policies
-    }
+    commission = compute_commission(normalize_choice(policy_type), premium_amount, is_new_policy, insurance_company)
     
-    # Company-specific adjustments
-    company_multipliers = {
-        "Bajaj Allianz": 1.05,
-        "ICICI Lombard": 1.0,
-        "HDFC ERGO": 1.1,
-        "Tata AIG": 1.15,
-        "Reliance General": 0.95,
-        "Kotak General Insurance": 1.0,
-        "New India Assurance": 0.9,
-        "Oriental Insurance": 0.85,
-        "United India Insurance": 0.8,
-        # Default for other companies
-        "default": 1.0
+    return {
+        "base_commission_rate": f"{commission['base_rate'] * 100:.2f}%",
+        "adjusted_commission_rate": f"{commission['commission_rate'] * 100:.2f}%",
+        "commission_amount": round(commission["commission_amount"], 2),
+        "incentives": round(commission["incentives"], 2),
+        "incentive_details": commission["incentive_details"],
+        "total_earnings": round(commission["total_earnings"], 2),
+        "payment_timeline": PAYMENT_TIMELINE
     }
+
+
+def _agent_id(context: RunContext) -> str:
+    try:
+        return context.userdata["policy_boss_api"]["agent_id"]
+    except (KeyError, TypeError, ValueError):
+        raise ToolError("No agent is signed in for this session")
+
+
+@function_tool()
+@metered
+async def record_policy_sale(
+    context: RunContext,
+    policy_id: str,
+    policy_type: str,
+    premium_amount: float,
+    is_new_policy: bool,
+    insurance_company: str
+) -> Dict[str, Any]:
+    """
+    Record a policy sold by the current agent in their commission ledger.
     
-    # Get base commission rate
-    base_rate = base_commission_rates.get(policy_type, 0.15)
-    
-    # Apply new policy vs renewal adjustment
-    if not is_new_policy:
-        base_rate = base_rate * 0.7  # 30% lower commission for renewals
-    
-    # Apply company-specific multiplier
-    company_multiplier = company_multipliers.get(insurance_company, company_multipliers["default"])
-    
-    # Calculate commission
-    commission_rate = base_rate * company_multiplier
-    commission_amount = premium_amount * commission_rate
-    
-    # Calculate incentives
-    incentives = 0
-    incentive_details = []
-    
-    # Monthly target incentive (dummy logic)
-    if premium_amount > 10000:
-        target_incentive = premium_amount * 0.02
-        incentives += target_incentive
-        incentive_details.append({
-            "type": "Monthly Target Bonus",
-            "amount": round(target_incentive, 2)
-        })
-    
-    # Special campaign incentive (dummy logic)
-    if insurance_company in ["Bajaj Allianz", "HDFC ERGO", "Tata AIG"] and is_new_policy:
-        campaign_incentive = premium_amount * 0.03
-        incentives += campaign_incentive
-        incentive_details.append({
-            "type": "Special Campaign Bonus",
-            "amount": round(campaign_incentive, 2)
-        })
-    
-    # Total earnings
-    total_earnings = commission_amount + incentives
+    Args:
+        policy_id: The unique identifier for the sold policy
+        policy_type: Type of policy (two_wheeler, four_wheeler, commercial)
+        premium_amount: The premium amount of the policy
+        is_new_policy: Whether this is a new policy or a renewal
+        insurance_company: The insurance company providing the policy
+    
+    Returns:
+        A dictionary containing the recorded commission and the agent's month-to-date earnings
+    """
+    ledger = get_commission_ledger().agent(_agent_id(context))
+    entry = new_entry(policy_id, normalize_choice(policy_type), premium_amount, is_new_policy, insurance_company)
+    # The ledger reads and appends its file; keep that off the event loop
+    recorded = await asyncio.to_thread(ledger.record, entry)
+    month_totals = await asyncio.to_thread(ledger.statement, entry.month)
     
     return {
-        "base_commission_rate": f"{base_rate * 100:.2f}%",
-        "adjusted_commission_rate": f"{commission_rate * 100:.2f}%",
-        "commission_amount": round(commission_amount, 2),
-        "incentives": round(incentives, 2),
-        "incentive_details": incentive_details,
-        "total_earnings": round(total_earnings, 2),
-        "payment_timeline": "15th of next month"
+        "recorded": recorded,
+        "policy_id": policy_id,
+        "message": "Sale recorded" if recorded else "This policy was already recorded",
+        "commission_amount": round(entry.commission_amount, 2),
+        "incentives": round(entry.incentives, 2),
+        "month": entry.month,
+        "month_to_date_earnings": month_totals["total_earnings"]
     }
+
+
+@function_tool()
+@metered
+@turn_deadline
+async def get_commission_statement(
+    context: RunContext,
+    month: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Get the current agent's commission statement and incentive progress for a month.
+    
+    Args:
+        month: Month in YYYY-MM format; defaults to the current month
+    
+    Returns:
+        A dictionary containing earnings totals by insurer and policy type plus incentive progress
+    """
+    try:
+        month = datetime.strptime(month, "%Y-%m").strftime("%Y-%m") if month else current_month()
+    except ValueError:
+        raise ToolError("Month must be in YYYY-MM format, for example 2025-05")
+    
+    ledger = get_commission_ledger().agent(_agent_id(context))
+    return await asyncio.to_thread(ledger.statement, month)
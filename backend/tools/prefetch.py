@@ -0,0 +1,187 @@
+"""
+Speculative Prefetch for Vehicle Insurance Agent Tools
+
+This module lets a tool start lookups the conversation is likely to need next,
+in the background of the current session. A validated registration number is
+almost always followed by get_vehicle_details and then get_customer_profile for
+the owner, so those records are loaded while the LLM is still composing its
+reply and the follow-up tool calls are answered from memory.
+"""
+
+import asyncio
+import functools
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from livekit.agents import RunContext
+
+from .entities import session_entities
+from .repository import get_repository
+from .session import session_userdata
+
+
+logger = logging.getLogger("policy-boss.prefetch")
+
+# Key under which each session keeps its prefetcher in session userdata
+USERDATA_KEY = "prefetcher"
+
+# Kinds of record prefetch_vehicle_and_owner loads; no other kind can be a hit
+PREFETCHED_KINDS = frozenset({"vehicle", "customer"})
+
+
+class Prefetcher:
+    """
+    Per-session store of speculative lookups.
+
+    Each prefetched value is handed out once: a tool call that finds it counts
+    as a hit, and entries that expire or are still unused when the session ends
+    count as wasted.
+    """
+
+    def __init__(self, ttl: float = 60.0, clock: Callable[[], float] = time.monotonic) -> None:
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: Dict[Hashable, Tuple[float, "asyncio.Task[Any]"]] = {}
+        self.started = 0
+        self.hits = 0
+        self.misses = 0
+        self.wasted = 0
+        self.failed = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def prefetch(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> None:
+        """Start loading key in the background unless it is already held."""
+        self._expire()
+        if key in self._entries:
+            return
+        task = asyncio.ensure_future(loader())
+        task.add_done_callback(self._log_failure)
+        self._entries[key] = (self._clock() + self.ttl, task)
+        self.started += 1
+
+    async def take(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Return the prefetched value for key, or call loader on a miss.
+
+        A prefetch that is still running is awaited rather than repeated; one
+        that failed falls back to loader.
+        """
+        self._expire()
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            task = entry[1]
+            try:
+                value = await asyncio.shield(task)
+            except asyncio.CancelledError:
+                if not task.cancelled():
+                    raise
+            except Exception:
+                pass
+            else:
+                self.hits += 1
+                return value
+        self.misses += 1
+        return await loader()
+
+    def discard(self, key: Hashable) -> None:
+        """Drop a prefetched value that is no longer current."""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            entry[1].cancel()
+            self.wasted += 1
+
+    def close(self) -> None:
+        """Cancel outstanding prefetches; anything never taken is wasted."""
+        for _, task in self._entries.values():
+            task.cancel()
+        self.wasted += len(self._entries)
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "started": self.started,
+            "pending": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "wasted": self.wasted,
+            "failed": self.failed,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+    def _expire(self) -> None:
+        now = self._clock()
+        for key in [key for key, (expires_at, _) in self._entries.items() if expires_at <= now]:
+            self._entries.pop(key)[1].cancel()
+            self.wasted += 1
+
+    def _log_failure(self, task: "asyncio.Task[Any]") -> None:
+        if not task.cancelled() and task.exception() is not None:
+            self.failed += 1
+            logger.warning("prefetch failed", exc_info=task.exception())
+
+
+def session_prefetcher(context: Optional[RunContext]) -> Optional[Prefetcher]:
+    """Return the prefetcher of the session a tool runs in, if it has one."""
+    return session_userdata(context, USERDATA_KEY)
+
+
+async def _fetch(
+    context: Optional[RunContext],
+    kind: str,
+    entity_id: str,
+    loader: Callable[[], Awaitable[Optional[Dict[str, Any]]]]
+) -> Optional[Dict[str, Any]]:
+    # The session's entity cache first, then its prefetched record, then the repository.
+    # Only prefetched kinds go through the prefetcher, so other lookups are not counted as misses.
+    prefetcher = session_prefetcher(context) if kind in PREFETCHED_KINDS else None
+    if prefetcher is not None:
+        loader = functools.partial(prefetcher.take, (kind, entity_id), loader)
+    entities = session_entities(context)
+    if entities is None:
+        return await loader()
+    return await entities.get(kind, entity_id, loader)
+
+
+async def fetch_vehicle(context: Optional[RunContext], registration_number: str) -> Optional[Dict[str, Any]]:
+    """Look up a vehicle, using the session's cached or prefetched record when there is one."""
+    loader = functools.partial(get_repository().get_vehicle, registration_number)
+    return await _fetch(context, "vehicle", registration_number, loader)
+
+
+async def fetch_customer(context: Optional[RunContext], customer_id: str) -> Optional[Dict[str, Any]]:
+    """Look up a customer, using the session's cached or prefetched record when there is one."""
+    loader = functools.partial(get_repository().get_customer, customer_id)
+    return await _fetch(context, "customer", customer_id, loader)
+
+
+async def fetch_policy(context: Optional[RunContext], policy_id: str) -> Optional[Dict[str, Any]]:
+    """Look up a policy, using the session's cached record when there is one."""
+    loader = functools.partial(get_repository().get_policy, policy_id)
+    return await _fetch(context, "policy", policy_id, loader)
+
+
+def prefetch_vehicle_and_owner(context: Optional[RunContext], registration_number: str) -> None:
+    """After a successful validation, load the vehicle and then its owner's profile."""
+    prefetcher = session_prefetcher(context)
+    if prefetcher is None:
+        return
+    # Nothing to gain for records the session already holds
+    entities = session_entities(context)
+    if entities is not None and ("vehicle", registration_number) in entities:
+        return
+
+    async def load_vehicle() -> Optional[Dict[str, Any]]:
+        vehicle = await get_repository().get_vehicle(registration_number)
+        customer_id = vehicle.get("customer_id") if vehicle else None
+        if customer_id and (entities is None or ("customer", customer_id) not in entities):
+            prefetcher.prefetch(
+                ("customer", customer_id),
+                functools.partial(get_repository().get_customer, customer_id)
+            )
+        return vehicle
+
+    prefetcher.prefetch(("vehicle", registration_number), load_vehicle)
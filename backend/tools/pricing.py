@@ -0,0 +1,231 @@
+"""
+Premium Pricing Engine for Vehicle Insurance Agent
+
+This module holds the premium rate tables and prices vehicles either one at a
+time or as a whole fleet with NumPy. Both paths apply the same operations in the
+same order, so a fleet row matches the single-vehicle result exactly.
+"""
+
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+
+# Share of vehicle value charged as base premium
+BASE_RATES = {
+    "two_wheeler": 0.02,  # 2% of vehicle value
+    "four_wheeler": 0.025,  # 2.5% of vehicle value
+    "commercial": 0.035   # 3.5% of vehicle value
+}
+DEFAULT_BASE_RATE = 0.03
+
+COVERAGE_MULTIPLIERS = {
+    "third_party": 0.6,
+    "comprehensive": 1.0,
+    "zero_dep": 1.3
+}
+DEFAULT_COVERAGE_MULTIPLIER = 1.0
+
+# Indexed by vehicle age in years, capped at MAX_RATED_AGE
+AGE_FACTORS = (0.9, 0.95, 1.0, 1.05, 1.1, 1.15, 1.2, 1.25, 1.3, 1.35, 1.4)
+MAX_RATED_AGE = len(AGE_FACTORS) - 1
+# Applied to ages outside the table (negative ages)
+DEFAULT_AGE_FACTOR = 1.5
+
+# Add-on cost as a share of base premium
+ADD_ON_RATES = {
+    "Zero Depreciation": 0.15,
+    "Engine Protection": 0.1,
+    "Roadside Assistance": 0.05,
+    "Return to Invoice": 0.12,
+    "Key Replacement": 0.03,
+    "Passenger Cover": 0.08,
+    "Driver Cover": 0.07,
+    "Goods in Transit": 0.2,
+    "Personal Accident Cover": 0.06,
+    "Consumables Cover": 0.04
+}
+
+GST_RATE = 0.18
+
+_AGE_FACTOR_TABLE = np.array(AGE_FACTORS + (DEFAULT_AGE_FACTOR,))
+
+
+def _age_factor(vehicle_age: int) -> float:
+    calc_age = min(vehicle_age, MAX_RATED_AGE)
+    return AGE_FACTORS[calc_age] if calc_age >= 0 else DEFAULT_AGE_FACTOR
+
+
+def price_vehicle(
+    vehicle_type: str,
+    vehicle_value: int,
+    vehicle_age: int,
+    coverage_type: str,
+    add_ons: Sequence[str] = ()
+) -> Dict[str, Any]:
+    """
+    Price a single vehicle and return the premium breakdown.
+
+    Args:
+        vehicle_type: Type of vehicle (two_wheeler, four_wheeler, commercial)
+        vehicle_value: Current market value of the vehicle in INR
+        vehicle_age: Age of the vehicle in years
+        coverage_type: Type of coverage (third_party, comprehensive, zero_dep)
+        add_ons: Add-on coverages; unknown names are ignored
+
+    Returns:
+        A dictionary containing premium details and breakdown
+    """
+    base_premium = vehicle_value * BASE_RATES.get(vehicle_type, DEFAULT_BASE_RATE)
+    adjusted_premium = base_premium * COVERAGE_MULTIPLIERS.get(coverage_type, DEFAULT_COVERAGE_MULTIPLIER)
+    adjusted_premium = adjusted_premium * _age_factor(vehicle_age)
+
+    add_on_costs = {}
+    total_add_on_cost = 0
+    for add_on in add_ons:
+        if add_on in ADD_ON_RATES:
+            cost = ADD_ON_RATES[add_on] * base_premium
+            add_on_costs[add_on] = cost
+            total_add_on_cost += cost
+
+    total_premium = adjusted_premium + total_add_on_cost
+    gst = total_premium * GST_RATE
+    final_premium = total_premium + gst
+
+    return {
+        "base_premium": round(base_premium, 2),
+        "adjusted_premium": round(adjusted_premium, 2),
+        "add_on_costs": {k: round(v, 2) for k, v in add_on_costs.items()},
+        "total_add_on_cost": round(total_add_on_cost, 2),
+        "pre_tax_premium": round(total_premium, 2),
+        "gst": round(gst, 2),
+        "final_premium": round(final_premium, 2)
+    }
+
+
+class FleetPricing(NamedTuple):
+    """Unrounded per-vehicle premium columns for a fleet."""
+    base_premium: np.ndarray
+    adjusted_premium: np.ndarray
+    # Shape (vehicles, max add-ons per vehicle); zero where a slot is unused
+    add_on_costs: np.ndarray
+    total_add_on_cost: np.ndarray
+    pre_tax_premium: np.ndarray
+    gst: np.ndarray
+    final_premium: np.ndarray
+
+
+def price_fleet(
+    vehicle_types: Sequence[str],
+    vehicle_values: Sequence[int],
+    vehicle_ages: Sequence[int],
+    coverage_types: Sequence[str],
+    add_ons: Optional[Sequence[Sequence[str]]] = None
+) -> FleetPricing:
+    """
+    Price every vehicle of a fleet from columnar inputs in one vectorized pass.
+
+    All columns must have the same length. Add-on totals are accumulated slot by
+    slot in each vehicle's own order so the floating point result is identical
+    to price_vehicle.
+    """
+    n = len(vehicle_values)
+    base_rates = np.fromiter((BASE_RATES.get(t, DEFAULT_BASE_RATE) for t in vehicle_types), float, n)
+    coverage_multipliers = np.fromiter(
+        (COVERAGE_MULTIPLIERS.get(c, DEFAULT_COVERAGE_MULTIPLIER) for c in coverage_types), float, n
+    )
+    ages = np.minimum(np.asarray(vehicle_ages, dtype=np.int64), MAX_RATED_AGE)
+    age_factors = _AGE_FACTOR_TABLE[np.where(ages < 0, len(AGE_FACTORS), ages)]
+
+    base_premium = np.asarray(vehicle_values, dtype=float) * base_rates
+    adjusted_premium = base_premium * coverage_multipliers * age_factors
+
+    # Scatter the ragged add-on lists into a (vehicles, slots) rate matrix
+    counts = np.fromiter((len(names) for names in add_ons), np.int64, n) if add_ons else np.zeros(n, np.int64)
+    slots = int(counts.max()) if n else 0
+    add_on_rates = np.zeros((n, slots))
+    if slots:
+        flat_rates = np.fromiter(
+            (ADD_ON_RATES.get(name, 0.0) for names in add_ons for name in names), float, int(counts.sum())
+        )
+        rows = np.repeat(np.arange(n), counts)
+        starts = np.repeat(np.cumsum(counts) - counts, counts)
+        add_on_rates[rows, np.arange(len(flat_rates)) - starts] = flat_rates
+    add_on_costs = add_on_rates * base_premium[:, None]
+
+    total_add_on_cost = np.zeros(n)
+    for j in range(slots):
+        total_add_on_cost += add_on_costs[:, j]
+
+    pre_tax_premium = adjusted_premium + total_add_on_cost
+    gst = pre_tax_premium * GST_RATE
+    return FleetPricing(
+        base_premium=base_premium,
+        adjusted_premium=adjusted_premium,
+        add_on_costs=add_on_costs,
+        total_add_on_cost=total_add_on_cost,
+        pre_tax_premium=pre_tax_premium,
+        gst=gst,
+        final_premium=pre_tax_premium + gst,
+    )
+
+
+def round_half_cents(values: np.ndarray) -> np.ndarray:
+    """
+    Round to 2 decimals exactly like Python's round(x, 2), but vectorized.
+
+    np.round works on x * 100, which can land on the wrong side of a half cent;
+    the few values that close to a tie are re-rounded with Python's round().
+    """
+    scaled = values * 100
+    rounded = np.rint(scaled) / 100
+    distance_to_tie = np.abs(scaled - np.floor(scaled) - 0.5)
+    near_tie = np.flatnonzero(distance_to_tie <= 1e-9 * np.maximum(1.0, np.abs(scaled)))
+    for i in near_tie.tolist():
+        rounded.flat[i] = round(float(values.flat[i]), 2)
+    return rounded
+
+
+def fleet_breakdowns(
+    pricing: FleetPricing,
+    add_ons: Optional[Sequence[Sequence[str]]] = None
+) -> List[Dict[str, Any]]:
+    """Convert fleet pricing columns into the same per-vehicle dicts as price_vehicle."""
+    columns = zip(*(round_half_cents(column).tolist() for column in (
+        pricing.base_premium,
+        pricing.adjusted_premium,
+        pricing.total_add_on_cost,
+        pricing.pre_tax_premium,
+        pricing.gst,
+        pricing.final_premium,
+    )))
+    if not add_ons:
+        return [
+            {
+                "base_premium": base,
+                "adjusted_premium": adjusted,
+                "add_on_costs": {},
+                "total_add_on_cost": add_on_total,
+                "pre_tax_premium": pre_tax,
+                "gst": gst,
+                "final_premium": final
+            }
+            for base, adjusted, add_on_total, pre_tax, gst, final in columns
+        ]
+
+    add_on_costs = round_half_cents(pricing.add_on_costs).tolist()
+    return [
+        {
+            "base_premium": base,
+            "adjusted_premium": adjusted,
+            "add_on_costs": {
+                name: cost for name, cost in zip(names, costs) if name in ADD_ON_RATES
+            },
+            "total_add_on_cost": add_on_total,
+            "pre_tax_premium": pre_tax,
+            "gst": gst,
+            "final_premium": final
+        }
+        for names, costs, (base, adjusted, add_on_total, pre_tax, gst, final)
+        in zip(add_ons, add_on_costs, columns)
+    ]
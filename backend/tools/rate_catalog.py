@@ -0,0 +1,122 @@
+"""
+Rate Catalog for Vehicle Insurance Quotes
+
+This module loads the insurer rate catalog from a JSON data file once per worker
+process and indexes precomputed quote rows by (vehicle_type, coverage_type, age band).
+"""
+
+import json
+import os
+from bisect import bisect_left
+from functools import lru_cache
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+
+# Catalog shipped with the agent; override with POLICY_BOSS_RATE_CATALOG
+DEFAULT_CATALOG_PATH = os.path.join(os.path.dirname(__file__), "data", "rate_catalog.json")
+
+
+class QuoteRow(NamedTuple):
+    """A single insurer quote, already adjusted for age band and coverage type."""
+    company: str
+    premium: int
+    coverage: int
+    features: Tuple[str, ...]
+    discount: str
+
+
+class RateCatalog:
+    """
+    Read-only index of quote rows keyed by (vehicle_type, coverage_type, age band).
+
+    Every combination is computed when the catalog is built, so a lookup is a
+    bisect on the age limits plus one dict access and never allocates rows.
+    """
+
+    def __init__(self, data: Dict[str, Any]) -> None:
+        bands = data["age_bands"]
+        # The last band is open-ended (max_age null) and catches everything older
+        self._age_limits: List[int] = [band["max_age"] for band in bands[:-1]]
+        self.age_bands: Tuple[str, ...] = tuple(band["name"] for band in bands)
+        self.coverage_types: Tuple[str, ...] = tuple(data["coverage_types"])
+        self.default_coverage_type: str = data.get("default_coverage_type", "comprehensive")
+
+        base_rows: Dict[str, List[Dict[str, Any]]] = {}
+        for row in data["quotes"]:
+            base_rows.setdefault(row["vehicle_type"], []).append(row)
+        self.vehicle_types: Tuple[str, ...] = tuple(base_rows)
+
+        self._index: Dict[Tuple[str, str, str], Tuple[QuoteRow, ...]] = {}
+        self._company_index: Dict[Tuple[str, str, str, str], Tuple[QuoteRow, ...]] = {}
+        for vehicle_type, rows in base_rows.items():
+            for coverage_type, cover in data["coverage_types"].items():
+                for band in bands:
+                    key = (vehicle_type, coverage_type, band["name"])
+                    adjusted = tuple(self._adjust(row, band["premium_multiplier"], cover) for row in rows)
+                    self._index[key] = adjusted
+                    by_company: Dict[str, List[QuoteRow]] = {}
+                    for quote in adjusted:
+                        by_company.setdefault(quote.company, []).append(quote)
+                    for company, quotes in by_company.items():
+                        self._company_index[(company,) + key] = tuple(quotes)
+
+        # Insurers in catalog order, which is also the order quotes are listed in
+        self.companies: Tuple[str, ...] = tuple(dict.fromkeys(row["company"] for row in data["quotes"]))
+        self.insurer_count = len(self.companies)
+        self.row_count = len(data["quotes"])
+
+    @staticmethod
+    def _adjust(row: Dict[str, Any], age_multiplier: float, cover: Dict[str, float]) -> QuoteRow:
+        # Same rounding order as the original per-call logic: age first, then coverage
+        premium = int(row["premium"] * age_multiplier)
+        premium = int(premium * cover["premium_multiplier"])
+        coverage = int(row["coverage"] * cover["coverage_multiplier"])
+        return QuoteRow(
+            company=row["company"],
+            premium=premium,
+            coverage=coverage,
+            features=tuple(row["features"]),
+            discount=row["discount"],
+        )
+
+    @classmethod
+    def from_file(cls, path: str) -> "RateCatalog":
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def age_band(self, vehicle_age: int) -> str:
+        return self.age_bands[bisect_left(self._age_limits, vehicle_age)]
+
+    def quotes(self, vehicle_type: str, coverage_type: str, vehicle_age: int) -> Tuple[QuoteRow, ...]:
+        """
+        Look up the precomputed quote rows for a vehicle.
+
+        Unknown coverage types are priced as the default coverage type and unknown
+        vehicle types return no quotes.
+        """
+        if coverage_type not in self.coverage_types:
+            coverage_type = self.default_coverage_type
+        return self._index.get((vehicle_type, coverage_type, self.age_band(vehicle_age)), ())
+
+    def company_quotes(
+        self, company: str, vehicle_type: str, coverage_type: str, vehicle_age: int
+    ) -> Tuple[QuoteRow, ...]:
+        """Same as quotes(), restricted to a single insurer."""
+        if coverage_type not in self.coverage_types:
+            coverage_type = self.default_coverage_type
+        return self._company_index.get(
+            (company, vehicle_type, coverage_type, self.age_band(vehicle_age)), ()
+        )
+
+
+@lru_cache(maxsize=None)
+def get_rate_catalog(path: Optional[str] = None) -> RateCatalog:
+    """
+    Return the process-wide rate catalog, loading it on first use.
+
+    Args:
+        path: Optional catalog file; defaults to POLICY_BOSS_RATE_CATALOG or the bundled file
+    """
+    return RateCatalog.from_file(
+        path or os.environ.get("POLICY_BOSS_RATE_CATALOG", DEFAULT_CATALOG_PATH)
+    )
@@ -0,0 +1,259 @@
+"""
+Vehicle Registration Validation
+
+This module validates Indian vehicle registration numbers, one at a time or as
+a stream of CSV rows. The pattern and the state/RTO lookup tables are built
+once at import. Bulk validation reads files in fixed-size chunks and checks a
+whole chunk with a single compiled regex pass, so memory stays bounded and
+only the rejected lines of a chunk are looked at individually. Both paths
+ignore whitespace around a number; letters must already be upper case.
+"""
+
+import csv
+import re
+from collections import Counter
+from typing import Any, BinaryIO, Dict, List, NamedTuple, Union
+
+
+# Format: [State Code (2)] [District Code (2)] [Series (1-3)] [Number (4)]
+# Example: MH01AB1234, KA02EF9012
+REGISTRATION_PATTERN = r'^[A-Z]{2}[0-9]{2}[A-Z]{1,3}[0-9]{4}$'
+_REGISTRATION_RE = re.compile(REGISTRATION_PATTERN)
+
+STATE_CODES = {
+    "AN": "Andaman and Nicobar Islands",
+    "AP": "Andhra Pradesh",
+    "AR": "Arunachal Pradesh",
+    "AS": "Assam",
+    "BR": "Bihar",
+    "CG": "Chhattisgarh",
+    "CH": "Chandigarh",
+    "DD": "Dadra and Nagar Haveli and Daman and Diu",
+    "DL": "Delhi",
+    "GA": "Goa",
+    "GJ": "Gujarat",
+    "HP": "Himachal Pradesh",
+    "HR": "Haryana",
+    "JH": "Jharkhand",
+    "JK": "Jammu and Kashmir",
+    "KA": "Karnataka",
+    "KL": "Kerala",
+    "LA": "Ladakh",
+    "LD": "Lakshadweep",
+    "MH": "Maharashtra",
+    "ML": "Meghalaya",
+    "MN": "Manipur",
+    "MP": "Madhya Pradesh",
+    "MZ": "Mizoram",
+    "NL": "Nagaland",
+    "OD": "Odisha",
+    "PB": "Punjab",
+    "PY": "Puducherry",
+    "RJ": "Rajasthan",
+    "SK": "Sikkim",
+    "TN": "Tamil Nadu",
+    "TR": "Tripura",
+    "TS": "Telangana",
+    "UK": "Uttarakhand",
+    "UP": "Uttar Pradesh",
+    "WB": "West Bengal"
+}
+
+# RTO offices by state + district code, for the offices we know about
+RTO_OFFICES = {
+    "MH01": "Mumbai Central RTO",
+    "MH02": "Mumbai West RTO",
+    "MH03": "Mumbai East RTO",
+    "MH12": "Pune RTO",
+    "DL01": "Delhi North RTO",
+    "DL03": "Delhi South RTO",
+    "KA01": "Bangalore Central RTO",
+    "KA02": "Bangalore West RTO",
+    "TN01": "Chennai Central RTO",
+    "TS09": "Hyderabad Central RTO",
+    "GJ01": "Ahmedabad RTO",
+    "WB01": "Kolkata RTO"
+}
+
+INVALID_FORMAT_MESSAGE = (
+    "Invalid registration number format. Expected format: "
+    "[State Code (2)][District Code (2)][Series (1-3)][Number (4)]"
+)
+EXAMPLES = ["MH01AB1234", "KA02EF9012", "DL05CD5678"]
+
+
+def normalize_registration(registration_number: str) -> str:
+    """The registration number as validated: without surrounding whitespace."""
+    return registration_number.strip()
+
+
+def validate_registration(registration_number: str) -> Dict[str, Any]:
+    """
+    Validate a single registration number and describe its parts.
+
+    Returns:
+        A dictionary containing validation results
+    """
+    registration_number = normalize_registration(registration_number)
+    if not _REGISTRATION_RE.match(registration_number):
+        return {
+            "is_valid": False,
+            "message": INVALID_FORMAT_MESSAGE,
+            "examples": EXAMPLES
+        }
+
+    state_code = registration_number[:2]
+    district_code = registration_number[2:4]
+    result = {
+        "is_valid": True,
+        "registration_number": registration_number,
+        "state_code": state_code,
+        "state_name": STATE_CODES.get(state_code, "Unknown State"),
+        "district_code": district_code,
+        "series": registration_number[4:-4],
+        "number": registration_number[-4:],
+        "message": "Valid registration number format"
+    }
+    rto = RTO_OFFICES.get(state_code + district_code)
+    if rto is not None:
+        result["rto"] = rto
+    return result
+
+
+class InvalidRow(NamedTuple):
+    line: int
+    value: str
+
+
+class BulkValidationResult(NamedTuple):
+    total: int
+    valid: int
+    invalid: int
+    by_state: Dict[str, int]
+    invalid_rows: List[InvalidRow]
+    # True when more invalid rows were found than were kept
+    invalid_rows_truncated: bool
+
+
+class _ChunkPatterns(NamedTuple):
+    # Matches a whole valid line and captures its state code
+    valid: "re.Pattern[bytes]"
+    # Matches the newline before every line `valid` does not match: invalid
+    # numbers, quoted or padded fields and blank lines, re-checked with csv.
+    # Anchoring on a literal newline lets the regex engine skip from line to
+    # line instead of trying every byte.
+    rejected: "re.Pattern[bytes]"
+
+
+def _chunk_patterns(column: int) -> _ChunkPatterns:
+    fields = rb"(?:[^,\n]*,){%d}" % column
+    number = rb"[A-Z]{2}[0-9]{2}[A-Z]{1,3}[0-9]{4}"
+    return _ChunkPatterns(
+        valid=re.compile(rb"^" + fields + rb"([A-Z]{2})[0-9]{2}[A-Z]{1,3}[0-9]{4}(?:,[^\n]*)?\r?$", re.MULTILINE),
+        rejected=re.compile(rb"\n(?!" + fields + number + rb"(?:,|\r?\n))")
+    )
+
+
+_CHUNK_PATTERNS: Dict[int, _ChunkPatterns] = {0: _chunk_patterns(0)}
+
+
+def validate_registration_stream(
+    stream: BinaryIO,
+    column: Union[int, str] = 0,
+    has_header: bool = True,
+    max_invalid_rows: int = 1000,
+    chunk_size: int = 4 * 1024 * 1024
+) -> BulkValidationResult:
+    """
+    Validate every registration number in a CSV stream in bounded memory.
+
+    Args:
+        stream: Binary file object with one vehicle per line
+        column: Index or header name of the registration column
+        has_header: Whether the first line is a header row
+        max_invalid_rows: Most invalid rows to keep; the rest are only counted
+        chunk_size: Bytes read per chunk
+
+    Returns:
+        A BulkValidationResult with summary counts and the invalid rows
+    """
+    line_no = 0
+    leftover = b""
+    if has_header:
+        header = stream.readline()
+        line_no = 1
+        if isinstance(column, str):
+            names = next(csv.reader([header.decode("utf-8-sig")]))
+            if column not in names:
+                raise ValueError(f"column {column!r} not found in header")
+            column = names.index(column)
+    elif isinstance(column, str):
+        raise ValueError("a column name needs a header row")
+
+    patterns = _CHUNK_PATTERNS.get(column)
+    if patterns is None:
+        patterns = _CHUNK_PATTERNS[column] = _chunk_patterns(column)
+
+    valid = invalid = 0
+    by_state: Counter = Counter()
+    invalid_rows: List[InvalidRow] = []
+
+    while True:
+        data = stream.read(chunk_size)
+        if not data:
+            if not leftover:
+                break
+            chunk, leftover = leftover + b"\n", b""
+        else:
+            data = leftover + data
+            cut = data.rfind(b"\n") + 1
+            if cut == 0:
+                leftover = data
+                continue
+            chunk, leftover = data[:cut], data[cut:]
+
+        states = patterns.valid.findall(chunk)
+        by_state.update(states)
+        valid += len(states)
+        lines = chunk.count(b"\n")
+        if len(states) < lines:
+            # Every line now follows a newline; the chunk's last one starts none
+            text = b"\n" + chunk
+            last = len(text) - 1
+            current, scanned = line_no, 0
+            for match in patterns.rejected.finditer(text):
+                start = match.start()
+                if start == last:
+                    break
+                current += text.count(b"\n", scanned, start)
+                scanned = start
+                raw = text[start + 1:text.index(b"\n", start + 1)]
+                if not raw.strip():
+                    continue
+                row = next(csv.reader([raw.decode("utf-8", "replace")]), [])
+                value = normalize_registration(row[column]) if column < len(row) else ""
+                if _REGISTRATION_RE.match(value):
+                    # Valid but quoted or padded, so the chunk pattern missed it
+                    valid += 1
+                    by_state[value[:2].encode()] += 1
+                    continue
+                invalid += 1
+                if len(invalid_rows) < max_invalid_rows:
+                    invalid_rows.append(InvalidRow(current + 1, value))
+        line_no += lines
+
+    return BulkValidationResult(
+        total=valid + invalid,
+        valid=valid,
+        invalid=invalid,
+        by_state={code.decode(): count for code, count in by_state.most_common()},
+        invalid_rows=invalid_rows,
+        invalid_rows_truncated=invalid > len(invalid_rows)
+    )
+
+
+def validate_registration_file(path: str, **kwargs: Any) -> BulkValidationResult:
+    """Validate a CSV file of registration numbers; see validate_registration_stream."""
+    with open(path, "rb") as f:
+        return validate_registration_stream(f, **kwargs)
+
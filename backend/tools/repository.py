@@ -0,0 +1,490 @@
+"""
+Repository Layer for Vehicle Insurance Agent
+
+This module is the single source of customer, policy and vehicle records for
+the tools. Records live in a local SQLite database behind an async connection
+pool; a different backend can be plugged in by implementing Database.
+Every lookup is one named, prepared query on an indexed column, and read
+results are kept in a per-process cache until a write invalidates them.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .cache import TTLCache, cache_from_env
+from .concurrency import SingleFlight, get_single_flight
+from .journal import JOURNAL_DIR, WRITE_BEHIND_ENABLED, Update, WriteBehindJournal
+
+
+logger = logging.getLogger("policy-boss.repository")
+
+SEED_PATH = os.path.join(os.path.dirname(__file__), "data", "repository_seed.json")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS customers (
+    customer_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    age INTEGER,
+    gender TEXT,
+    phone TEXT,
+    email TEXT,
+    address TEXT,
+    occupation TEXT,
+    driving_experience INTEGER,
+    total_claims INTEGER,
+    last_claim_date TEXT,
+    customer_since TEXT
+);
+CREATE TABLE IF NOT EXISTS policies (
+    policy_id TEXT PRIMARY KEY,
+    customer_id TEXT NOT NULL,
+    vehicle_type TEXT,
+    vehicle_model TEXT,
+    vehicle_registration TEXT,
+    vehicle_year INTEGER,
+    coverage_type TEXT,
+    coverage_amount INTEGER,
+    start_date TEXT,
+    end_date TEXT,
+    add_ons TEXT,
+    premium INTEGER,
+    status TEXT
+);
+CREATE INDEX IF NOT EXISTS policies_customer_idx ON policies (customer_id, policy_id);
+CREATE TABLE IF NOT EXISTS vehicles (
+    registration TEXT PRIMARY KEY,
+    customer_id TEXT,
+    make TEXT,
+    model TEXT,
+    variant TEXT,
+    fuel_type TEXT,
+    year INTEGER,
+    engine_number TEXT,
+    chassis_number TEXT,
+    seating_capacity INTEGER,
+    cubic_capacity INTEGER,
+    registration_date TEXT,
+    insurance_history TEXT,
+    rto TEXT,
+    hypothecation TEXT
+);
+CREATE INDEX IF NOT EXISTS vehicles_customer_idx ON vehicles (customer_id);
+"""
+
+_CUSTOMER_COLUMNS = (
+    "customer_id", "name", "age", "gender", "phone", "email", "address", "occupation",
+    "driving_experience", "total_claims", "last_claim_date", "customer_since"
+)
+_POLICY_COLUMNS = (
+    "policy_id", "customer_id", "vehicle_type", "vehicle_model", "vehicle_registration",
+    "vehicle_year", "coverage_type", "coverage_amount", "start_date", "end_date", "add_ons",
+    "premium", "status"
+)
+_VEHICLE_COLUMNS = (
+    "registration", "customer_id", "make", "model", "variant", "fuel_type", "year",
+    "engine_number", "chassis_number", "seating_capacity", "cubic_capacity",
+    "registration_date", "insurance_history", "rto", "hypothecation"
+)
+
+# Customer fields update_customer_details may write, mapped to their column
+UPDATABLE_CUSTOMER_FIELDS = {
+    "phone": "phone",
+    "email": "email",
+    "address": "address",
+    "occupation": "occupation",
+    "driving_experience": "driving_experience",
+    "age": "age"
+}
+
+# Every statement the repository runs. SQL text is fixed per name, so each
+# pooled connection prepares it once and reuses it from its statement cache.
+QUERIES = {
+    "customer_by_id": f"SELECT {', '.join(_CUSTOMER_COLUMNS)} FROM customers WHERE customer_id = ?",
+    "policy_by_id": (
+        f"SELECT {', '.join('p.' + c for c in _POLICY_COLUMNS)}, c.name FROM policies p "
+        "LEFT JOIN customers c ON c.customer_id = p.customer_id WHERE p.policy_id = ?"
+    ),
+    "policies_by_customer": (
+        f"SELECT {', '.join(_POLICY_COLUMNS)} FROM policies WHERE customer_id = ? ORDER BY policy_id"
+    ),
+    "vehicle_by_registration": (
+        f"SELECT {', '.join('v.' + c for c in _VEHICLE_COLUMNS)}, c.name FROM vehicles v "
+        "LEFT JOIN customers c ON c.customer_id = v.customer_id WHERE v.registration = ?"
+    ),
+    **{
+        f"update_customer_{field}": f"UPDATE customers SET {column} = ? WHERE customer_id = ?"
+        for field, column in UPDATABLE_CUSTOMER_FIELDS.items()
+    }
+}
+
+
+class Database(ABC):
+    """Minimal async interface the repository needs from a backing database."""
+
+    @abstractmethod
+    async def fetch_one(self, query: str, params: Sequence[Any]) -> Optional[Tuple[Any, ...]]:
+        """Run the named query and return its first row, if any."""
+
+    @abstractmethod
+    async def fetch_all(self, query: str, params: Sequence[Any]) -> List[Tuple[Any, ...]]:
+        """Run the named query and return all rows."""
+
+    @abstractmethod
+    async def execute(self, query: str, params: Sequence[Any]) -> int:
+        """Run the named write query and return the number of rows changed."""
+
+    async def execute_many(self, statements: Sequence[Tuple[str, Sequence[Any]]]) -> int:
+        """Run named write queries, in one transaction where the backend has them."""
+        changed = 0
+        for query, params in statements:
+            changed += await self.execute(query, params)
+        return changed
+
+
+class SQLitePool(Database):
+    """
+    Async connection pool over one SQLite database file.
+
+    Queries run on a small thread pool where each thread owns one connection,
+    so the event loop never blocks on disk and statements stay prepared per
+    connection. Queries are named; queries maps each name to its SQL.
+    """
+
+    def __init__(self, path: str, size: int = 4, queries: Optional[Dict[str, str]] = None) -> None:
+        self.path = path
+        self.size = size
+        self.queries = QUERIES if queries is None else queries
+        self._local = threading.local()
+        self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="policy-boss-db")
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, cached_statements=len(self.queries) * 2)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _fetch_one(self, query: str, params: Sequence[Any]) -> Optional[Tuple[Any, ...]]:
+        return self._connection().execute(self.queries[query], params).fetchone()
+
+    def _fetch_all(self, query: str, params: Sequence[Any]) -> List[Tuple[Any, ...]]:
+        return self._connection().execute(self.queries[query], params).fetchall()
+
+    def _execute(self, query: str, params: Sequence[Any]) -> int:
+        conn = self._connection()
+        with conn:
+            return conn.execute(self.queries[query], params).rowcount
+
+    def _execute_many(self, statements: Sequence[Tuple[str, Sequence[Any]]]) -> int:
+        conn = self._connection()
+        with conn:
+            return sum(conn.execute(self.queries[query], params).rowcount for query, params in statements)
+
+    async def _run(self, fn, query: str, params: Sequence[Any]) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, query, params)
+
+    async def fetch_one(self, query: str, params: Sequence[Any]) -> Optional[Tuple[Any, ...]]:
+        return await self._run(self._fetch_one, query, params)
+
+    async def fetch_all(self, query: str, params: Sequence[Any]) -> List[Tuple[Any, ...]]:
+        return await self._run(self._fetch_all, query, params)
+
+    async def execute(self, query: str, params: Sequence[Any]) -> int:
+        return await self._run(self._execute, query, params)
+
+    async def execute_many(self, statements: Sequence[Tuple[str, Sequence[Any]]]) -> int:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self._execute_many, statements)
+
+    def initialize(self, seed_path: Optional[str] = SEED_PATH) -> None:
+        """Create the schema and load the seed records into an empty database."""
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = sqlite3.connect(self.path)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            if seed_path and conn.execute("SELECT 1 FROM customers LIMIT 1").fetchone() is None:
+                with open(seed_path, encoding="utf-8") as f:
+                    seed = json.load(f)
+                with conn:
+                    _insert(conn, "customers", _CUSTOMER_COLUMNS, seed["customers"])
+                    _insert(conn, "policies", _POLICY_COLUMNS, seed["policies"])
+                    _insert(conn, "vehicles", _VEHICLE_COLUMNS, seed["vehicles"])
+        finally:
+            conn.close()
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+
+
+def _insert(conn: sqlite3.Connection, table: str, columns: Sequence[str], records: List[Dict[str, Any]]) -> None:
+    conn.executemany(
+        f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+        [
+            tuple(json.dumps(r[c]) if isinstance(r.get(c), list) else r.get(c) for c in columns)
+            for r in records
+        ]
+    )
+
+
+def _customer_record(row: Tuple[Any, ...]) -> Dict[str, Any]:
+    (customer_id, name, age, gender, phone, email, address, occupation,
+     driving_experience, total_claims, last_claim_date, customer_since) = row
+    return {
+        "customer_id": customer_id,
+        "name": name,
+        "age": age,
+        "gender": gender,
+        "contact": {
+            "phone": phone,
+            "email": email,
+            "address": address
+        },
+        "occupation": occupation,
+        "driving_experience": driving_experience,
+        "claim_history": {
+            "total_claims": total_claims,
+            "last_claim_date": last_claim_date
+        },
+        "customer_since": customer_since
+    }
+
+
+def _set_customer_field(record: Dict[str, Any], field: str, value: Any) -> None:
+    if field in record["contact"]:
+        record["contact"][field] = value
+    else:
+        record[field] = value
+
+
+def _policy_record(row: Tuple[Any, ...]) -> Dict[str, Any]:
+    (policy_id, customer_id, vehicle_type, vehicle_model, vehicle_registration, vehicle_year,
+     coverage_type, coverage_amount, start_date, end_date, add_ons, premium, status, customer_name) = row
+    return {
+        "policy_number": policy_id,
+        "customer_id": customer_id,
+        "customer_name": customer_name,
+        "vehicle_details": {
+            "type": vehicle_type,
+            "model": vehicle_model,
+            "registration": vehicle_registration,
+            "year": vehicle_year
+        },
+        "coverage": {
+            "type": coverage_type,
+            "amount": coverage_amount,
+            "start_date": start_date,
+            "end_date": end_date,
+            "add_ons": json.loads(add_ons) if add_ons else []
+        },
+        "premium": premium,
+        "status": status
+    }
+
+
+def _policy_summary(row: Tuple[Any, ...]) -> Dict[str, Any]:
+    (policy_id, _, vehicle_type, vehicle_model, _, _, _, coverage_amount,
+     start_date, end_date, _, premium, status) = row
+    return {
+        "policy_id": policy_id,
+        "type": vehicle_type,
+        "vehicle": vehicle_model,
+        "coverage": coverage_amount,
+        "premium": premium,
+        "start_date": start_date,
+        "end_date": end_date,
+        "status": status
+    }
+
+
+def _vehicle_record(row: Tuple[Any, ...]) -> Dict[str, Any]:
+    record = dict(zip(_VEHICLE_COLUMNS, row))
+    record["insurance_history"] = json.loads(record["insurance_history"] or "[]")
+    owner_name = row[-1]
+    # Keep the key order the vehicle tool has always returned
+    return {
+        **{k: record[k] for k in _VEHICLE_COLUMNS[:-2]},
+        "owner_name": owner_name,
+        "rto": record["rto"],
+        "hypothecation": record["hypothecation"]
+    }
+
+
+class Repository:
+    """
+    Customer, policy and vehicle lookups shared by all tools.
+
+    Raw rows are cached per process and turned into fresh dicts on every call,
+    so callers may modify what they get back. Concurrent misses for the same
+    row share one query through the single flight, and a load that was still
+    running when a write invalidated the cache does not put its older row
+    back. With a journal, customer updates are acknowledged once journaled and
+    written to the database in the background; reads show them in the
+    meantime.
+    """
+
+    def __init__(
+        self,
+        db: Database,
+        cache: TTLCache,
+        flight: Optional[SingleFlight] = None,
+        journal: Optional[WriteBehindJournal] = None
+    ) -> None:
+        self.db = db
+        self.cache = cache
+        self.flight = flight if flight is not None else get_single_flight()
+        self.journal = journal
+        if journal is not None:
+            journal.on_flushed = self._on_flushed
+        # Moves on every invalidation; loads started under an older one are not cached
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    async def _fetch_one(self, query: str, key: str) -> Optional[Tuple[Any, ...]]:
+        cache_key = (query, key)
+        row = self.cache.get(cache_key)
+        if row is None:
+            row = await self.flight.do(("repository",) + cache_key, lambda: self._load_one(query, key))
+        return row
+
+    async def _load_one(self, query: str, key: str) -> Optional[Tuple[Any, ...]]:
+        generation = self._generation
+        row = await self.db.fetch_one(query, (key,))
+        if row is None:
+            return None
+        row = tuple(row)
+        self._store((query, key), row, generation)
+        return row
+
+    def _store(self, cache_key: Tuple[str, str], value: Any, generation: int) -> None:
+        with self._lock:
+            if generation == self._generation:
+                self.cache.set(cache_key, value)
+
+    async def get_customer(self, customer_id: str) -> Optional[Dict[str, Any]]:
+        row = await self._fetch_one("customer_by_id", customer_id)
+        if not row:
+            return None
+        record = _customer_record(row)
+        if self.journal is not None:
+            for field, value in self.journal.pending_for(customer_id).items():
+                _set_customer_field(record, field, value)
+        return record
+
+    async def get_policy(self, policy_id: str) -> Optional[Dict[str, Any]]:
+        row = await self._fetch_one("policy_by_id", policy_id)
+        return _policy_record(row) if row else None
+
+    async def get_vehicle(self, registration: str) -> Optional[Dict[str, Any]]:
+        row = await self._fetch_one("vehicle_by_registration", registration)
+        return _vehicle_record(row) if row else None
+
+    async def get_customer_policies(self, customer_id: str) -> List[Dict[str, Any]]:
+        cache_key = ("policies_by_customer", customer_id)
+        rows = self.cache.get(cache_key)
+        if rows is None:
+            rows = await self.flight.do(("repository",) + cache_key, lambda: self._load_policies(customer_id))
+        return [_policy_summary(row) for row in rows]
+
+    async def _load_policies(self, customer_id: str) -> Tuple[Tuple[Any, ...], ...]:
+        generation = self._generation
+        rows = tuple(tuple(r) for r in await self.db.fetch_all("policies_by_customer", (customer_id,)))
+        self._store(("policies_by_customer", customer_id), rows, generation)
+        return rows
+
+    async def update_customer_field(self, customer_id: str, field: str, value: Any) -> bool:
+        """
+        Write one customer field and drop the cached customer record.
+
+        Returns:
+            True if a customer row was updated, or the update was journaled.
+            A journaled update is not checked against the store first, which
+            would put a read on the path to the acknowledgement; callers check
+            the customer exists, and the flush counts updates that found none.
+        """
+        if field in ("age", "driving_experience") and isinstance(value, str) and value.strip().isdigit():
+            value = int(value)
+        if self.journal is not None:
+            await self.journal.append(customer_id, field, value)
+            return True
+        updated = await self.db.execute(f"update_customer_{field}", (value, customer_id))
+        self._invalidate_customer(customer_id)
+        return updated > 0
+
+    def _invalidate_customer(self, customer_id: str) -> None:
+        with self._lock:
+            self._generation += 1
+            self.cache.delete(("customer_by_id", customer_id))
+        # A read that started before the write must not be joined by later ones
+        self.flight.forget(("repository", "customer_by_id", customer_id))
+
+    def _on_flushed(self, batch: List[Update]) -> None:
+        # Cached rows predate the batch, and its updates no longer show as pending
+        for customer_id in {update.customer_id for update in batch}:
+            self._invalidate_customer(customer_id)
+
+    def start(self) -> None:
+        """Start writing journaled customer updates from the running event loop."""
+        if self.journal is not None:
+            self.journal.start()
+
+    async def flush(self) -> None:
+        """Write journaled customer updates to the database now, e.g. before the process exits."""
+        if self.journal is not None and not await self.journal.flush():
+            logger.warning("journaled customer updates not flushed; they replay on restart", extra=self.journal.stats())
+
+
+_repository: Optional[Repository] = None
+
+
+def get_repository() -> Repository:
+    """
+    Return the process-wide repository.
+
+    Uses the SQLite database at POLICY_BOSS_DB (seeded on first use) unless
+    another backend was installed with set_repository(). Customer updates go
+    through this process's write-behind journal, which takes over the updates
+    journals of exited processes left unflushed.
+    """
+    global _repository
+    if _repository is None:
+        pool = SQLitePool(
+            os.environ.get(
+                "POLICY_BOSS_DB",
+                os.path.join(os.path.expanduser("~"), ".cache", "policy_boss", "policy_boss.db")
+            ),
+            size=int(os.environ.get("POLICY_BOSS_DB_POOL_SIZE", 4))
+        )
+        pool.initialize()
+        journal = None
+        if WRITE_BEHIND_ENABLED:
+            journal = WriteBehindJournal(pool, JOURNAL_DIR)
+            journal.open()
+        _repository = Repository(
+            pool, cache_from_env("POLICY_BOSS_REPOSITORY", maxsize=4096, ttl=60), journal=journal
+        )
+    return _repository
+
+
+def set_repository(repository: Repository) -> None:
+    """Install a repository backed by another Database implementation."""
+    global _repository
+    _repository = repository
@@ -0,0 +1,24 @@
+"""
+Session State for Vehicle Insurance Agent Tools
+
+The agent keeps each session's per-call helpers (result shaper, prefetcher,
+entity cache) in the session's userdata dict. Tools also run outside a
+session, in benchmarks and scripts, with no context or one without userdata;
+this module gives them one way to look those helpers up that treats every
+such case as "not available".
+"""
+
+from typing import Any, Optional
+
+from livekit.agents import RunContext
+
+
+def session_userdata(context: Optional[RunContext], key: str) -> Any:
+    """Return the value the session a tool runs in keeps under key in its userdata, if any."""
+    try:
+        userdata = context.userdata
+    except (AttributeError, ValueError):
+        return None
+    if isinstance(userdata, dict):
+        return userdata.get(key)
+    return None
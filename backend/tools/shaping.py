@@ -0,0 +1,285 @@
+"""
+Result Shaping for Vehicle Insurance Agent Tools
+
+A tool's result goes into the chat context as text and is sent again with
+every later LLM request of the call. The record lookups return everything
+the repository holds (engine and chassis numbers, the full insurance history,
+the RTO), most of which never makes it into a spoken answer. This module
+projects each of those results down to the fields a reply needs, serializes
+them as compact JSON, and keeps the full record in the session, from where
+get_full_record returns the omitted fields if the LLM asks for them.
+
+Each shaped result carries the record's id and the names of the fields left
+out, so the LLM knows what it can ask for. The Assistant reports every LLM
+request to the session's ResultShaper, which counts the input tokens the
+shaped results saved in it against sending the records whole.
+"""
+
+import functools
+import json
+import os
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from livekit.agents import RunContext, ToolError, function_tool, llm
+
+from .metrics import metered
+from .session import session_userdata
+
+
+# Set to 0 to send tool results whole
+SHAPING_ENABLED = os.environ.get("POLICY_BOSS_RESULT_SHAPING", "1") != "0"
+
+# Key under which each session keeps its shaper in session userdata
+USERDATA_KEY = "result_shaper"
+
+# Full records a session keeps for get_full_record; a call rarely looks up more
+MAX_RECORDS = 64
+
+T = TypeVar("T", bound=Callable[..., Awaitable[Any]])
+
+
+class Projection:
+    """
+    The fields of one tool's result that go to the LLM.
+
+    fields are dotted paths into the record ("coverage.end_date"), kept in
+    their nesting; derived fields are computed from the record, for values
+    buried in lists. key names the field the record id is made from.
+    """
+
+    def __init__(
+        self,
+        kind: str,
+        key: str,
+        fields: Tuple[str, ...],
+        derived: Optional[Dict[str, Callable[[Dict[str, Any]], Any]]] = None
+    ) -> None:
+        self.kind = kind
+        self.key = key
+        self.fields = fields
+        self.derived = derived or {}
+
+    def record_id(self, record: Dict[str, Any]) -> str:
+        return f"{self.kind}:{record.get(self.key)}"
+
+    def apply(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        shaped: Dict[str, Any] = {}
+        for path in self.fields:
+            found, value = _lookup(record, path)
+            if not found:
+                continue
+            *parents, leaf = path.split(".")
+            target = shaped
+            for part in parents:
+                target = target.setdefault(part, {})
+            target[leaf] = value
+        for name, derive in self.derived.items():
+            value = derive(record)
+            if value is not None:
+                shaped[name] = value
+        return shaped
+
+    def omitted(self, record: Dict[str, Any]) -> List[str]:
+        """Top-level fields left out entirely; parts of nested ones are not listed."""
+        kept = {path.split(".")[0] for path in self.fields}
+        return [name for name in record if name not in kept]
+
+
+def _lookup(record: Dict[str, Any], path: str) -> Tuple[bool, Any]:
+    value: Any = record
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return False, None
+        value = value[part]
+    return True, value
+
+
+def _current_insurer(vehicle: Dict[str, Any]) -> Optional[str]:
+    history = vehicle.get("insurance_history") or []
+    return history[-1].get("insurer") if history else None
+
+
+PROJECTIONS: Dict[str, Projection] = {
+    "get_vehicle_details": Projection(
+        "vehicle", "registration",
+        (
+            "registration", "customer_id", "owner_name", "make", "model", "variant", "fuel_type", "year",
+            "hypothecation"
+        ),
+        derived={"current_insurer": _current_insurer}
+    ),
+    "get_policy_details": Projection(
+        "policy", "policy_number",
+        (
+            "policy_number", "customer_id", "customer_name", "status", "premium",
+            "vehicle_details.model", "vehicle_details.registration",
+            "coverage.type", "coverage.amount", "coverage.end_date", "coverage.add_ons"
+        )
+    ),
+    "check_claim_status": Projection(
+        "claim", "claim_id",
+        (
+            "claim_id", "policy_id", "status", "claim_amount", "settlement_amount",
+            "processing_time", "notes", "vehicle_details.model"
+        )
+    ),
+    "get_customer_profile": Projection(
+        "customer", "customer_id",
+        ("customer_id", "name", "contact", "customer_since", "claim_history.total_claims")
+    )
+}
+
+
+def compact_json(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def estimate_tokens(text: str) -> int:
+    # The same four characters per token intent.schema_tokens uses
+    return len(text) // 4
+
+
+class ResultShaper:
+    """
+    Per-session store of full records and accounting of what shaping saved.
+
+    shape() is called by the shaped() wrapper for each tool result;
+    record_request() by the Assistant for each LLM request, with the chat
+    context it sends.
+    """
+
+    def __init__(self, enabled: bool = SHAPING_ENABLED, max_records: int = MAX_RECORDS) -> None:
+        self.enabled = enabled
+        self.max_records = max_records
+        self._records: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # Tokens each shaped result saves, by function call id
+        self._saved: Dict[str, int] = {}
+        self._last_user_id: Optional[str] = None
+
+        self.shaped_calls = 0
+        self.full_tokens = 0
+        self.shaped_tokens = 0
+        self.full_record_requests = 0
+        self.requests = 0
+        self.tokens_saved = 0
+        # Input tokens saved in each user turn, across its LLM requests
+        self.turn_tokens_saved: List[int] = []
+
+    def shape(self, tool: str, result: Any, call_id: Optional[str]) -> Any:
+        """Return the result to send for a tool call, keeping the full record."""
+        projection = PROJECTIONS.get(tool)
+        if not self.enabled or projection is None or not isinstance(result, dict):
+            return result
+        record_id = projection.record_id(result)
+        self._records[record_id] = result
+        self._records.move_to_end(record_id)
+        while len(self._records) > self.max_records:
+            self._records.popitem(last=False)
+
+        shaped = projection.apply(result)
+        shaped["record_id"] = record_id
+        omitted = projection.omitted(result)
+        if omitted:
+            shaped["more_fields"] = omitted
+        text = compact_json(shaped)
+
+        # The framework would have sent str() of the record
+        full_tokens = estimate_tokens(str(result))
+        shaped_tokens = estimate_tokens(text)
+        self.shaped_calls += 1
+        self.full_tokens += full_tokens
+        self.shaped_tokens += shaped_tokens
+        if call_id is not None:
+            self._saved[call_id] = full_tokens - shaped_tokens
+        return text
+
+    def full_record(self, record_id: str) -> Optional[Dict[str, Any]]:
+        self.full_record_requests += 1
+        return self._records.get(record_id)
+
+    def record_request(self, chat_ctx: llm.ChatContext) -> int:
+        """Count the input tokens the shaped results in an LLM request saved."""
+        saved = sum(
+            self._saved.get(item.call_id, 0)
+            for item in chat_ctx.items if item.type == "function_call_output"
+        )
+        user = next((item for item in reversed(chat_ctx.items) if item.type == "message" and item.role == "user"), None)
+        user_id = user.id if user is not None else None
+        if user_id != self._last_user_id or not self.turn_tokens_saved:
+            self._last_user_id = user_id
+            self.turn_tokens_saved.append(0)
+        self.turn_tokens_saved[-1] += saved
+        self.requests += 1
+        self.tokens_saved += saved
+        return saved
+
+    def stats(self) -> Dict[str, Any]:
+        turns = self.turn_tokens_saved
+        return {
+            "enabled": self.enabled,
+            "shaped_calls": self.shaped_calls,
+            "result_tokens_full": self.full_tokens,
+            "result_tokens_shaped": self.shaped_tokens,
+            "full_record_requests": self.full_record_requests,
+            "requests": self.requests,
+            "input_tokens_saved": self.tokens_saved,
+            "avg_input_tokens_saved_per_turn": round(sum(turns) / len(turns)) if turns else 0,
+            "max_input_tokens_saved_per_turn": max(turns) if turns else 0
+        }
+
+
+def session_shaper(context: Optional[RunContext]) -> Optional[ResultShaper]:
+    """Return the result shaper of the session a tool runs in, if it has one."""
+    return session_userdata(context, USERDATA_KEY)
+
+
+def shaped(func: T) -> T:
+    """
+    Shape a record lookup's result with its projection. Apply it under
+    @metered so the result sizes recorded are those sent to the LLM. Tools
+    run outside a session with a shaper return their full result.
+    """
+    name = func.__name__
+
+    @functools.wraps(func)
+    async def wrapper(context: RunContext, *args: Any, **kwargs: Any) -> Any:
+        result = await func(context, *args, **kwargs)
+        shaper = session_shaper(context)
+        if shaper is None:
+            return result
+        call = getattr(context, "function_call", None)
+        return shaper.shape(name, result, call.call_id if call is not None else None)
+
+    return wrapper  # type: ignore[return-value]
+
+
+@function_tool()
+@metered
+async def get_full_record(
+    context: RunContext,
+    record_id: str,
+    fields: Optional[List[str]] = None
+) -> str:
+    """
+    Get fields left out of an earlier vehicle, policy, claim or customer lookup.
+
+    Args:
+        record_id: The record_id returned by the earlier lookup (e.g., "vehicle:MH01AB1234")
+        fields: Optional names from the lookup's more_fields; all fields when omitted
+
+    Returns:
+        The requested fields of the full record
+    """
+    shaper = session_shaper(context)
+    record = shaper.full_record(record_id) if shaper is not None else None
+    if record is None:
+        raise ToolError(f"No record {record_id} in this call; look it up again")
+    if not fields:
+        return compact_json(record)
+    selected: Dict[str, Any] = {}
+    for path in fields:
+        found, value = _lookup(record, path)
+        if found:
+            selected[path] = value
+    return compact_json(selected)
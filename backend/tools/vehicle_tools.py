@@ -4,11 +4,33 @@ Vehicle Tools for Vehicle Insurance Agent
 This module contains tools related to vehicle information and validation.
 """
 
+import asyncio
+import os
+
 from livekit.agents import function_tool, RunContext, ToolError
 from typing import Dict, Any, Optional
 
+from .concurrency import turn_deadline
+from .metrics import metered
+from .prefetch import fetch_vehicle, prefetch_vehicle_and_owner
+from .registration import STATE_CODES, validate_registration, validate_registration_file
+from .shaping import shaped
+
+
+# Where fleet onboarding files are uploaded for bulk validation
+UPLOAD_DIR = os.environ.get(
+    "POLICY_BOSS_UPLOAD_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "policy_boss", "uploads")
+)
+
+# Invalid rows read back to the caller; the full list stays in the file
+MAX_INVALID_ROWS_RETURNED = 10
+
 
 @function_tool()
+@metered
+@turn_deadline
+@shaped
 async def get_vehicle_details(
     context: RunContext,
     registration_number: str
@@ -22,105 +44,11 @@ async def get_vehicle_details(
     Returns:
         A dictionary containing vehicle details
     """
-    # Dummy vehicle database with 4-digit numeric IDs in sequential order
-    vehicles = {
-        "3001": {
-            "registration": "3001",
-            "customer_id": "1001",
-            "make": "Maruti Suzuki",
-            "model": "Swift",
-            "variant": "VXI",
-            "fuel_type": "Petrol",
-            "year": 2020,
-            "engine_number": "K12MN1234567",
-            "chassis_number": "MA3EJKD1S00123456",
-            "seating_capacity": 5,
-            "cubic_capacity": 1197,
-            "registration_date": "2020-03-15",
-            "insurance_history": [
-                {
-                    "policy_number": "2001",
-                    "insurer": "Bajaj Allianz",
-                    "period": "2022-03-15 to 2023-03-14"
-                },
-                {
-                    "policy_number": "2001",
-                    "insurer": "Bajaj Allianz",
-                    "period": "2023-03-15 to 2024-03-14"
-                }
-            ],
-            "owner_name": "Rahul Sharma",
-            "rto": "Mumbai Central RTO",
-            "hypothecation": None
-        },
-        "3002": {
-            "registration": "3002",
-            "customer_id": "1002",
-            "make": "Honda",
-            "model": "Activa 6G",
-            "variant": "Standard",
-            "fuel_type": "Petrol",
-            "year": 2021,
-            "engine_number": "JF16ET1234567",
-            "chassis_number": "ME4JF165LT1234567",
-            "seating_capacity": 2,
-            "cubic_capacity": 109,
-            "registration_date": "2021-06-10",
-            "insurance_history": [
-                {
-                    "policy_number": "2003",
-                    "insurer": "ICICI Lombard",
-                    "period": "2021-06-10 to 2022-06-09"
-                },
-                {
-                    "policy_number": "2003",
-                    "insurer": "ICICI Lombard",
-                    "period": "2022-06-10 to 2023-06-09"
-                },
-                {
-                    "policy_number": "2003",
-                    "insurer": "ICICI Lombard",
-                    "period": "2023-06-10 to 2024-06-09"
-                }
-            ],
-            "owner_name": "Priya Patel",
-            "rto": "Delhi South RTO",
-            "hypothecation": None
-        },
-        "3003": {
-            "registration": "3003",
-            "customer_id": "1003",
-            "make": "Tata",
-            "model": "Ace",
-            "variant": "HT",
-            "fuel_type": "Diesel",
-            "year": 2019,
-            "engine_number": "275IDT1234567",
-            "chassis_number": "MAT445075L1234567",
-            "seating_capacity": 2,
-            "cubic_capacity": 702,
-            "registration_date": "2019-08-22",
-            "insurance_history": [
-                {
-                    "policy_number": "2004",
-                    "insurer": "New India Assurance",
-                    "period": "2022-08-22 to 2023-08-21"
-                },
-                {
-                    "policy_number": "2004",
-                    "insurer": "New India Assurance",
-                    "period": "2023-08-22 to 2024-08-21"
-                }
-            ],
-            "owner_name": "Amit Singh",
-            "rto": "Bangalore Central RTO",
-            "hypothecation": "HDFC Bank"
-        }
-    }
+    vehicle = await fetch_vehicle(context, registration_number)
     
-    # Return a default vehicle if the registration_number doesn't exist in our dummy data
-    if registration_number in vehicles:
-        return vehicles[registration_number]
+    # Return a default vehicle if the registration_number doesn't exist in the repository
+    if vehicle is not None:
+        return vehicle
     else:
         # Instead of raising an error, return a default vehicle with the requested registration number
         return {
@@ -154,6 +82,7 @@ async def get_vehicle_details(
 
 
 @function_tool()
+@metered
 async def validate_vehicle_registration(
     context: RunContext,
     registration_number: str
@@ -167,57 +96,53 @@ async def validate_vehicle_registration(
     Returns:
         A dictionary containing validation results
     """
-    import re
-    
-    # Basic validation for Indian vehicle registration format
-    # Format: [State Code (2)] [District Code (2)] [Series (1-3)] [Number (4)]
-    # Example: MH01AB1234, KA02EF9012
-    
-    pattern = r'^[A-Z]{2}[0-9]{2}[A-Z]{1,3}[0-9]{4}$'
-    
-    is_valid = bool(re.match(pattern, registration_number))
+    result = validate_registration(registration_number)
     
-    if not is_valid:
-        return {
-            "is_valid": False,
-            "message": "Invalid registration number format. Expected format: [State Code (2)][District Code (2)][Series (1-3)][Number (4)]",
-            "examples": ["MH01AB1234", "KA02EF9012", "DL05CD5678"]
-        }
+    # The caller almost always asks for the vehicle and its owner next
+    if result["is_valid"]:
+        prefetch_vehicle_and_owner(context, result["registration_number"])
     
-    # Extract state code for additional information
-    state_code = registration_number[:2]
+    return result
+
+
+@function_tool()
+@metered
+async def validate_fleet_registrations(
+    context: RunContext,
+    file_name: str,
+    registration_column: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Validate every vehicle registration number in an uploaded fleet onboarding CSV file.
     
-    # Dummy state code mapping
-    state_codes = {
-        "MH": "Maharashtra",
-        "DL": "Delhi",
-        "KA": "Karnataka",
-        "TN": "Tamil Nadu",
-        "GJ": "Gujarat",
-        "UP": "Uttar Pradesh",
-        "HR": "Haryana",
-        "AP": "Andhra Pradesh",
-        "TS": "Telangana",
-        "KL": "Kerala",
-        "MP": "Madhya Pradesh",
-        "PB": "Punjab",
-        "RJ": "Rajasthan",
-        "WB": "West Bengal",
-        "BR": "Bihar"
-    }
+    Args:
+        file_name: Name of the uploaded CSV file
+        registration_column: Header of the column holding registration numbers; defaults to the first column
     
-    state_name = state_codes.get(state_code, "Unknown State")
+    Returns:
+        A dictionary containing validation counts, counts by state and the first invalid rows
+    """
+    upload_dir = os.path.realpath(UPLOAD_DIR)
+    path = os.path.realpath(os.path.join(upload_dir, file_name))
+    if os.path.dirname(path) != upload_dir or not os.path.isfile(path):
+        raise ToolError(f"No uploaded file named {file_name} was found")
     
-    # Extract district code
-    district_code = registration_number[2:4]
+    # Large files take seconds, so validate off the event loop
+    try:
+        result = await asyncio.to_thread(
+            validate_registration_file, path, column=registration_column or 0
+        )
+    except ValueError as e:
+        raise ToolError(str(e))
     
     return {
-        "is_valid": True,
-        "registration_number": registration_number,
-        "state_code": state_code,
-        "state_name": state_name,
-        "district_code": district_code,
-        "series": registration_number[4:-4],
-        "number": registration_number[-4:],
-        "message": "Valid registration number format"
+        "file_name": file_name,
+        "total_registrations": result.total,
+        "valid": result.valid,
+        "invalid": result.invalid,
+        "by_state": {STATE_CODES.get(code, code): count for code, count in result.by_state.items()},
+        "invalid_rows": [
+            {"line": row.line, "value": row.value}
+            for row in result.invalid_rows[:MAX_INVALID_ROWS_RETURNED]
+        ]
     }